@@ -0,0 +1,265 @@
+"""
+Прогноз выручки экспоненциальным сглаживанием (Holt-Winters, statsmodels).
+
+Ряды строятся одной группировкой на измерение: общий ряд «total» и по
+одному ряду на значение source/country — плотная матрица «период × ряд»
+(пропущенные периоды = 0, как в _safe_ts_for_decompose). Каждый ряд
+подгоняется независимо, поэтому ряды раскладываются по процессам;
+результат подгонки кэшируется на диске под хешем значений ряда и
+настроек модели — неизменившиеся ряды при повторном запуске не
+переобучаются.
+
+Ряды не берутся из analysis.decompose_ts: она отдаёт только сводку
+декомпозиции по общему ряду (число пропусков тренда/сезонности), без
+самих рядов и без разрезов by, поэтому матрица собирается здесь по тем
+же правилам сетки периодов.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import statsmodels
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+# частоты pandas -> период группировки
+FREQS = {"D": "D", "W": "W-SUN", "MS": "M"}
+TOTAL = "total"
+# меньше точек — прогноз средним, без подгонки модели
+MIN_POINTS = 4
+
+
+def _bucket(dates: pd.Series, freq: str) -> pd.Series:
+    if freq == "D":
+        return dates.dt.floor("D")
+    return dates.dt.to_period(FREQS[freq]).dt.start_time
+
+
+def _periods(
+    start: pd.Timestamp,
+    end: pd.Timestamp | None = None,
+    periods: int | None = None,
+    freq: str = "D",
+) -> pd.DatetimeIndex:
+    """
+    Начала периодов с той же привязкой, что у _bucket (неделя W — с
+    понедельника; date_range("W") дал бы воскресенья и ряд из нулей).
+    """
+    if freq == "D":
+        return pd.date_range(start, end, periods=periods, freq="D")
+    return pd.period_range(start, end, periods=periods, freq=FREQS[freq]).start_time
+
+
+def revenue_matrix(
+    df: pd.DataFrame,
+    date_col: str = "order_date",
+    value_col: str = "amount",
+    by: Sequence[str] = (),
+    freq: str = "D",
+    max_series: int | None = None,
+) -> pd.DataFrame:
+    """
+    Плотная матрица выручки: индекс — периоды freq без пропусков,
+    колонки — total и «<измерение>=<значение>» (топ max_series по сумме).
+    Для MS неполные крайние месяцы отбрасываются.
+    """
+    if date_col not in df.columns or value_col not in df.columns:
+        return pd.DataFrame()
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    values = pd.to_numeric(df[value_col], errors="coerce")
+    ok = dates.notna() & values.notna()
+    if not ok.any():
+        return pd.DataFrame()
+    dates, values = dates[ok], values[ok].astype(float)
+    period = _bucket(dates, freq)
+    idx = _periods(period.min(), period.max(), freq=freq)
+
+    cols = {TOTAL: values.groupby(period).sum()}
+    for dim in by:
+        if dim not in df.columns:
+            continue
+        key = df.loc[ok, dim].astype("string").fillna("NA")
+        wide = values.groupby([period, key]).sum().unstack(fill_value=0.0)
+        if wide.shape[1] < 2:
+            continue  # одно значение — ряд совпадает с total
+        order = wide.sum().sort_values(ascending=False).index
+        if max_series:
+            order = order[: int(max_series)]
+        for v in order:
+            cols[f"{dim}={v}"] = wide[v]
+    out = pd.DataFrame(cols).reindex(idx, fill_value=0.0).fillna(0.0)
+    out.index.name = "period"
+
+    if freq == "MS" and len(out) > 2:
+        if dates.min().day != 1:
+            out = out.iloc[1:]
+        if not dates.max().is_month_end:
+            out = out.iloc[:-1]
+    return out
+
+
+def series_key(y: np.ndarray, start: pd.Timestamp, spec: Dict[str, Any]) -> str:
+    """Хеш значений ряда, начала, настроек модели и версии statsmodels."""
+    h = hashlib.sha1(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    h.update(
+        json.dumps(
+            {"start": str(start), "statsmodels": statsmodels.__version__, **spec},
+            sort_keys=True,
+        ).encode("utf-8")
+    )
+    return h.hexdigest()[:20]
+
+
+def fit_series(y: np.ndarray, horizon: int, season: int | None) -> Dict[str, Any]:
+    """
+    Holt-Winters: аддитивный затухающий тренд (от 10 точек) и аддитивная
+    сезонность (если есть хотя бы два сезона). Интервал — ±1.96σ остатков.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n < MIN_POINTS or not np.any(y):
+        level = float(y.mean()) if n else 0.0
+        sigma = float(y.std(ddof=1)) if n > 1 else 0.0
+        fc = np.full(horizon, level)
+        method, params = "mean", {}
+    else:
+        seasonal = int(season) if season and n >= 2 * int(season) else None
+        trend = "add" if n >= 10 else None
+        model = ExponentialSmoothing(
+            y,
+            trend=trend,
+            damped_trend=trend is not None,
+            seasonal="add" if seasonal else None,
+            seasonal_periods=seasonal,
+            initialization_method="estimated",
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            res = model.fit()
+        fc = np.asarray(res.forecast(horizon), dtype=float)
+        sigma = float(np.std(y - np.asarray(res.fittedvalues), ddof=1))
+        method = "holt_winters" + (f"_s{seasonal}" if seasonal else "")
+        params = {
+            k: round(float(res.params[k]), 6)
+            for k in ("smoothing_level", "smoothing_trend", "smoothing_seasonal")
+            if res.params.get(k) is not None and np.isfinite(res.params[k])
+        }
+        if trend:
+            params["damping_trend"] = round(float(res.params["damping_trend"]), 6)
+    # выручка неотрицательна
+    return {
+        "forecast": np.clip(fc, 0.0, None),
+        "lower": np.clip(fc - 1.96 * sigma, 0.0, None),
+        "upper": np.clip(fc + 1.96 * sigma, 0.0, None),
+        "sigma": sigma,
+        "method": method,
+        "params": params,
+    }
+
+
+def _fit_one(args: Tuple[np.ndarray, int, int | None]) -> Dict[str, Any]:
+    return fit_series(*args)
+
+
+def forecast_matrix(
+    wide: pd.DataFrame,
+    freq: str,
+    horizon: int,
+    season: int | None = None,
+    n_jobs: int | None = None,
+    cache_dir: str | Path | None = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Прогноз каждого столбца wide на horizon периодов.
+    Возвращает (long: series/period/forecast/lower/upper,
+                summary: одна строка на ряд).
+    """
+    if wide.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    spec = {"freq": freq, "horizon": int(horizon), "season": season}
+    cache = Path(cache_dir) if cache_dir else None
+    if cache is not None:
+        cache.mkdir(parents=True, exist_ok=True)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    keys: Dict[str, str] = {}
+    todo: List[str] = []
+    for name in wide.columns:
+        y = wide[name].to_numpy(dtype=float)
+        keys[name] = series_key(y, wide.index[0], spec)
+        path = cache / f"{keys[name]}.joblib" if cache is not None else None
+        if path is not None and path.exists():
+            try:
+                results[name] = {**joblib.load(path), "cached": True}
+                continue
+            except Exception:
+                log.warning("Прогноз: повреждён кэш %s — подгоняем заново", path)
+        todo.append(name)
+
+    jobs = [(wide[n].to_numpy(dtype=float), int(horizon), season) for n in todo]
+    workers = min(int(n_jobs or os.cpu_count() or 1), len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            fitted = list(ex.map(_fit_one, jobs))
+    else:
+        fitted = [_fit_one(j) for j in jobs]
+    for name, res in zip(todo, fitted):
+        results[name] = {**res, "cached": False}
+        if cache is not None:
+            joblib.dump(res, cache / f"{keys[name]}.joblib")
+    log.info(
+        "Прогноз %s: рядов %d, подогнано %d (процессов %d), из кэша %d",
+        freq,
+        len(wide.columns),
+        len(todo),
+        max(workers, 1),
+        len(wide.columns) - len(todo),
+    )
+
+    future = _periods(wide.index[-1], periods=int(horizon) + 1, freq=freq)[1:]
+    long_parts, summary = [], []
+    for name in wide.columns:  # порядок рядов как в wide
+        r = results[name]
+        long_parts.append(
+            pd.DataFrame(
+                {
+                    "freq": freq,
+                    "series": name,
+                    "period": future,
+                    "forecast": r["forecast"],
+                    "lower": r["lower"],
+                    "upper": r["upper"],
+                }
+            )
+        )
+        hist = wide[name].to_numpy(dtype=float)
+        last = float(hist[-int(horizon) :].sum())
+        fsum = float(np.sum(r["forecast"]))
+        summary.append(
+            {
+                "freq": freq,
+                "series": name,
+                "points": int(len(hist)),
+                "method": r["method"],
+                "horizon": int(horizon),
+                "last_actual_sum": round(last, 2),
+                "forecast_sum": round(fsum, 2),
+                "change_pct": round((fsum / last - 1) * 100, 2) if last else np.nan,
+                "params": json.dumps(r["params"]),
+                "cached": bool(r["cached"]),
+            }
+        )
+    return pd.concat(long_parts, ignore_index=True), pd.DataFrame(summary)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Optional, Union, Dict, Any
+from typing import Iterator, Optional, Union, Dict, Any
 import pandas as pd
 import requests
 import logging
@@ -38,6 +38,28 @@ def load_excel(
     return df
 
 
+def load_parquet(path: Union[str, Path], **kwargs) -> pd.DataFrame:
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"Parquet not found: {p}")
+    df = pd.read_parquet(p, **kwargs)
+    log.info("Parquet loaded: %s shape=%s", p, getattr(df, "shape", None))
+    return df
+
+
+def iter_chunks(path: str | Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """CSV — read_csv(chunksize), Parquet — по батчам pyarrow."""
+    p = Path(path)
+    if p.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(p)
+        for batch in pf.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(p, chunksize=chunksize)
+
+
 def load_sql(conn_str: str, query: str):
     # заглушка — пользователь может реализовать специфику БД сам
     raise NotImplementedError("load_sql not implemented in this environment")
@@ -0,0 +1,272 @@
+"""
+Массовая загрузка в PostgreSQL через COPY FROM STDIN.
+
+Части (DataFrame из CSV/Parquet по chunksize) пишутся командой COPY в
+UNLOGGED-таблицу <table>__staging: формат csv (psycopg2 copy_expert и
+psycopg 3) или binary (только psycopg 3, cursor.copy + write_row). Затем
+в той же транзакции:
+  swap   — staging становится LOGGED и заменяет таблицу; первичный/уникальные
+           ключи и индексы старой таблицы пересоздаются после загрузки.
+           Если набор колонок DataFrame отличается от таблицы, staging
+           строится по типам DataFrame (как to_sql с replace), а ключи и
+           индексы старой таблицы не переносятся;
+  upsert — строки с совпадающим key удаляются из таблицы и вставляются из
+           staging (уникальный индекс по key не требуется);
+  append — COPY сразу в таблицу, без staging.
+Всё — одна транзакция: при ошибке таблица остаётся прежней. Права (GRANT),
+внешние ключи на таблицу и зависимые представления при swap не переносятся
+(DROP без CASCADE в этом случае упадёт и откатит загрузку).
+"""
+
+from __future__ import annotations
+
+import io
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from src.io.loader import iter_chunks
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+MODES = ("swap", "upsert", "append")
+FORMATS = ("csv", "binary")
+
+
+def _q(name: str) -> str:
+    """Идентификатор в кавычках; schema.table — по частям."""
+    return ".".join('"' + p.replace('"', '""') + '"' for p in str(name).split("."))
+
+
+def _pg_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "DOUBLE PRECISION"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s)", (_q(table),))
+    return cur.fetchone()[0] is not None
+
+
+def _create(cur, table: str, df: pd.DataFrame, like: str | None, unlogged: bool):
+    kind = "UNLOGGED TABLE" if unlogged else "TABLE"
+    if like is not None:
+        cur.execute(f"CREATE {kind} {_q(table)} (LIKE {_q(like)} INCLUDING DEFAULTS)")
+        return
+    cols = ", ".join(f"{_q(c)} {_pg_type(t)}" for c, t in df.dtypes.items())
+    cur.execute(f"CREATE {kind} {_q(table)} ({cols})")
+
+
+def _integral_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """Целые float-колонки (int с пропусками после read_csv) -> Int64: «1», а не «1.0»."""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if s.dtype.kind == "f":
+            v = s.dropna().to_numpy()
+            if len(v) and np.all(np.isfinite(v)) and np.all(v == np.round(v)):
+                if np.abs(v).max() < 2**53:
+                    out[c] = s.astype("Int64")
+    return df.assign(**out) if out else df
+
+
+def _csv_payload(df: pd.DataFrame) -> str:
+    buf = io.StringIO()
+    _integral_floats(df).to_csv(buf, header=False, index=False, na_rep="")
+    return buf.getvalue()
+
+
+def _column_types(cur, table: str) -> Dict[str, str]:
+    cur.execute(
+        "SELECT a.attname, t.typname FROM pg_attribute a "
+        "JOIN pg_type t ON t.oid = a.atttypid "
+        "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped",
+        (_q(table),),
+    )
+    return dict(cur.fetchall())
+
+
+def _copy_chunks(
+    cur, table: str, first: pd.DataFrame, rest: Iterable[pd.DataFrame], fmt: str
+) -> int:
+    cols = list(first.columns)
+    col_sql = ", ".join(_q(c) for c in cols)
+    rows = 0
+    if fmt == "binary":
+        types = _column_types(cur, table)
+        sql = f"COPY {_q(table)} ({col_sql}) FROM STDIN (FORMAT BINARY)"
+        with cur.copy(sql) as cp:
+            cp.set_types([types[c] for c in cols])
+            for df in _chain(first, rest):
+                obj = df[cols].astype(object).where(df[cols].notna(), None)
+                for row in obj.itertuples(index=False, name=None):
+                    cp.write_row(row)
+                rows += len(df)
+        return rows
+    sql = f"COPY {_q(table)} ({col_sql}) FROM STDIN (FORMAT CSV, NULL '')"
+    if hasattr(cur, "copy"):  # psycopg 3: один COPY на все части
+        with cur.copy(sql) as cp:
+            for df in _chain(first, rest):
+                cp.write(_csv_payload(df[cols]))
+                rows += len(df)
+        return rows
+    for df in _chain(first, rest):  # psycopg2: COPY на часть, в памяти — одна часть
+        cur.copy_expert(sql, io.StringIO(_csv_payload(df[cols])))
+        rows += len(df)
+    return rows
+
+
+def _chain(first: pd.DataFrame, rest: Iterable[pd.DataFrame]):
+    yield first
+    yield from rest
+
+
+def _keys_and_indexes(cur, table: str) -> List[str]:
+    """DDL ключей (p/u) и прочих индексов таблицы — для пересоздания после swap."""
+    cur.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+        (_q(table),),
+    )
+    ddl = [
+        f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(name)} {definition}"
+        for name, definition in cur.fetchall()
+    ]
+    cur.execute(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "WHERE i.indrelid = %s::regclass AND NOT EXISTS "
+        "(SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+        (_q(table),),
+    )
+    return ddl + [r[0] for r in cur.fetchall()]
+
+
+def copy_load(
+    conn,
+    table: str,
+    chunks: Iterable[pd.DataFrame],
+    mode: str = "swap",
+    key: str = "order_id",
+    fmt: str = "csv",
+) -> Dict[str, Any]:
+    """
+    conn — DBAPI-соединение psycopg2/psycopg 3 (коммит — здесь).
+    Возвращает {table, mode, format, rows, seconds, rows_per_s}.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode: ожидается одно из {MODES}, получено {mode!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt: ожидается одно из {FORMATS}, получено {fmt!r}")
+    t0 = time.perf_counter()
+    stats: Dict[str, Any] = {"table": table, "mode": mode, "format": fmt}
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        log.info("COPY %s: входных данных нет", table)
+        return {**stats, "rows": 0, "seconds": 0.0, "rows_per_s": 0.0}
+    cur = conn.cursor()
+    if fmt == "binary" and not hasattr(cur, "copy"):
+        raise ValueError("fmt=binary требует psycopg 3 (cursor.copy)")
+    staging = f"{table}__staging"
+    try:
+        exists = _exists(cur, table)
+        if mode == "append" or (mode == "upsert" and not exists):
+            if not exists:
+                _create(cur, table, first, None, unlogged=False)
+            target = table
+        else:
+            like = table if exists else None
+            if exists and mode == "swap":
+                old = set(_column_types(cur, table))
+                if old != {str(c) for c in first.columns}:
+                    log.warning(
+                        "COPY %s: колонки изменились — новая схема по DataFrame, "
+                        "ключи и индексы прежней таблицы не переносятся",
+                        table,
+                    )
+                    like = None
+            cur.execute(f"DROP TABLE IF EXISTS {_q(staging)}")
+            _create(cur, staging, first, like, unlogged=True)
+            target = staging
+        rows = _copy_chunks(cur, target, first, chunks, fmt)
+
+        if target == staging and mode == "swap":
+            ddl = _keys_and_indexes(cur, table) if like is not None else []
+            cur.execute(f"ALTER TABLE {_q(staging)} SET LOGGED")
+            if exists:
+                cur.execute(f"DROP TABLE {_q(table)}")
+            cur.execute(
+                f"ALTER TABLE {_q(staging)} RENAME TO {_q(table.split('.')[-1])}"
+            )
+            for stmt in ddl:
+                cur.execute(stmt)
+        elif target == staging:  # upsert
+            cols = ", ".join(_q(c) for c in first.columns)
+            cur.execute(
+                f"DELETE FROM {_q(table)} t USING {_q(staging)} s "
+                f"WHERE t.{_q(key)} = s.{_q(key)}"
+            )
+            cur.execute(
+                f"INSERT INTO {_q(table)} ({cols}) SELECT {cols} FROM {_q(staging)}"
+            )
+            cur.execute(f"DROP TABLE {_q(staging)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    seconds = time.perf_counter() - t0
+    stats["rows"] = rows
+    stats["seconds"] = round(seconds, 3)
+    stats["rows_per_s"] = round(rows / seconds, 1) if seconds > 0 else float(rows)
+    log.info(
+        "COPY %s (%s, %s): %d строк за %.2f с (%.0f строк/с)",
+        table,
+        mode,
+        fmt,
+        rows,
+        seconds,
+        stats["rows_per_s"],
+    )
+    return stats
+
+
+def bulk_load(
+    engine_or_dsn,
+    table: str,
+    source: str | Path | Iterable[pd.DataFrame],
+    chunksize: int = 100_000,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    source — путь к CSV/Parquet (читается частями по chunksize) или
+    итератор DataFrame; engine_or_dsn — SQLAlchemy Engine или DSN.
+    kwargs — mode, key, fmt (см. copy_load).
+    """
+    from sqlalchemy import create_engine
+
+    engine = (
+        create_engine(engine_or_dsn, future=True)
+        if isinstance(engine_or_dsn, str)
+        else engine_or_dsn
+    )
+    chunks = (
+        iter_chunks(source, chunksize) if isinstance(source, (str, Path)) else source
+    )
+    conn = engine.raw_connection()
+    try:
+        return copy_load(conn, table, chunks, **kwargs)
+    finally:
+        conn.close()
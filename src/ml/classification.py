@@ -1,17 +1,10 @@
 from __future__ import annotations
+import time
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_auc_score,
-    confusion_matrix,
-)
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_predict, train_test_split
 from src.utils.persist import save_model
 from src.utils.logging import getLogger
 from .features import make_classification_target, select_numeric_features
@@ -22,10 +15,48 @@ from .plots import (
     bar as plot_bar,
 )
 from .tables import logreg_coeffs_table
+from .metrics import (
+    threshold_sweep,
+    metrics_at,
+    optimal_threshold,
+    roc_auc,
+    average_precision,
+    roc_points,
+    pr_points,
+    sweep_table,
+)
+from .utils import load_previous_model
+from .tuning import run_evaluation
+from .estimators import (
+    resolve_estimator,
+    get_spec,
+    make_estimator,
+    apply_warm_start,
+    remember_training_rows,
+    warm_holdout,
+    WARM_START_MAX_TREES,
+    compare_estimators,
+    comparison_rows,
+)
 
 log = getLogger(__name__)
 
 
+def tuned_threshold(
+    clf, Xtr, ytr, target_p=None, target_r=None, cv: int = 3, n_jobs=None
+) -> float | None:
+    """
+    Порог под целевой precision/recall по out-of-fold вероятностям на
+    обучающей выборке: тестовая остаётся нетронутой для оценки.
+    None — цель недостижима.
+    """
+    cv = max(2, min(int(cv), int(np.bincount(np.asarray(ytr, dtype=int)).min())))
+    oof = cross_val_predict(
+        clone(clf), Xtr, ytr, cv=cv, method="predict_proba", n_jobs=n_jobs
+    )[:, 1]
+    return optimal_threshold(threshold_sweep(np.asarray(ytr), oof), target_p, target_r)
+
+
 def run_classification(
     X,
     ml_cfg: Dict[str, Any],
@@ -42,44 +73,113 @@ def run_classification(
     try:
         q = float(cfg.get("threshold_q", 0.8))
         y, y_name = make_classification_target(X, cfg.get("target"), q)
-        feat, feat_cols = select_numeric_features(
-            X, drop=[y_name, "amount"]
-        )  # drop target & amount
-        Xtr, Xte, ytr, yte = train_test_split(
-            feat, y, test_size=0.25, random_state=42, stratify=y
-        )
-        clf = LogisticRegression(max_iter=1000, class_weight="balanced")
+        name = resolve_estimator("classification", cfg, len(X))
+        spec = get_spec("classification", name)
+
+        def split(handles_nan: bool):
+            f, _ = select_numeric_features(
+                X, drop=[y_name, "amount"], fillna=not handles_nan
+            )  # drop target & amount
+            return train_test_split(f, y, test_size=0.25, random_state=42, stratify=y)
+
+        Xtr, Xte, ytr, yte = split(spec["handles_nan"])
+        feat_cols = Xtr.columns.tolist()
+        n_jobs = cfg.get("n_jobs")
+        model_path = models_dir / spec["model_file"]
+        clf = make_estimator("classification", name, n_jobs)
+        prev = None
+        warm_cfg = bool(cfg.get("warm_start", False))
+        if warm_cfg:
+            prev = load_previous_model(model_path, feat_cols)
+        warm = prev is not None and type(prev) is type(clf)
+        seen = getattr(prev, "seen_rows_", None) if warm else None
+        if warm:
+            # warm_start: логрегрессия стартует с прошлых коэффициентов,
+            # бустинг — добавляет итерации (не больше warm_start_max_trees)
+            cap = int(cfg.get("warm_start_max_trees") or WARM_START_MAX_TREES)
+            warm = apply_warm_start(
+                prev, spec, int(cfg.get("warm_start_trees", 50)), cap
+            )
+            if warm:
+                clf = prev
+                log.info("Классификация: warm_start от сохранённой модели")
+            else:
+                seen = None
+                log.info(
+                    "Классификация: лимит warm_start %d итераций — обучаем заново",
+                    cap,
+                )
+        t0 = time.perf_counter()
         clf.fit(Xtr, ytr)
+        fit_seconds = time.perf_counter() - t0
+        holdout = "random"
+        if warm:
+            # тест — только строки, которых прежняя модель не видела
+            unseen, holdout = warm_holdout(seen, Xte, yte, classes=True)
+            if unseen is not None:
+                Xte, yte = Xte[unseen], yte[unseen]
+        if warm_cfg:
+            remember_training_rows(clf, Xtr, ytr, seen)
         proba = clf.predict_proba(Xte)[:, 1]
-        pred = (proba >= 0.5).astype(int)
+        # одна сортировка вероятностей — все пороги, кривые и метрики
+        sweep = threshold_sweep(yte.values, proba)
+        threshold = float(cfg.get("decision_threshold", 0.5))
+        target_p, target_r = cfg.get("target_precision"), cfg.get("target_recall")
+        if target_p is not None or target_r is not None:
+            best = tuned_threshold(
+                clf,
+                Xtr,
+                ytr,
+                target_p,
+                target_r,
+                int(cfg.get("threshold_cv", 3)),
+                n_jobs,
+            )
+            if best is None:
+                log.warning(
+                    "Классификация: цель precision=%s/recall=%s недостижима — порог %.2f",
+                    target_p,
+                    target_r,
+                    threshold,
+                )
+            else:
+                threshold = best
+        at = metrics_at(sweep, threshold)
         m = {
             "target": y_name,
-            "accuracy": float(accuracy_score(yte, pred)),
-            "precision": float(precision_score(yte, pred, zero_division=0)),
-            "recall": float(recall_score(yte, pred, zero_division=0)),
-            "f1": float(f1_score(yte, pred, zero_division=0)),
-            "roc_auc": float(roc_auc_score(yte, proba)),
+            "threshold": round(threshold, 6),
+            "accuracy": float(at["accuracy"]),
+            "precision": float(at["precision"]),
+            "recall": float(at["recall"]),
+            "f1": float(at["f1"]),
+            "roc_auc": roc_auc(sweep),
+            "average_precision": average_precision(sweep),
             "n_train": int(len(Xtr)),
             "n_test": int(len(Xte)),
+            "estimator": name,
+            "model_file": spec["model_file"],
+            "fit_seconds": round(fit_seconds, 3),
+            "warm_start": warm,
+            "holdout": holdout,
         }
         metrics_dest["classification"] = m
         log.info("ML[classification] %s", m)
-        cm = confusion_matrix(yte, pred)
+        tables_df["threshold_sweep"] = sweep_table(sweep)
         images.append(
             (
-                plot_confusion(cm, out_dir / "clf_confusion.png"),
-                "Матрица ошибок: диагональ — верные ответы.",
+                plot_confusion(at["confusion"], out_dir / "clf_confusion.png"),
+                f"Матрица ошибок при пороге {threshold:.2f}: диагональ — верные ответы.",
             )
         )
         images.append(
             (
-                plot_roc(yte.values, proba, out_dir / "clf_roc.png"),
+                plot_roc(yte.values, proba, out_dir / "clf_roc.png", roc_points(sweep)),
                 "ROC-кривая; ROC-AUC — качество ранжирования.",
             )
         )
         images.append(
             (
-                plot_pr(yte.values, proba, out_dir / "clf_pr.png"),
+                plot_pr(yte.values, proba, out_dir / "clf_pr.png", pr_points(sweep)),
                 "Precision–Recall кривая.",
             )
         )
@@ -95,7 +195,25 @@ def run_classification(
                 out_dir / "clf_top_coef.png",
             )
             images.append((img, "Наиболее влияющие признаки по |коэф|."))
-        model_path = models_dir / "logreg_high_value.joblib"
         save_model(clf, model_path)
+
+        feat_all, _ = select_numeric_features(X, drop=[y_name, "amount"], fillna=False)
+        run_evaluation(
+            "classification", name, feat_all, y, ml_cfg, n_jobs, tables, tables_df
+        )
+
+        compare = list(cfg.get("compare") or [])
+        if compare:
+
+            def score(model, Xv, yv):
+                sw = threshold_sweep(yv.values, model.predict_proba(Xv)[:, 1])
+                return {
+                    "roc_auc": roc_auc(sw),
+                    "f1": metrics_at(sw, threshold)["f1"],
+                }
+
+            dfc = compare_estimators("classification", compare, split, score, n_jobs)
+            tables.append(("Сравнение моделей: классификация", comparison_rows(dfc)))
+            tables_df["model_comparison_classification"] = dfc
     except Exception as e:
         log.exception("Ошибка классификации: %s", e)
@@ -0,0 +1,201 @@
+"""
+Реестр оценщиков для ML-задач (ml.<task>.estimator в config.yaml).
+
+random_forest/logreg — прежние модели по умолчанию; hist_gb — гистограммный
+градиентный бустинг: быстро учится на больших данных, компактен на диске
+и сам обрабатывает пропуски (признаки без fillna(0.0)).
+estimator: auto — hist_gb, если строк не меньше auto_min_rows.
+"""
+
+from __future__ import annotations
+
+import io
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier,
+    HistGradientBoostingRegressor,
+    RandomForestRegressor,
+)
+from sklearn.linear_model import LogisticRegression
+
+from src.utils.logging import getLogger
+from src.ml.utils import row_hashes
+
+log = getLogger(__name__)
+
+AUTO_MIN_ROWS = 50_000
+WARM_START_MAX_TREES = 1000
+# меньше невиданных строк в тесте — метрики warm_start помечаются in_sample
+MIN_UNSEEN_ROWS = 30
+
+# grow_param — что увеличивать при warm_start (None — только старт с прошлого решения)
+ESTIMATORS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "regression": {
+        "random_forest": {
+            "factory": lambda n_jobs: RandomForestRegressor(
+                n_estimators=250, random_state=42, n_jobs=n_jobs
+            ),
+            "handles_nan": False,
+            "grow_param": "n_estimators",
+            "model_file": "rf_amount.joblib",
+        },
+        "hist_gb": {
+            "factory": lambda n_jobs: HistGradientBoostingRegressor(
+                max_iter=300, early_stopping=True, random_state=42
+            ),
+            "handles_nan": True,
+            "grow_param": "max_iter",
+            "model_file": "hgb_amount.joblib",
+        },
+    },
+    "classification": {
+        "logreg": {
+            "factory": lambda n_jobs: LogisticRegression(
+                max_iter=1000, class_weight="balanced"
+            ),
+            "handles_nan": False,
+            "grow_param": None,
+            "model_file": "logreg_high_value.joblib",
+        },
+        "hist_gb": {
+            "factory": lambda n_jobs: HistGradientBoostingClassifier(
+                max_iter=300,
+                early_stopping=True,
+                class_weight="balanced",
+                random_state=42,
+            ),
+            "handles_nan": True,
+            "grow_param": "max_iter",
+            "model_file": "hgb_high_value.joblib",
+        },
+    },
+}
+
+DEFAULTS = {"regression": "random_forest", "classification": "logreg"}
+
+
+def resolve_estimator(task: str, cfg: Dict[str, Any], n_rows: int) -> str:
+    """Имя оценщика из конфига; auto — по числу строк; неизвестное — дефолт."""
+    name = str(cfg.get("estimator") or DEFAULTS[task]).lower()
+    if name == "auto":
+        min_rows = int(cfg.get("auto_min_rows", AUTO_MIN_ROWS))
+        name = "hist_gb" if n_rows >= min_rows else DEFAULTS[task]
+    if name not in ESTIMATORS[task]:
+        log.warning(
+            "ML[%s]: неизвестный estimator '%s' — используем %s",
+            task,
+            name,
+            DEFAULTS[task],
+        )
+        name = DEFAULTS[task]
+    return name
+
+
+def get_spec(task: str, name: str) -> Dict[str, Any]:
+    return ESTIMATORS[task][name]
+
+
+def make_estimator(task: str, name: str, n_jobs: int | None = None):
+    return get_spec(task, name)["factory"](n_jobs)
+
+
+def apply_warm_start(
+    model, spec: Dict[str, Any], add: int, max_total: int | None = None
+) -> bool:
+    """
+    Включает warm_start; для ансамблей — добавляет add деревьев/итераций.
+    False — с ними модель превысила бы max_total: нужна подгонка с нуля.
+    """
+    p = spec.get("grow_param")
+    if p and max_total and getattr(model, p) + add > max_total:
+        return False
+    model.set_params(warm_start=True)
+    if p:
+        model.set_params(**{p: getattr(model, p) + add})
+    return True
+
+
+def remember_training_rows(model, Xtr, ytr, seen: np.ndarray | None = None) -> None:
+    """Сохраняет в модели хеши обучающих строк (с учётом прежних) — seen_rows_."""
+    rows = row_hashes(Xtr, ytr)
+    model.seen_rows_ = rows if seen is None else np.union1d(seen, rows)
+
+
+def warm_holdout(
+    seen: np.ndarray | None, Xte, yte, classes: bool = False
+) -> Tuple[np.ndarray | None, str]:
+    """
+    Тест для дообученной модели: только строки, которых прежняя модель не
+    видела при обучении (по seen_rows_). Возвращает (маска или None, holdout):
+    unseen — маска по невиданным строкам; in_sample — их слишком мало (или
+    прежняя модель без seen_rows_), метрики считаются на всём тесте и
+    завышены. classes=True — в невиданных строках нужны оба класса.
+    """
+    if seen is None:
+        return None, "in_sample"
+    mask = ~np.isin(row_hashes(Xte, yte), seen)
+    enough = int(mask.sum()) >= MIN_UNSEEN_ROWS
+    if enough and classes:
+        enough = np.unique(np.asarray(yte)[mask]).size > 1
+    return (mask, "unseen") if enough else (None, "in_sample")
+
+
+def model_size_kb(model) -> float:
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    return round(buf.tell() / 1024, 1)
+
+
+def compare_estimators(
+    task: str,
+    names: List[str],
+    split: Callable[[bool], tuple],
+    score: Callable[[Any, Any, Any], Dict[str, float]],
+    n_jobs: int | None = None,
+) -> pd.DataFrame:
+    """
+    Обучает оценщики names на одном разбиении и сводит время/размер/качество.
+    split(handles_nan) -> (Xtr, Xte, ytr, yte); score(model, Xte, yte) -> метрики.
+    """
+    rows = []
+    for name in names:
+        if name not in ESTIMATORS[task]:
+            log.warning("ML[%s]: '%s' нет в реестре — пропускаем", task, name)
+            continue
+        try:
+            spec = get_spec(task, name)
+            Xtr, Xte, ytr, yte = split(spec["handles_nan"])
+            model = make_estimator(task, name, n_jobs)
+            t0 = time.perf_counter()
+            model.fit(Xtr, ytr)
+            fit_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            m = score(model, Xte, yte)
+            pred_s = time.perf_counter() - t0
+            rows.append(
+                {
+                    "task": task,
+                    "estimator": name,
+                    "fit_seconds": round(fit_s, 3),
+                    "predict_seconds": round(pred_s, 4),
+                    "size_kb": model_size_kb(model),
+                    **{k: round(float(v), 6) for k, v in m.items()},
+                }
+            )
+        except Exception:
+            log.exception("ML[%s]: сравнение '%s' не удалось", task, name)
+    return pd.DataFrame(rows)
+
+
+def comparison_rows(df: pd.DataFrame) -> List[List[str]]:
+    """Строки для PDF-таблицы (заголовок + значения)."""
+    if df.empty:
+        return [["нет данных"]]
+    return [list(map(str, df.columns))] + [
+        [str(v) for v in r] for r in df.itertuples(index=False)
+    ]
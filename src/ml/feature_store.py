@@ -0,0 +1,385 @@
+"""
+Локальное хранилище ML-признаков (feature store).
+
+Наборы признаков описаны в реестре FEATURE_SETS: ключ (order_id/customer_id),
+время события и функция построения поверх build_features/customer_history.
+Таблицы хранятся версиями в Parquet:
+
+    <root>/<set>/v<N>/features.parquet
+    <root>/<set>/manifest.json      # версии, отпечаток данных, колонки
+
+Версия привязана к отпечатку входных данных и к хэшу исходного кода
+определения набора (функция build и модули из depends): при тех же данных
+и том же коде таблица читается с диска, а не строится заново. Для обучения —
+выборка «на момент времени» (merge_asof), для онлайн-скоринга — словарь
+признаков по ключу в памяти.
+
+customer_history хранит, кроме признаков заказа «до него», накопленное
+состояние клиента после заказа (_cnt_after, _amount_sum_after,
+_amount_cnt_after); признаки на произвольный момент (history_as_of) из него
+пересчитываются точно, а не берутся из строки предыдущего заказа.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import getLogger
+from .features import build_features
+from .history import HISTORY_COLUMNS, HISTORY_WINDOWS, _columns, customer_history
+from .utils import data_fingerprint
+
+log = getLogger(__name__)
+
+FEATURE_SETS: Dict[str, Dict[str, Any]] = {}
+
+
+def register_feature_set(
+    name: str,
+    key: str,
+    build: Callable[[pd.DataFrame], pd.DataFrame],
+    event_time: str | None = None,
+    as_of: Callable[..., pd.DataFrame] | None = None,
+    depends: Iterable[Callable] = (),
+) -> None:
+    """
+    Регистрирует набор признаков: build(df) -> таблица с колонкой key.
+    as_of(entities, features, allow_exact_matches) — признаки на момент
+    времени (по умолчанию — point_in_time); depends — функции, чьи модули
+    входят в хэш определения набора.
+    """
+    FEATURE_SETS[name] = {
+        "key": key,
+        "event_time": event_time,
+        "build": build,
+        "as_of": as_of,
+        "depends": tuple(depends),
+    }
+
+
+def _order_features(df: pd.DataFrame) -> pd.DataFrame:
+    x = build_features(df)
+    x.insert(0, "order_id", df["order_id"].to_numpy())
+    return x
+
+
+_AFTER_COLUMNS = ["_cnt_after", "_amount_sum_after", "_amount_cnt_after"]
+
+
+def _after_state(df: pd.DataFrame) -> pd.DataFrame:
+    """Накопленные cnt/amount_sum/amount_cnt клиента с учётом самого заказа."""
+    cust, t, amount = _columns(df)
+    ok = ~np.isnan(amount)
+    n = len(df)
+    work = pd.DataFrame(
+        {
+            "customer_id": cust.to_numpy(),
+            "a": np.where(ok, amount, 0.0),
+            "n": ok.astype(float),
+        }
+    )
+    # тот же порядок, что в customer_history: время, затем исходная позиция
+    work = work.iloc[np.lexsort((np.arange(n), t))]
+    g = work.groupby("customer_id", sort=False)
+    after = pd.DataFrame(
+        {
+            "_cnt_after": (g.cumcount() + 1).astype(float),
+            "_amount_sum_after": g["a"].cumsum(),
+            "_amount_cnt_after": g["n"].cumsum(),
+        }
+    )
+    return after.reindex(np.arange(n)).set_axis(df.index)
+
+
+def _customer_history(df: pd.DataFrame) -> pd.DataFrame:
+    h = customer_history(df)
+    h = pd.concat([h, _after_state(df)], axis=1)
+    h.insert(0, "customer_id", df["customer_id"])
+    h.insert(1, "order_date", pd.to_datetime(df["order_date"], errors="coerce"))
+    return h[h["customer_id"].notna()].reset_index(drop=True)
+
+
+def history_as_of(
+    entities: pd.DataFrame,
+    features: pd.DataFrame,
+    allow_exact_matches: bool = False,
+) -> pd.DataFrame:
+    """
+    Признаки истории (HISTORY_COLUMNS) для каждой строки entities
+    (customer_id, order_date) по заказам клиента строго раньше order_date
+    (allow_exact_matches=True — включая заказы в тот же момент). Считаются
+    из накопленного состояния: итоги — на последний заказ до момента, окна —
+    разность итогов на момент и на момент минус окно. Клиент без заказов —
+    как первый заказ (0 / NaN / -1); строки без ключа или времени — NaN.
+    """
+    key, et = "customer_id", "order_date"
+    left = entities.reset_index(drop=True).copy()
+    left[et] = pd.to_datetime(left[et], errors="coerce").astype("datetime64[ns]")
+    right = features[[key, et, *_AFTER_COLUMNS]].dropna(subset=[key, et])
+    right = right.rename(columns={et: "_t"})
+    right["_t"] = pd.to_datetime(right["_t"]).astype("datetime64[ns]")
+    # при равном времени последней должна быть строка с наибольшим итогом
+    right = right.sort_values(["_t", "_cnt_after"], kind="stable")
+    right[key] = right[key].astype(left[key].dtype)
+    valid = left[et].notna() & left[key].notna()
+    base = left.loc[valid, [key, et]].sort_values(et, kind="stable")
+
+    def state(on: pd.Series, exact: bool) -> pd.DataFrame:
+        probe = pd.DataFrame({key: base[key].array, "_on": on.array})
+        return pd.merge_asof(
+            probe,
+            right,
+            left_on="_on",
+            right_on="_t",
+            by=key,
+            allow_exact_matches=exact,
+            direction="backward",
+        )
+
+    upto = state(base[et], allow_exact_matches)
+    cnt = upto["_cnt_after"].fillna(0).to_numpy(dtype=float)
+    amount_sum = upto["_amount_sum_after"].fillna(0).to_numpy(dtype=float)
+    amount_cnt = upto["_amount_cnt_after"].fillna(0).to_numpy(dtype=float)
+    last = upto["_t"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(amount_cnt > 0, amount_sum / amount_cnt, np.nan)
+    out: Dict[str, np.ndarray] = {
+        "_cnt_prev": cnt,
+        "_amount_prev_mean": mean,
+        "_recency_days": np.where(
+            last.notna(),
+            ((upto["_on"] - last) / pd.Timedelta(days=1)).to_numpy(
+                dtype=float, na_value=np.nan
+            ),
+            -1.0,
+        ),
+    }
+    for w in HISTORY_WINDOWS:
+        # окно [момент - w дней, момент): вычитаем итог до его начала
+        before = state(base[et] - pd.Timedelta(days=w), False)
+        out[f"_freq_{w}d"] = cnt - before["_cnt_after"].fillna(0).to_numpy(float)
+        out[f"_monetary_{w}d"] = amount_sum - before["_amount_sum_after"].fillna(
+            0
+        ).to_numpy(float)
+    hist = pd.DataFrame({c: out[c] for c in HISTORY_COLUMNS}, index=base.index)
+    return left.join(hist)
+
+
+register_feature_set(
+    "order_features",
+    key="order_id",
+    build=_order_features,
+    depends=(build_features,),
+)
+register_feature_set(
+    "customer_history",
+    key="customer_id",
+    build=_customer_history,
+    event_time="order_date",
+    as_of=history_as_of,
+    depends=(customer_history, _after_state),
+)
+
+
+def definition_hash(name: str) -> str:
+    """Хэш исходного кода определения набора: build и модули из depends."""
+    spec = FEATURE_SETS[name]
+    h = hashlib.sha1()
+    for fn in (spec["build"], *spec["depends"]):
+        try:
+            source = inspect.getsource(fn)
+            module = inspect.getmodule(fn)
+            if module is not None and fn is not spec["build"]:
+                source += inspect.getsource(module)
+        except (OSError, TypeError):
+            source = f"{fn.__module__}.{fn.__qualname__}"
+        h.update(source.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# --- версии и манифест ---
+def _manifest_path(root: Path, name: str) -> Path:
+    return root / name / "manifest.json"
+
+
+def read_manifest(root: str | Path, name: str) -> Dict[str, Any]:
+    p = _manifest_path(Path(root), name)
+    if not p.exists():
+        return {"name": name, "latest": None, "versions": []}
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def _write_manifest(root: Path, name: str, manifest: Dict[str, Any]) -> None:
+    p = _manifest_path(root, name)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), "utf-8")
+    tmp.replace(p)
+
+
+def read_features(
+    root: str | Path, name: str, version: int | None = None
+) -> pd.DataFrame:
+    """Таблица признаков набора name (по умолчанию — последняя версия)."""
+    manifest = read_manifest(root, name)
+    version = version or manifest.get("latest")
+    if version is None:
+        raise FileNotFoundError(f"Набор признаков '{name}' не материализован")
+    return pd.read_parquet(Path(root) / name / f"v{version}" / "features.parquet")
+
+
+def get_or_build(df: pd.DataFrame, name: str, root: str | Path) -> pd.DataFrame:
+    """
+    Таблица признаков для df: из хранилища, если версия с тем же отпечатком
+    данных и тем же определением набора уже есть, иначе строится и
+    сохраняется новой версией.
+    """
+    spec = FEATURE_SETS[name]
+    root = Path(root)
+    fp = data_fingerprint(df)
+    definition = definition_hash(name)
+    manifest = read_manifest(root, name)
+    for v in manifest["versions"]:
+        if v.get("fingerprint") == fp and v.get("definition") == definition:
+            path = root / name / f"v{v['version']}" / "features.parquet"
+            if path.exists():
+                log.info("Feature store: '%s' v%d из кэша (%s)", name, v["version"], fp)
+                return pd.read_parquet(path)
+
+    feats = spec["build"](df)
+    version = max([v["version"] for v in manifest["versions"]] or [0]) + 1
+    path = root / name / f"v{version}" / "features.parquet"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    feats.to_parquet(path, index=False)
+    manifest["versions"].append(
+        {
+            "version": version,
+            "fingerprint": fp,
+            "definition": definition,
+            "key": spec["key"],
+            "event_time": spec["event_time"],
+            "rows": int(len(feats)),
+            "columns": [str(c) for c in feats.columns],
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+    )
+    manifest["latest"] = version
+    _write_manifest(root, name, manifest)
+    log.info("Feature store: '%s' v%d сохранён (%d строк)", name, version, len(feats))
+    return feats
+
+
+def materialize(
+    df: pd.DataFrame, root: str | Path, names: Iterable[str] | None = None
+) -> Dict[str, pd.DataFrame]:
+    """Строит/обновляет несколько наборов; ошибки по набору не валят остальные."""
+    out: Dict[str, pd.DataFrame] = {}
+    for name in names or FEATURE_SETS:
+        if name not in FEATURE_SETS:
+            log.warning("Feature store: неизвестный набор '%s' — пропускаем", name)
+            continue
+        try:
+            out[name] = get_or_build(df, name, root)
+        except Exception:
+            log.exception("Feature store: не удалось построить '%s'", name)
+    return out
+
+
+# --- выборка для обучения ---
+def point_in_time(
+    entities: pd.DataFrame,
+    features: pd.DataFrame,
+    key: str,
+    event_time: str,
+    allow_exact_matches: bool = False,
+) -> pd.DataFrame:
+    """
+    Для каждой строки entities (key, event_time) — последние признаки
+    с временем строго раньше (allow_exact_matches=False), без заглядывания
+    в будущее. Исходный порядок строк entities сохраняется.
+    """
+    left = entities.reset_index(drop=True).copy()
+    left["_row"] = np.arange(len(left))
+    left[event_time] = pd.to_datetime(left[event_time], errors="coerce")
+    right = features.copy()
+    right[event_time] = pd.to_datetime(right[event_time], errors="coerce")
+    right = right.dropna(subset=[key, event_time]).sort_values(
+        event_time, kind="stable"
+    )
+    # merge_asof требует одинаковый тип ключа (Int64 vs int64 после Parquet)
+    right[key] = right[key].astype(left[key].dtype)
+    valid = left[event_time].notna() & left[key].notna()
+    joined = pd.merge_asof(
+        left[valid].sort_values(event_time, kind="stable"),
+        right,
+        on=event_time,
+        by=key,
+        allow_exact_matches=allow_exact_matches,
+        direction="backward",
+    )
+    out = pd.concat([joined, left[~valid]], ignore_index=True)
+    return out.sort_values("_row").drop(columns="_row").reset_index(drop=True)
+
+
+def training_frame(
+    entities: pd.DataFrame, root: str | Path, name: str = "customer_history"
+) -> pd.DataFrame:
+    """Признаки на момент времени по последней версии набора из хранилища."""
+    spec = FEATURE_SETS[name]
+    if not spec["event_time"]:
+        raise ValueError(f"Набор '{name}' без event_time — point-in-time неприменим")
+    features = read_features(root, name)
+    if spec["as_of"] is not None:
+        return spec["as_of"](entities, features)
+    return point_in_time(entities, features, spec["key"], spec["event_time"])
+
+
+# --- онлайн-доступ ---
+def online_index(features: pd.DataFrame, key: str, event_time: str | None = None):
+    """
+    {ключ: {признак: значение}} — последние признаки по ключу.
+    Строится один раз, дальше поиск — O(1) обращение к словарю.
+    """
+    df = features.dropna(subset=[key])
+    if event_time and event_time in df.columns:
+        df = df.sort_values(event_time, kind="stable")
+    df = df.drop_duplicates(subset=[key], keep="last")
+    cols: List[str] = [c for c in df.columns if c != key]
+    values = df[cols].to_numpy(dtype=object)
+    return {
+        k: dict(zip(cols, row)) for k, row in zip(df[key].tolist(), values.tolist())
+    }
+
+
+def load_online_index(
+    root: str | Path, name: str = "customer_history", as_of: Any = None
+):
+    """
+    Индекс по последней версии набора. Для наборов с as_of признаки
+    считаются на момент as_of (по умолчанию — сейчас) с учётом всех заказов
+    до него включительно, в том числе последнего.
+    """
+    spec = FEATURE_SETS[name]
+    features = read_features(root, name)
+    if spec["as_of"] is None:
+        return online_index(features, spec["key"], spec["event_time"])
+    key, et = spec["key"], spec["event_time"]
+    keys = features[key].dropna().drop_duplicates()
+    moment = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now()
+    entities = pd.DataFrame({key: keys.to_numpy(), et: moment})
+    entities[key] = entities[key].astype(features[key].dtype)
+    current = spec["as_of"](entities, features, allow_exact_matches=True)
+    return online_index(current.drop(columns=et), key)
+
+
+def lookup(index: Dict[Any, Dict[str, Any]], key: Any) -> Dict[str, Any] | None:
+    """Признаки одного клиента/заказа для онлайн-скоринга (None — нет в индексе)."""
+    return index.get(key)
@@ -2,9 +2,17 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from .utils import ID_COLUMNS
+from .history import customer_history
 
 
-def build_features(df: pd.DataFrame) -> pd.DataFrame:
+def build_features(
+    df: pd.DataFrame, history: pd.DataFrame | None = None
+) -> pd.DataFrame:
+    """
+    Признаки для ML. history — готовые признаки истории клиента
+    (например, из history.update_history для новых заказов); по умолчанию
+    считаются по всему df через history.customer_history.
+    """
     x = df.copy()
     if "order_date" in x.columns:
         s = pd.to_datetime(x["order_date"], errors="coerce")
@@ -14,11 +22,9 @@ def build_features(df: pd.DataFrame) -> pd.DataFrame:
     if "source" in x.columns:
         x = pd.get_dummies(x, columns=["source"], prefix="src", dummy_na=False)
     if "customer_id" in x.columns:
-        x["_cnt_prev"] = x.groupby("customer_id").cumcount()
-        if "amount" in x.columns:
-            x["_amount_prev_mean"] = x.groupby("customer_id")["amount"].transform(
-                lambda s: s.shift().expanding().mean()
-            )
+        hist = customer_history(df) if history is None else history
+        for c in hist.columns:
+            x[c] = hist[c].to_numpy()
     for c in ["_cnt_prev", "_amount_prev_mean", "dow", "month", "is_weekend"]:
         if c in x.columns:
             x[c] = x[c].fillna(0)
@@ -36,12 +42,13 @@ def make_classification_target(df: pd.DataFrame, target: str | None, q: float):
     return y, f"high_value_q{q:.2f}"
 
 
-def select_numeric_features(X: pd.DataFrame, drop: list[str]):
-    feat = (
-        X.drop(columns=drop, errors="ignore")
-        .select_dtypes(include=[np.number])
-        .fillna(0.0)
-    )
+def select_numeric_features(X: pd.DataFrame, drop: list[str], fillna: bool = True):
+    """
+    Числовые признаки без ID. fillna=False — пропуски остаются NaN
+    (для оценщиков с нативной обработкой пропусков, например hist_gb).
+    """
+    feat = X.drop(columns=drop, errors="ignore").select_dtypes(include=[np.number])
+    feat = feat.fillna(0.0) if fillna else feat.astype("float64")
     feat = feat.drop(
         columns=[c for c in feat.columns if c in ID_COLUMNS], errors="ignore"
     )
@@ -0,0 +1,340 @@
+"""
+История покупок клиента (RFM) для ML-признаков — векторно, без groupby/lambda.
+
+Строки один раз сортируются по (customer_id, order_date, исходная позиция),
+дальше всё считается по массивам: сдвинутые cumsum/cumcount внутри клиента,
+окна 30/90/365 дней — через searchsorted по составному ключу (клиент, время)
+и префиксные суммы. Результат возвращается в исходном порядке строк.
+
+Для инкрементального режима сохраняется состояние по клиентам:
+итоги (число заказов, сумма) и «хвост» заказов за последние 365 дней —
+его достаточно, чтобы посчитать признаки новых заказов без всей истории.
+Для онлайн-скоринга состояние индексируется один раз (index_history_state),
+а признаки пакета считаются только по его клиентам (history_features).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+HISTORY_WINDOWS = (30, 90, 365)
+HISTORY_COLUMNS = [
+    "_cnt_prev",
+    "_amount_prev_mean",
+    "_recency_days",
+    *[f"_{k}_{w}d" for w in HISTORY_WINDOWS for k in ("freq", "monetary")],
+]
+
+_NS_IN_SEC = 10**9
+_SEC_IN_DAY = 86_400
+_NAT_KEY = np.iinfo(np.int64).max
+
+
+def _columns(df: pd.DataFrame) -> Tuple[pd.Series, np.ndarray, np.ndarray]:
+    """customer_id, время (int64 ns; NaT -> _NAT_KEY) и amount (float, NaN)."""
+    cust = df["customer_id"]
+    if "order_date" in df.columns:
+        dt = pd.to_datetime(df["order_date"], errors="coerce")
+        t = dt.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        t = np.where(dt.isna().to_numpy(), _NAT_KEY, t)
+    else:
+        t = np.full(len(df), _NAT_KEY, dtype=np.int64)
+    if "amount" in df.columns:
+        amount = pd.to_numeric(df["amount"], errors="coerce").to_numpy(
+            dtype=float, na_value=np.nan
+        )
+    else:
+        amount = np.full(len(df), np.nan)
+    return cust, t, amount
+
+
+def _history_arrays(
+    cust: pd.Series,
+    t: np.ndarray,
+    amount: np.ndarray,
+    base: Dict[str, np.ndarray] | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Ядро: признаки истории в исходном порядке строк.
+    base — смещения по строкам (cnt/amount_sum/amount_cnt) из сохранённого
+    состояния: заказы клиента, не попавшие в переданный кадр.
+    """
+    n = len(t)
+    codes = pd.factorize(cust, use_na_sentinel=True)[0].astype(np.int64) + 1
+    has_cust = codes > 0
+    order = np.lexsort((np.arange(n), t, codes))
+    g = codes[order]
+    ts = t[order]
+    a = amount[order]
+
+    idx = np.arange(n)
+    new_group = np.r_[True, g[1:] != g[:-1]] if n else np.zeros(0, dtype=bool)
+    start = np.maximum.accumulate(np.where(new_group, idx, 0)) if n else idx
+
+    a_ok = ~np.isnan(a)
+    csum = np.r_[0.0, np.cumsum(np.where(a_ok, a, 0.0))]
+    ccnt = np.r_[0, np.cumsum(a_ok)]
+    cnt_prev = (idx - start).astype(float)
+    sum_prev = csum[idx] - csum[start]
+    acnt_prev = (ccnt[idx] - ccnt[start]).astype(float)
+
+    valid_t = ts != _NAT_KEY
+    prev_ok = ~new_group & valid_t & np.r_[False, valid_t[:-1]]
+    recency = np.full(n, -1.0)
+    if n:
+        dt_prev = np.r_[0, np.diff(ts)]
+        recency[prev_ok] = dt_prev[prev_ok] / (_NS_IN_SEC * _SEC_IN_DAY)
+
+    # составной ключ: группы не пересекаются, т.к. шаг больше span + max окна
+    out: Dict[str, np.ndarray] = {}
+    if valid_t.any():
+        sec = np.zeros(n, dtype=np.int64)
+        tmin = ts[valid_t].min()
+        sec[valid_t] = (ts[valid_t] - tmin) // _NS_IN_SEC
+        span = int(sec.max())
+        sec[~valid_t] = span
+        step = span + max(HISTORY_WINDOWS) * _SEC_IN_DAY + 1
+        key = g * step + sec
+    else:
+        key = None
+    for w in HISTORY_WINDOWS:
+        if key is None:
+            freq = np.zeros(n)
+            money = np.zeros(n)
+        else:
+            left = np.searchsorted(key, key - w * _SEC_IN_DAY, side="left")
+            freq = np.where(valid_t, idx - left, 0).astype(float)
+            money = np.where(valid_t, csum[idx] - csum[left], 0.0)
+        out[f"_freq_{w}d"] = freq
+        out[f"_monetary_{w}d"] = money
+
+    if base is not None:
+        cnt_prev = cnt_prev + base["cnt"][order]
+        sum_prev = sum_prev + base["amount_sum"][order]
+        acnt_prev = acnt_prev + base["amount_cnt"][order]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_prev = np.where(acnt_prev > 0, sum_prev / acnt_prev, np.nan)
+    out["_cnt_prev"] = cnt_prev
+    out["_amount_prev_mean"] = mean_prev
+    out["_recency_days"] = recency
+
+    # без клиента истории нет
+    no_cust = ~has_cust[order]
+    inv = np.empty(n, dtype=np.int64)
+    inv[order] = idx
+    res = {}
+    for c in HISTORY_COLUMNS:
+        v = out[c]
+        fill = -1.0 if c == "_recency_days" else 0.0
+        if c == "_amount_prev_mean":
+            fill = np.nan
+        res[c] = np.where(no_cust, fill, v)[inv]
+    return res
+
+
+def customer_history(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Признаки истории клиента для каждой строки (по заказам строго раньше неё
+    в порядке order_date; при равных датах — в исходном порядке строк):
+    _cnt_prev, _amount_prev_mean, _recency_days (-1 — нет предыдущего заказа),
+    _freq_{30,90,365}d / _monetary_{30,90,365}d.
+    """
+    if "customer_id" not in df.columns:
+        return pd.DataFrame(index=df.index)
+    cust, t, amount = _columns(df)
+    return pd.DataFrame(_history_arrays(cust, t, amount), index=df.index)
+
+
+# --- состояние для инкрементального расчёта ---
+def _state_frames(cust: pd.Series, t: np.ndarray, amount: np.ndarray):
+    hist = pd.DataFrame(
+        {
+            "customer_id": cust.to_numpy(),
+            "t": t,
+            "amount": amount,
+        }
+    ).dropna(subset=["customer_id"])
+    g = hist.groupby("customer_id", sort=True)
+    totals = pd.DataFrame(
+        {
+            "cnt": g.size(),
+            "amount_sum": g["amount"].sum(),
+            "amount_cnt": g["amount"].count(),
+        }
+    ).reset_index()
+    dated = hist[hist["t"] != _NAT_KEY]
+    last = dated.groupby("customer_id")["t"].transform("max")
+    horizon = max(HISTORY_WINDOWS) * _SEC_IN_DAY * _NS_IN_SEC
+    tail = dated[dated["t"] >= last - horizon].sort_values(
+        ["customer_id", "t"], kind="stable"
+    )
+    tail = tail.assign(order_date=pd.to_datetime(tail["t"]))[
+        ["customer_id", "order_date", "amount"]
+    ]
+    return totals, tail.reset_index(drop=True)
+
+
+def build_history_state(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Состояние по клиентам: totals (cnt/amount_sum/amount_cnt) и tail (365 дн.)."""
+    if "customer_id" not in df.columns:
+        return {"totals": pd.DataFrame(), "tail": pd.DataFrame()}
+    totals, tail = _state_frames(*_columns(df))
+    return {"totals": totals, "tail": tail}
+
+
+def update_history(
+    new_df: pd.DataFrame, state: Dict[str, pd.DataFrame]
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Признаки для новых заказов по сохранённому состоянию + обновлённое состояние.
+    Предполагается, что новые заказы не раньше уже учтённых (дозагрузка).
+    """
+    totals = state.get("totals")
+    tail = state.get("tail")
+    if (
+        "customer_id" not in new_df.columns
+        or totals is None
+        or totals.empty
+        or tail is None
+    ):
+        feats = customer_history(new_df)
+        return feats, build_history_state(new_df)
+
+    cust_new, t_new, a_new = _columns(new_df)
+    ctx = tail[tail["customer_id"].isin(cust_new.dropna().unique())]
+    ctx_cust, ctx_t, ctx_a = _columns(ctx)
+
+    cust = pd.concat([ctx_cust, cust_new], ignore_index=True)
+    t = np.r_[ctx_t, t_new]
+    amount = np.r_[ctx_a, a_new]
+
+    # заказы клиента из состояния, которых нет в хвосте, — смещения
+    ctx_g = pd.DataFrame({"customer_id": ctx_cust.to_numpy(), "amount": ctx_a})
+    ctx_g = ctx_g.groupby("customer_id")["amount"].agg(["size", "sum", "count"])
+    off = totals.set_index("customer_id")
+    off = pd.DataFrame(
+        {
+            "cnt": off["cnt"].sub(ctx_g["size"], fill_value=0),
+            "amount_sum": off["amount_sum"].sub(ctx_g["sum"], fill_value=0),
+            "amount_cnt": off["amount_cnt"].sub(ctx_g["count"], fill_value=0),
+        }
+    )
+    base = {
+        k: cust.map(off[k]).fillna(0).to_numpy(dtype=float)
+        for k in ("cnt", "amount_sum", "amount_cnt")
+    }
+    res = _history_arrays(cust, t, amount, base=base)
+    n_ctx = len(ctx)
+    feats = pd.DataFrame({c: v[n_ctx:] for c, v in res.items()}, index=new_df.index)
+
+    # обновляем состояние: итоги складываем, хвост пересчитываем по клиентам
+    add_totals, _ = _state_frames(cust_new, t_new, a_new)
+    merged = (
+        pd.concat([totals, add_totals])
+        .groupby("customer_id", sort=True)[["cnt", "amount_sum", "amount_cnt"]]
+        .sum()
+        .reset_index()
+    )
+    _, new_tail = _state_frames(
+        pd.concat([tail["customer_id"], cust_new], ignore_index=True),
+        np.r_[_columns(tail)[1], t_new],
+        np.r_[tail["amount"].to_numpy(dtype=float), a_new],
+    )
+    return feats, {"totals": merged, "tail": new_tail}
+
+
+def index_history_state(state: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Состояние для чтения: totals и tail с отсортированным индексом customer_id
+    (хвост внутри клиента остаётся по времени). Строится один раз при загрузке.
+    """
+    return {
+        "totals": state["totals"].set_index("customer_id").sort_index(),
+        "tail": state["tail"].set_index("customer_id").sort_index(kind="stable"),
+    }
+
+
+def history_context(
+    indexed: Dict[str, pd.DataFrame], customer_ids: pd.Series
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Только чтение: хвост заказов клиентов customer_ids и смещения итогов
+    (cnt/amount_sum/amount_cnt заказов вне хвоста) по customer_id.
+    indexed — из index_history_state; поиск по индексу, состояние не пересобирается.
+    """
+    ids = pd.Index(pd.unique(pd.Series(customer_ids).dropna())).sort_values()
+    tail = indexed["tail"]
+    lo = tail.index.searchsorted(ids, side="left")
+    hi = tail.index.searchsorted(ids, side="right")
+    sizes = hi - lo
+    pos = np.repeat(lo - np.r_[0, np.cumsum(sizes)[:-1]], sizes) + np.arange(
+        sizes.sum()
+    )
+    ctx = tail.iloc[pos].reset_index()
+
+    cols = ["cnt", "amount_sum", "amount_cnt"]
+    off = indexed["totals"][cols].reindex(ids).fillna(0).astype(float)
+    ctx_a = pd.to_numeric(ctx["amount"], errors="coerce")
+    in_tail = ctx_a.groupby(ctx["customer_id"].to_numpy()).agg(["size", "sum", "count"])
+    off["cnt"] = off["cnt"].sub(in_tail["size"], fill_value=0)
+    off["amount_sum"] = off["amount_sum"].sub(in_tail["sum"], fill_value=0)
+    off["amount_cnt"] = off["amount_cnt"].sub(in_tail["count"], fill_value=0)
+    return ctx, off
+
+
+def history_features(
+    new_df: pd.DataFrame, indexed: Dict[str, pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Признаки новых заказов только по состоянию: заказы new_df друг другу
+    историей не служат (у каждой строки — своя группа «хвост клиента + заказ»).
+    Состояние не меняется; работа пропорциональна клиентам пакета.
+    """
+    if "customer_id" not in new_df.columns:
+        return customer_history(new_df)
+    cust_new, t_new, a_new = _columns(new_df)
+    ctx, off = history_context(indexed, cust_new)
+    n = len(new_df)
+    rows = pd.DataFrame({"row": np.arange(n), "customer_id": cust_new.to_numpy()})
+    rep = rows.dropna(subset=["customer_id"]).merge(ctx, on="customer_id")
+    rep_cust, rep_t, rep_a = _columns(rep)
+    own = pd.Series(np.where(cust_new.isna().to_numpy(), np.nan, np.arange(n)))
+    group = pd.concat([rep["row"].astype(float), own], ignore_index=True)
+    base_cust = pd.concat([rep_cust, cust_new], ignore_index=True)
+    base = {
+        k: base_cust.map(off[k]).fillna(0).to_numpy(dtype=float)
+        for k in ("cnt", "amount_sum", "amount_cnt")
+    }
+    res = _history_arrays(group, np.r_[rep_t, t_new], np.r_[rep_a, a_new], base=base)
+    m = len(rep)
+    return pd.DataFrame({c: v[m:] for c, v in res.items()}, index=new_df.index)
+
+
+def save_history_state(state: Dict[str, pd.DataFrame], path: str | Path) -> None:
+    """Сохраняет состояние в каталог path: totals.parquet, tail.parquet."""
+    p = Path(path)
+    p.mkdir(parents=True, exist_ok=True)
+    for name in ("totals", "tail"):
+        state[name].to_parquet(p / f"{name}.parquet", index=False)
+    log.info(
+        "Состояние истории клиентов сохранено: %s (клиентов: %d, хвост: %d)",
+        p,
+        len(state["totals"]),
+        len(state["tail"]),
+    )
+
+
+def load_history_state(path: str | Path) -> Dict[str, pd.DataFrame] | None:
+    """Загружает состояние, сохранённое save_history_state; None — если его нет."""
+    p = Path(path)
+    if not (p / "totals.parquet").exists() or not (p / "tail.parquet").exists():
+        return None
+    return {name: pd.read_parquet(p / f"{name}.parquet") for name in ("totals", "tail")}
@@ -0,0 +1,172 @@
+"""
+Метрики бинарной классификации по всем порогам за одну сортировку.
+
+Вероятности сортируются один раз по убыванию; накопленные суммы
+положительных/отрицательных дают TP/FP для каждого различного порога,
+а из них — ROC, PR, матрицы ошибок и метрики при любом пороге без
+повторных проходов по массивам (как делали accuracy_score, f1_score,
+roc_auc_score, roc_curve и т.д. по отдельности).
+
+Порог «predict = proba >= t» — как у (proba >= 0.5) в run_classification.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+SWEEP_COLUMNS = [
+    "threshold",
+    "tp",
+    "fp",
+    "fn",
+    "tn",
+    "precision",
+    "recall",
+    "fpr",
+    "f1",
+    "accuracy",
+]
+
+
+def _div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a / b с нулём там, где b == 0 (zero_division=0 в sklearn)."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    return np.divide(a, b, out=np.zeros_like(a), where=b != 0)
+
+
+def threshold_sweep(y_true, proba) -> pd.DataFrame:
+    """
+    Таблица по всем различным порогам (по убыванию): при пороге t
+    положительными считаются proba >= t. Одна сортировка + cumsum.
+    """
+    y = np.asarray(y_true).astype(bool)
+    s = np.asarray(proba, dtype=float)
+    order = np.argsort(-s, kind="mergesort")
+    s, y = s[order], y[order]
+    # последний индекс каждой группы одинаковых вероятностей
+    last = (
+        np.r_[np.flatnonzero(np.diff(s)), len(s) - 1] if len(s) else np.array([], int)
+    )
+    tp = np.cumsum(y)[last]
+    fp = last + 1 - tp
+    pos = int(y.sum())
+    neg = int(len(y) - pos)
+    fn = pos - tp
+    tn = neg - fp
+    precision = _div(tp, tp + fp)
+    recall = _div(tp, np.full(len(tp), pos))
+    return pd.DataFrame(
+        {
+            "threshold": s[last],
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "tn": tn,
+            "precision": precision,
+            "recall": recall,
+            "fpr": _div(fp, np.full(len(fp), neg)),
+            "f1": _div(2 * precision * recall, precision + recall),
+            "accuracy": _div(tp + tn, np.full(len(tp), len(y))),
+        },
+        columns=SWEEP_COLUMNS,
+    )
+
+
+def _totals(sweep: pd.DataFrame) -> Tuple[int, int]:
+    if sweep.empty:
+        return 0, 0
+    first = sweep.iloc[0]
+    return int(first["tp"] + first["fn"]), int(first["fp"] + first["tn"])
+
+
+def roc_points(sweep: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """(fpr, tpr) с начальной точкой (0, 0) — как roc_curve."""
+    fpr = np.r_[0.0, sweep["fpr"].to_numpy()]
+    tpr = np.r_[0.0, sweep["recall"].to_numpy()]
+    return fpr, tpr
+
+
+def pr_points(sweep: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """(recall, precision) с начальной точкой (0, 1) — как precision_recall_curve."""
+    rec = np.r_[0.0, sweep["recall"].to_numpy()]
+    prec = np.r_[1.0, sweep["precision"].to_numpy()]
+    return rec, prec
+
+
+def roc_auc(sweep: pd.DataFrame) -> float:
+    fpr, tpr = roc_points(sweep)
+    pos, neg = _totals(sweep)
+    if pos == 0 or neg == 0:
+        return float("nan")
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2.0))
+
+
+def average_precision(sweep: pd.DataFrame) -> float:
+    """AP = sum((R_n - R_{n-1}) * P_n) — определение average_precision_score."""
+    rec = np.r_[0.0, sweep["recall"].to_numpy()]
+    return float(np.sum(np.diff(rec) * sweep["precision"].to_numpy()))
+
+
+def metrics_at(sweep: pd.DataFrame, threshold: float) -> Dict[str, Any]:
+    """Метрики и матрица ошибок при пороге threshold (proba >= threshold)."""
+    pos, neg = _totals(sweep)
+    # пороги по убыванию: k — сколько из них >= threshold
+    k = int(np.searchsorted(-sweep["threshold"].to_numpy(), -threshold, "right"))
+    if k:
+        row = sweep.iloc[k - 1]
+        tp, fp = int(row["tp"]), int(row["fp"])
+    else:
+        tp = fp = 0
+    fn, tn = pos - tp, neg - fp
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / pos if pos else 0.0
+    return {
+        "threshold": float(threshold),
+        "accuracy": (tp + tn) / (pos + neg) if pos + neg else 0.0,
+        "precision": precision,
+        "recall": recall,
+        "f1": (
+            2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        ),
+        "confusion": np.array([[tn, fp], [fn, tp]]),
+    }
+
+
+def optimal_threshold(
+    sweep: pd.DataFrame,
+    target_precision: float | None = None,
+    target_recall: float | None = None,
+) -> float | None:
+    """
+    Порог под цель:
+      target_precision — максимум recall среди порогов с precision >= цели;
+      target_recall    — максимум precision среди порогов с recall >= цели;
+      без цели         — максимум F1.
+    None, если цель недостижима. При равенстве берётся больший порог.
+    """
+    if sweep.empty:
+        return None
+    if target_precision is not None:
+        ok = sweep[sweep["precision"] >= float(target_precision)]
+        by = "recall"
+    elif target_recall is not None:
+        ok = sweep[sweep["recall"] >= float(target_recall)]
+        by = "precision"
+    else:
+        ok, by = sweep, "f1"
+    if ok.empty:
+        return None
+    # idxmax — первый максимум, т.е. наибольший порог
+    return float(ok.loc[ok[by].idxmax(), "threshold"])
+
+
+def sweep_table(sweep: pd.DataFrame, max_rows: int = 200) -> pd.DataFrame:
+    """Прореженная таблица порогов для отчёта (равномерно по строкам)."""
+    if len(sweep) <= max_rows:
+        return sweep.round(6)
+    idx = np.unique(np.linspace(0, len(sweep) - 1, max_rows).round().astype(int))
+    return sweep.iloc[idx].reset_index(drop=True).round(6)
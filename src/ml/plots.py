@@ -3,9 +3,11 @@ from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.metrics import roc_curve, precision_recall_curve
+from src.reporting.render import cached_png
 from .utils import savefig
 
 
+@cached_png
 def confusion(cm: np.ndarray, out: Path) -> str:
     plt.figure()
     plt.imshow(cm, interpolation="nearest", cmap="Blues")
@@ -19,8 +21,10 @@ def confusion(cm: np.ndarray, out: Path) -> str:
     return savefig(out)
 
 
-def roc(y_true, y_proba, out: Path) -> str:
-    fpr, tpr, _ = roc_curve(y_true, y_proba)
+@cached_png
+def roc(y_true, y_proba, out: Path, points=None) -> str:
+    """points=(fpr, tpr) — готовая кривая из metrics.roc_points, без пересчёта."""
+    fpr, tpr = points if points is not None else roc_curve(y_true, y_proba)[:2]
     plt.figure()
     plt.plot(fpr, tpr)
     plt.plot([0, 1], [0, 1], linestyle="--")
@@ -30,8 +34,13 @@ def roc(y_true, y_proba, out: Path) -> str:
     return savefig(out)
 
 
-def pr(y_true, y_proba, out: Path) -> str:
-    prec, rec, _ = precision_recall_curve(y_true, y_proba)
+@cached_png
+def pr(y_true, y_proba, out: Path, points=None) -> str:
+    """points=(recall, precision) — готовая кривая из metrics.pr_points."""
+    if points is not None:
+        rec, prec = points
+    else:
+        prec, rec, _ = precision_recall_curve(y_true, y_proba)
     plt.figure()
     plt.plot(rec, prec)
     plt.xlabel("Recall")
@@ -40,6 +49,7 @@ def pr(y_true, y_proba, out: Path) -> str:
     return savefig(out)
 
 
+@cached_png
 def reg_scatter(y_true, y_pred, out: Path) -> str:
     plt.figure()
     plt.scatter(y_true, y_pred, s=10)
@@ -49,6 +59,7 @@ def reg_scatter(y_true, y_pred, out: Path) -> str:
     return savefig(out)
 
 
+@cached_png
 def residuals(y_true, y_pred, out: Path) -> str:
     res = y_true - y_pred
     plt.figure()
@@ -59,6 +70,7 @@ def residuals(y_true, y_pred, out: Path) -> str:
     return savefig(out)
 
 
+@cached_png
 def bar(names, vals, title, out: Path) -> str:
     """Простой bar-chart для топ-фич/важностей и т.п."""
     plt.figure()
@@ -0,0 +1,160 @@
+"""
+Реестр обученных моделей (ml.registry) поверх utils.persist.save_model.
+
+Каждая модель хранится под ключом — хешем отпечатка обучающих данных,
+списка признаков, гиперпараметров оценщика и настроек задачи:
+
+    <root>/<task>/<key>/model.joblib
+    <root>/<task>/<key>/meta.json     # метрики, время обучения, схема признаков
+    <root>/<task>/<key>/images/*.png  # графики задачи
+    <root>/<task>/<key>/tables/*.parquet
+
+Если ключ совпал, обучение пропускается: модель копируется на прежнее место
+(models/<model_file>), графики — в каталог отчёта, таблицы и метрики
+берутся из meta.json.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+import sklearn
+
+from src.utils.logging import getLogger
+from .estimators import make_estimator, resolve_estimator
+from .utils import data_fingerprint, ensure_dir
+
+log = getLogger(__name__)
+
+# ключи настроек, не влияющие на результат обучения
+_VOLATILE = {"n_jobs", "warm_start", "warm_start_trees"}
+
+
+def registry_root(ml_cfg: Dict[str, Any], models_dir: Path) -> Path:
+    reg_cfg = ml_cfg.get("registry", {}) or {}
+    return Path(reg_cfg.get("root") or Path(models_dir) / "registry")
+
+
+def registry_key(task: str, X: pd.DataFrame, ml_cfg: Dict[str, Any]) -> str:
+    """Хеш: данные + признаки + гиперпараметры оценщика + настройки задачи/оценки."""
+    task_cfg = {
+        k: v for k, v in (ml_cfg.get(task, {}) or {}).items() if k not in _VOLATILE
+    }
+    name = resolve_estimator(task, task_cfg, len(X))
+    params = make_estimator(task, name).get_params()
+    payload = {
+        "task": task,
+        "data": data_fingerprint(X),
+        "features": [str(c) for c in X.columns],
+        "estimator": name,
+        "params": {k: repr(v) for k, v in sorted(params.items())},
+        "task_cfg": task_cfg,
+        "evaluation": ml_cfg.get("evaluation") or {},
+        "sklearn": sklearn.__version__,
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def load_entry(root: Path, task: str, key: str) -> Dict[str, Any] | None:
+    d = Path(root) / task / key
+    meta_p = d / "meta.json"
+    if not meta_p.exists() or not (d / "model.joblib").exists():
+        return None
+    meta = json.loads(meta_p.read_text(encoding="utf-8"))
+    meta["dir"] = str(d)
+    return meta
+
+
+def restore(entry: Dict[str, Any], out_dir: Path, models_dir: Path) -> Dict[str, Any]:
+    """Результаты задачи из реестра в формате scheduler._run_task."""
+    d = Path(entry["dir"])
+    os.utime(d)  # запись используется — не вытеснять в prune
+    ensure_dir(out_dir)
+    ensure_dir(models_dir)
+    shutil.copy2(d / "model.joblib", Path(models_dir) / entry["model_file"])
+    images = []
+    for name, caption in entry["images"]:
+        dst = Path(out_dir) / name
+        shutil.copy2(d / "images" / name, dst)
+        images.append((str(dst), caption))
+    tables_df = {
+        name: pd.read_parquet(d / "tables" / f"{name}.parquet")
+        for name in entry["tables_df"]
+    }
+    metrics = {**entry["metrics"], "reused": True}
+    return {
+        "images": images,
+        "tables": [(t, rows) for t, rows in entry["tables"]],
+        "tables_df": tables_df,
+        "metrics": metrics,
+    }
+
+
+def store(
+    root: Path,
+    task: str,
+    key: str,
+    X: pd.DataFrame,
+    result: Dict[str, Any],
+    models_dir: Path,
+) -> None:
+    """Сохраняет модель и артефакты задачи под ключом key."""
+    metrics = result.get("metrics") or {}
+    model_file = metrics.get("model_file")
+    src_model = Path(models_dir) / str(model_file)
+    if not model_file or not src_model.exists():
+        return
+    d = Path(root) / task / key
+    ensure_dir(d / "images")
+    ensure_dir(d / "tables")
+    shutil.copy2(src_model, d / "model.joblib")
+
+    images: List[List[str]] = []
+    for path, caption in result.get("images", []):
+        p = Path(path)
+        if p.exists():
+            shutil.copy2(p, d / "images" / p.name)
+            images.append([p.name, caption])
+    tables_df = []
+    for name, df in (result.get("tables_df") or {}).items():
+        if isinstance(df, pd.DataFrame):
+            df.to_parquet(d / "tables" / f"{name}.parquet", index=False)
+            tables_df.append(name)
+    meta = {
+        "task": task,
+        "key": key,
+        "model_file": model_file,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "fit_seconds": metrics.get("fit_seconds"),
+        "metrics": metrics,
+        "feature_schema": {str(c): str(t) for c, t in X.dtypes.items()},
+        "images": images,
+        "tables": [[t, rows] for t, rows in result.get("tables", [])],
+        "tables_df": tables_df,
+    }
+    (d / "meta.json").write_text(
+        json.dumps(meta, ensure_ascii=False, indent=2, default=str), "utf-8"
+    )
+    log.info("Реестр моделей: %s/%s сохранён", task, key)
+
+
+def prune(root: Path, task: str, keep: int) -> None:
+    """Оставляет keep последних записей задачи (по времени изменения)."""
+    d = Path(root) / task
+    if keep <= 0 or not d.exists():
+        return
+    entries = sorted(
+        (p for p in d.iterdir() if p.is_dir()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old in entries[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
@@ -1,9 +1,9 @@
 from __future__ import annotations
+import time
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from src.utils.persist import save_model
@@ -11,6 +11,19 @@ from src.utils.logging import getLogger
 from .features import select_numeric_features
 from .plots import reg_scatter, residuals, bar
 from .tables import rf_importance_table
+from .utils import load_previous_model
+from .tuning import run_evaluation
+from .estimators import (
+    resolve_estimator,
+    get_spec,
+    make_estimator,
+    apply_warm_start,
+    remember_training_rows,
+    warm_holdout,
+    WARM_START_MAX_TREES,
+    compare_estimators,
+    comparison_rows,
+)
 
 log = getLogger(__name__)
 
@@ -30,14 +43,56 @@ def run_regression(
         return
     try:
         y = X["amount"].astype(float)
-        feat, feat_cols = select_numeric_features(X, drop=["amount"])  # drop target
         mask = y.notna()
         y = y.loc[mask]
-        feat = feat.loc[mask]
-        log.info("Регрессия: признаков=%d", feat.shape[1])
-        Xtr, Xte, ytr, yte = train_test_split(feat, y, test_size=0.25, random_state=42)
-        reg = RandomForestRegressor(n_estimators=250, random_state=42)
+        name = resolve_estimator("regression", cfg, int(mask.sum()))
+        spec = get_spec("regression", name)
+
+        def split(handles_nan: bool):
+            f, _ = select_numeric_features(
+                X.loc[mask], drop=["amount"], fillna=not handles_nan
+            )  # drop target
+            return train_test_split(f, y, test_size=0.25, random_state=42)
+
+        Xtr, Xte, ytr, yte = split(spec["handles_nan"])
+        feat_cols = Xtr.columns.tolist()
+        log.info("Регрессия: estimator=%s, признаков=%d", name, len(feat_cols))
+        n_jobs = cfg.get("n_jobs")
+        model_path = models_dir / spec["model_file"]
+        reg = make_estimator("regression", name, n_jobs)
+        prev = None
+        warm_cfg = bool(cfg.get("warm_start", False))
+        if warm_cfg:
+            prev = load_previous_model(model_path, feat_cols)
+        warm = prev is not None and type(prev) is type(reg)
+        seen = getattr(prev, "seen_rows_", None) if warm else None
+        if warm:
+            # warm_start: старые деревья сохраняются, новые учатся на свежих данных
+            add = int(cfg.get("warm_start_trees", 50))
+            cap = int(cfg.get("warm_start_max_trees") or WARM_START_MAX_TREES)
+            warm = apply_warm_start(prev, spec, add, cap)
+            if warm:
+                reg = prev
+                if "n_jobs" in reg.get_params():
+                    reg.set_params(n_jobs=n_jobs)
+                log.info("Регрессия: warm_start, +%d деревьев/итераций", add)
+            else:
+                seen = None
+                log.info(
+                    "Регрессия: warm_start упёрся в лимит %d деревьев — обучаем заново",
+                    cap,
+                )
+        t0 = time.perf_counter()
         reg.fit(Xtr, ytr)
+        fit_seconds = time.perf_counter() - t0
+        holdout = "random"
+        if warm:
+            # тест — только строки, которых прежняя модель не видела
+            unseen, holdout = warm_holdout(seen, Xte, yte)
+            if unseen is not None:
+                Xte, yte = Xte[unseen], yte[unseen]
+        if warm_cfg:
+            remember_training_rows(reg, Xtr, ytr, seen)
         pred = reg.predict(Xte)
         mse = float(mean_squared_error(yte, pred))
         m = {
@@ -46,6 +101,11 @@ def run_regression(
             "r2": float(r2_score(yte, pred)),
             "n_train": int(len(Xtr)),
             "n_test": int(len(Xte)),
+            "estimator": name,
+            "model_file": spec["model_file"],
+            "fit_seconds": round(fit_seconds, 3),
+            "warm_start": warm,
+            "holdout": holdout,
         }
         metrics_dest["regression"] = m
         log.info("ML[regression] %s", m)
@@ -73,7 +133,28 @@ def run_regression(
                 out_dir / "reg_feature_importance.png",
             )
             images.append((img, "Важности признаков RF."))
-        model_path = models_dir / "rf_amount.joblib"
         save_model(reg, model_path)
+
+        feat_all, _ = select_numeric_features(
+            X.loc[mask], drop=["amount"], fillna=False
+        )
+        run_evaluation(
+            "regression", name, feat_all, y, ml_cfg, n_jobs, tables, tables_df
+        )
+
+        compare = list(cfg.get("compare") or [])
+        if compare:
+
+            def score(model, Xv, yv):
+                pv = model.predict(Xv)
+                return {
+                    "rmse": np.sqrt(mean_squared_error(yv, pv)),
+                    "mae": mean_absolute_error(yv, pv),
+                    "r2": r2_score(yv, pv),
+                }
+
+            dfc = compare_estimators("regression", compare, split, score, n_jobs)
+            tables.append(("Сравнение моделей: регрессия", comparison_rows(dfc)))
+            tables_df["model_comparison_regression"] = dfc
     except Exception as e:
         log.exception("Ошибка регрессии: %s", e)
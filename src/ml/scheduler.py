@@ -0,0 +1,156 @@
+"""
+Планировщик обучения ML-задач (классификация, регрессия).
+
+Задачи независимы, поэтому при ml.training.parallel они обучаются
+одновременно в отдельных процессах (pyplot не потокобезопасен). Общий бюджет
+ядер ml.training.n_jobs делится между задачами: каждая получает свой n_jobs
+для оценщика и такой же лимит потоков BLAS/OpenMP (threadpoolctl), чтобы
+процессы не конкурировали за ядра. Результаты собираются в фиксированном
+порядке задач — как при последовательном запуске.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from src.reporting.render import get_cache
+from src.utils.logging import getLogger
+from .classification import run_classification
+from .regression import run_regression
+from . import registry
+
+try:
+    from threadpoolctl import threadpool_limits
+
+    _TPC_OK = True
+except Exception:
+    threadpool_limits = None
+    _TPC_OK = False
+
+log = getLogger(__name__)
+
+TASKS: List[Tuple[str, Callable[..., None]]] = [
+    ("classification", run_classification),
+    ("regression", run_regression),
+]
+
+
+def _budget(train_cfg: Dict[str, Any], n_tasks: int) -> int:
+    """Ядер на задачу: n_jobs (-1/None — все) делится между задачами."""
+    total = train_cfg.get("n_jobs", -1)
+    cpus = os.cpu_count() or 1
+    total = cpus if total in (None, -1) else max(1, int(total))
+    return max(1, total // max(1, n_tasks))
+
+
+def _run_task(
+    name: str,
+    X: pd.DataFrame,
+    ml_cfg: Dict[str, Any],
+    out_dir: Path,
+    models_dir: Path,
+    n_jobs: int,
+) -> Dict[str, Any]:
+    """Одна задача со своими контейнерами результатов (для процесса-исполнителя)."""
+    fn = dict(TASKS)[name]
+    reg_cfg = ml_cfg.get("registry", {}) or {}
+    use_registry = bool(reg_cfg.get("enabled", True)) and not bool(
+        (ml_cfg.get(name, {}) or {}).get("warm_start", False)
+    )
+    if use_registry:
+        root = registry.registry_root(ml_cfg, models_dir)
+        key = registry.registry_key(name, X, ml_cfg)
+        entry = registry.load_entry(root, name, key)
+        if entry is not None:
+            log.info(
+                "ML[%s]: данные и настройки не изменились — модель %s из реестра",
+                name,
+                key,
+            )
+            return registry.restore(entry, out_dir, models_dir)
+    task_cfg = dict(ml_cfg.get(name, {}) or {})
+    task_cfg.setdefault("n_jobs", n_jobs)
+    cfg = {**ml_cfg, name: task_cfg}
+    images: List[Tuple[str, str]] = []
+    tables: List[Tuple[str, List[List[str]]]] = []
+    tables_df: Dict[str, Any] = {}
+    metrics: Dict[str, Any] = {}
+    cache = get_cache()
+    since = cache.counts() if cache is not None else None
+    if _TPC_OK:
+        with threadpool_limits(limits=n_jobs):
+            fn(X, cfg, out_dir, models_dir, images, tables, tables_df, metrics)
+    else:
+        fn(X, cfg, out_dir, models_dir, images, tables, tables_df, metrics)
+    if cache is not None:
+        # счётчики кэша графиков живут в процессе задачи — логируем здесь
+        cache.log_stats(f"ML {name}", since)
+    result = {
+        "images": images,
+        "tables": tables,
+        "tables_df": tables_df,
+        "metrics": metrics.get(name, {}),
+    }
+    if use_registry and result["metrics"]:
+        try:
+            registry.store(root, name, key, X, result, models_dir)
+            registry.prune(root, name, int(reg_cfg.get("keep", 5)))
+        except Exception:
+            log.exception("ML[%s]: не удалось сохранить модель в реестр", name)
+    return result
+
+
+def run_training(
+    X: pd.DataFrame,
+    ml_cfg: Dict[str, Any],
+    out_dir: Path,
+    models_dir: Path,
+    images: List[Tuple[str, str]],
+    tables,
+    tables_df,
+    metrics: Dict[str, Any],
+) -> None:
+    """Обучает включённые задачи и дописывает результаты в переданные контейнеры."""
+    train_cfg = ml_cfg.get("training", {}) or {}
+    names = [
+        n for n, _ in TASKS if bool((ml_cfg.get(n, {}) or {}).get("enabled", True))
+    ]
+    if not names:
+        return
+    parallel = bool(train_cfg.get("parallel", True)) and len(names) > 1
+    n_jobs = _budget(train_cfg, len(names) if parallel else 1)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    if parallel:
+        log.info("ML: параллельное обучение %s (n_jobs на задачу: %d)", names, n_jobs)
+        with ProcessPoolExecutor(max_workers=len(names)) as ex:
+            futures = {
+                n: ex.submit(_run_task, n, X, ml_cfg, out_dir, models_dir, n_jobs)
+                for n in names
+            }
+            for n, fut in futures.items():
+                try:
+                    results[n] = fut.result()
+                except Exception:
+                    log.exception("ML: задача '%s' завершилась с ошибкой", n)
+    else:
+        for n in names:
+            try:
+                results[n] = _run_task(n, X, ml_cfg, out_dir, models_dir, n_jobs)
+            except Exception:
+                log.exception("ML: задача '%s' завершилась с ошибкой", n)
+
+    for n in names:
+        res = results.get(n)
+        if not res:
+            continue
+        images.extend(res["images"])
+        tables.extend(res["tables"])
+        tables_df.update(res["tables_df"])
+        if res["metrics"]:
+            metrics[n] = res["metrics"]
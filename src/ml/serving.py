@@ -0,0 +1,106 @@
+"""
+Загрузка сохранённых моделей и применение их к новым заказам.
+
+Модели читаются через joblib с mmap_mode="r" (массивы деревьев/коэффициентов
+не копируются в память процесса) и держатся в LRU-кэше по (путь, mtime):
+переобученная модель с тем же именем подхватывается автоматически.
+Признаки строятся теми же build_features/select_numeric_features, что и при
+обучении, и выравниваются по feature_names_in_ модели.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import getLogger
+from .estimators import DEFAULTS, ESTIMATORS
+from .features import build_features, select_numeric_features
+
+log = getLogger(__name__)
+
+MODEL_CACHE_SIZE = 8
+
+# колонки с прогнозами по задачам
+OUTPUT_COLUMNS = {"classification": "p_high_value", "regression": "amount_pred"}
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _load_cached(path: str, mtime_ns: int):
+    import joblib
+
+    log.info("Загрузка модели (mmap): %s", path)
+    return joblib.load(path, mmap_mode="r")
+
+
+def load_model(path: str | Path):
+    """Модель из LRU-кэша; ключ — (абсолютный путь, mtime), mmap_mode='r'."""
+    p = Path(path).resolve()
+    return _load_cached(str(p), p.stat().st_mtime_ns)
+
+
+def clear_model_cache() -> None:
+    _load_cached.cache_clear()
+
+
+def model_path(task: str, ml_cfg: Dict[str, Any]) -> Path | None:
+    """
+    Файл модели задачи в models_dir: сначала оценщик из конфига,
+    затем любой другой сохранённый из реестра (для estimator: auto).
+    """
+    models_dir = Path(ml_cfg.get("models_dir", "models"))
+    cfg = ml_cfg.get(task, {}) or {}
+    est = str(cfg.get("estimator") or DEFAULTS[task]).lower()
+    names = [est] if est in ESTIMATORS[task] else []
+    names += [DEFAULTS[task], *ESTIMATORS[task]]
+    for name in dict.fromkeys(names):
+        p = models_dir / ESTIMATORS[task][name]["model_file"]
+        if p.exists():
+            return p
+    return None
+
+
+def _handles_nan(model) -> bool:
+    return type(model).__name__.startswith("HistGradientBoosting")
+
+
+def feature_matrix(X: pd.DataFrame, model) -> pd.DataFrame:
+    """Числовые признаки в порядке и составе, на которых обучалась модель."""
+    nan_ok = _handles_nan(model)
+    feat, _ = select_numeric_features(X, drop=["amount"], fillna=not nan_ok)
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return feat
+    fill = np.nan if nan_ok else 0.0
+    return feat.reindex(columns=list(names), fill_value=fill)
+
+
+def predict(task: str, model, X: pd.DataFrame) -> np.ndarray:
+    """Вероятность high_value (классификация) или прогноз amount (регрессия)."""
+    feat = feature_matrix(X, model)
+    if task == "classification":
+        return model.predict_proba(feat)[:, 1]
+    return model.predict(feat)
+
+
+def score_frame(
+    df: pd.DataFrame,
+    models: Dict[str, Any],
+    history: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """
+    Прогнозы для кадра заказов. models — {task: модель}; history — признаки
+    истории клиента (history.update_history), иначе считаются по df.
+    """
+    X = build_features(df, history=history)
+    out = pd.DataFrame(index=df.index)
+    for col in ("order_id", "customer_id"):
+        if col in df.columns:
+            out[col] = df[col]
+    for task, model in models.items():
+        out[OUTPUT_COLUMNS[task]] = predict(task, model, X)
+    return out.reset_index(drop=True)
@@ -5,12 +5,43 @@ import pandas as pd
 from src.utils.logging import getLogger
 from .utils import ensure_dir
 from .features import build_features
-from .classification import run_classification
-from .regression import run_regression
+from .history import build_history_state, save_history_state
+from . import feature_store
+from .scheduler import run_training
 
 log = getLogger(__name__)
 
 
+def _save_history_state(df: pd.DataFrame, ml_cfg: Dict[str, Any], models_dir: Path):
+    """Состояние истории клиентов — для инкрементального расчёта признаков."""
+    hist_cfg = ml_cfg.get("history", {}) or {}
+    if not bool(hist_cfg.get("persist_state", True)):
+        return
+    try:
+        state_dir = Path(hist_cfg.get("state_dir") or models_dir / "customer_history")
+        save_history_state(build_history_state(df), state_dir)
+    except Exception:
+        log.exception("Не удалось сохранить состояние истории клиентов — пропускаем")
+
+
+def _features(df: pd.DataFrame, ml_cfg: Dict[str, Any]) -> pd.DataFrame:
+    """build_features напрямую или через feature store (ml.feature_store)."""
+    fs_cfg = ml_cfg.get("feature_store", {}) or {}
+    if not bool(fs_cfg.get("enabled", False)):
+        return build_features(df)
+    if "order_id" not in df.columns:
+        log.warning("Feature store: нет order_id — признаки строим напрямую")
+        return build_features(df)
+    root = fs_cfg.get("root", "data/feature_store")
+    sets = list(fs_cfg.get("sets") or feature_store.FEATURE_SETS)
+    if "order_features" not in sets:
+        sets.insert(0, "order_features")
+    tables = feature_store.materialize(df, root, sets)
+    if "order_features" not in tables:
+        return build_features(df)
+    return tables["order_features"].drop(columns=["order_id"])
+
+
 def run_ml(df_cleaned: pd.DataFrame, cfg: Dict[str, Any]) -> Dict[str, Any]:
     ml_cfg = cfg.get("ml") or {}
     if not ml_cfg or not bool(ml_cfg.get("enabled", True)):
@@ -35,16 +66,14 @@ def run_ml(df_cleaned: pd.DataFrame, cfg: Dict[str, Any]) -> Dict[str, Any]:
     ensure_dir(out_dir)
     ensure_dir(models_dir)
 
-    X = build_features(df_cleaned)
+    X = _features(df_cleaned, ml_cfg)
+    _save_history_state(df_cleaned, ml_cfg, models_dir)
     images: List[Tuple[str, str]] = []
     metrics: Dict[str, Any] = {"classification": {}, "regression": {}}
     tables: List[Tuple[str, List[List[str]]]] = []
     tables_df: Dict[str, Any] = {}
 
-    run_classification(
-        X, ml_cfg, out_dir, models_dir, images, tables, tables_df, metrics
-    )
-    run_regression(X, ml_cfg, out_dir, models_dir, images, tables, tables_df, metrics)
+    run_training(X, ml_cfg, out_dir, models_dir, images, tables, tables_df, metrics)
 
     return {
         "metrics": metrics,
@@ -0,0 +1,241 @@
+"""
+Оценка моделей K-fold CV и подбор гиперпараметров (ml.evaluation).
+
+Разбиения на фолды считаются один раз и переиспользуются CV и поиском;
+матрица признаков один раз переводится в непрерывный float64-массив, так
+что процессы joblib получают одни и те же данные без повторных
+преобразований DataFrame. Заполнение пропусков — шаг Pipeline внутри
+фолда: оно дешевле записи фолда на диск, поэтому преобразования не
+кэшируются (joblib.Memory).
+
+Поиск — HalvingRandomSearchCV (последовательное отсечение кандидатов
+на растущих подвыборках); на больших данных дополнительно ограничивается
+max_rows строк, чтобы подбор оставался дешёвым.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import (
+    HalvingRandomSearchCV,
+    KFold,
+    StratifiedKFold,
+    cross_validate,
+)
+from sklearn.pipeline import Pipeline
+
+from src.utils.logging import getLogger
+from .estimators import comparison_rows, get_spec, make_estimator
+
+log = getLogger(__name__)
+
+SCORING = {
+    "regression": {
+        "rmse": "neg_root_mean_squared_error",
+        "mae": "neg_mean_absolute_error",
+        "r2": "r2",
+    },
+    "classification": {"roc_auc": "roc_auc", "f1": "f1", "accuracy": "accuracy"},
+}
+# метрика для отбора кандидатов поиска
+SEARCH_METRIC = {"regression": "rmse", "classification": "roc_auc"}
+SEARCH_SCORING = {t: SCORING[t][m] for t, m in SEARCH_METRIC.items()}
+
+SEARCH_SPACES: Dict[Tuple[str, str], Dict[str, Any]] = {
+    ("regression", "random_forest"): {
+        "n_estimators": [100, 250, 400],
+        "max_depth": [None, 8, 16, 32],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": [1.0, 0.5, "sqrt"],
+    },
+    ("regression", "hist_gb"): {
+        "learning_rate": loguniform(0.02, 0.3),
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [10, 20, 50],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+    ("classification", "logreg"): {"C": loguniform(1e-3, 1e2)},
+    ("classification", "hist_gb"): {
+        "learning_rate": loguniform(0.02, 0.3),
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [10, 20, 50],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+}
+
+
+def make_folds(y: np.ndarray, task: str, k: int, seed: int = 42) -> List[tuple]:
+    """Индексы фолдов (стратифицированные для классификации) — считаются один раз."""
+    splitter = (
+        StratifiedKFold(n_splits=k, shuffle=True, random_state=seed)
+        if task == "classification"
+        else KFold(n_splits=k, shuffle=True, random_state=seed)
+    )
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def _pipeline(task: str, name: str, n_jobs: int | None) -> Pipeline:
+    """Заполнение пропусков (если оценщик их не умеет) + модель; n_jobs модели — 1,
+    параллелим по фолдам/кандидатам."""
+    steps = []
+    if not get_spec(task, name)["handles_nan"]:
+        # то же, что fillna(0.0) в select_numeric_features, но внутри фолда
+        steps.append(("impute", SimpleImputer(strategy="constant", fill_value=0.0)))
+    steps.append(("model", make_estimator(task, name, n_jobs)))
+    return Pipeline(steps)
+
+
+def _subsample(
+    X: np.ndarray, y: np.ndarray, task: str, max_rows: int, seed: int = 42
+) -> Tuple[np.ndarray, np.ndarray]:
+    if len(y) <= max_rows:
+        return X, y
+    rng = np.random.default_rng(seed)
+    if task == "classification":
+        idx = np.concatenate(
+            [
+                rng.choice(
+                    np.flatnonzero(y == c),
+                    max(1, int(max_rows * np.mean(y == c))),
+                    replace=False,
+                )
+                for c in np.unique(y)
+            ]
+        )
+    else:
+        idx = rng.choice(len(y), max_rows, replace=False)
+    idx.sort()
+    return X[idx], y[idx]
+
+
+def _metric_row(task: str, scores: Dict[str, np.ndarray]) -> Dict[str, float]:
+    row: Dict[str, float] = {}
+    for metric in SCORING[task]:
+        vals = scores[f"test_{metric}"]
+        if SCORING[task][metric].startswith("neg_"):
+            vals = -vals
+        row[metric] = round(float(np.mean(vals)), 6)
+        row[f"{metric}_std"] = round(float(np.std(vals)), 6)
+    return row
+
+
+def evaluate(
+    task: str,
+    name: str,
+    feat: pd.DataFrame,
+    y: pd.Series,
+    eval_cfg: Dict[str, Any],
+    n_jobs: int | None = None,
+) -> pd.DataFrame:
+    """
+    K-fold CV выбранного оценщика и (опционально) HalvingRandomSearchCV.
+    Возвращает строки для листа metrics: scope=cv/search, task, estimator, метрики.
+    """
+    k = int(eval_cfg.get("cv_folds", 5))
+    n_jobs = eval_cfg.get("n_jobs", n_jobs)
+
+    X_all = np.ascontiguousarray(feat.to_numpy(dtype=np.float64, na_value=np.nan))
+    y_all = y.to_numpy()
+    X_all, y_all = _subsample(
+        X_all, y_all, task, int(eval_cfg.get("max_rows", 200_000))
+    )
+    folds = make_folds(y_all, task, k)
+    rows: List[Dict[str, Any]] = []
+
+    t0 = time.perf_counter()
+    scores = cross_validate(
+        _pipeline(task, name, 1),
+        X_all,
+        y_all,
+        cv=folds,
+        scoring=SCORING[task],
+        n_jobs=n_jobs,
+    )
+    rows.append(
+        {
+            "scope": "cv",
+            "task": task,
+            "estimator": name,
+            "folds": k,
+            "rows": int(len(y_all)),
+            "seconds": round(time.perf_counter() - t0, 3),
+            **_metric_row(task, scores),
+        }
+    )
+    log.info("ML[%s] CV(%d) %s: %s", task, k, name, rows[-1])
+
+    search_cfg = eval_cfg.get("search", {}) or {}
+    space = SEARCH_SPACES.get((task, name))
+    if bool(search_cfg.get("enabled", False)) and space:
+        t0 = time.perf_counter()
+        search = HalvingRandomSearchCV(
+            _pipeline(task, name, 1),
+            {f"model__{p}": v for p, v in space.items()},
+            n_candidates=int(search_cfg.get("n_candidates", 16)),
+            factor=int(search_cfg.get("factor", 3)),
+            resource="n_samples",
+            min_resources=search_cfg.get("min_resources", "exhaust"),
+            cv=folds,
+            scoring=SEARCH_SCORING[task],
+            refit=False,
+            n_jobs=n_jobs,
+            random_state=42,
+        )
+        search.fit(X_all, y_all)
+        best = {p.removeprefix("model__"): v for p, v in search.best_params_.items()}
+        best_score = float(search.best_score_)
+        if SEARCH_SCORING[task].startswith("neg_"):
+            best_score = -best_score
+        rows.append(
+            {
+                "scope": "search",
+                "task": task,
+                "estimator": name,
+                "folds": k,
+                "rows": int(len(y_all)),
+                "seconds": round(time.perf_counter() - t0, 3),
+                "candidates": int(search.n_candidates_[0]),
+                "iterations": int(search.n_iterations_),
+                "search_metric": SEARCH_METRIC[task],
+                "best_score": round(best_score, 6),
+                "best_params": json.dumps(best, default=str, ensure_ascii=False),
+            }
+        )
+        log.info("ML[%s] поиск %s: %s", task, name, rows[-1])
+    return pd.DataFrame(rows)
+
+
+TITLES = {
+    "regression": "Кросс-валидация и подбор: регрессия",
+    "classification": "Кросс-валидация и подбор: классификация",
+}
+
+
+def run_evaluation(
+    task: str,
+    name: str,
+    feat: pd.DataFrame,
+    y: pd.Series,
+    ml_cfg: Dict[str, Any],
+    n_jobs: int | None,
+    tables,
+    tables_df,
+) -> None:
+    """Если ml.evaluation.enabled — CV/поиск и строки в tables/tables_df."""
+    eval_cfg = ml_cfg.get("evaluation", {}) or {}
+    if not bool(eval_cfg.get("enabled", False)):
+        return
+    try:
+        dfe = evaluate(task, name, feat, y, eval_cfg, n_jobs)
+        tables.append((TITLES[task], comparison_rows(dfe.dropna(axis=1, how="all"))))
+        tables_df[f"ml_metrics_{task}"] = dfe
+    except Exception:
+        log.exception("ML[%s]: ошибка кросс-валидации/подбора — пропускаем", task)
@@ -1,6 +1,10 @@
 from __future__ import annotations
+import hashlib
+import json
 from pathlib import Path
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
 ID_COLUMNS = {"order_id", "customer_id"}
 
@@ -17,3 +21,34 @@ def savefig(path: Path, title: str | None = None) -> str:
     plt.savefig(path, dpi=130)
     plt.close()
     return str(path)
+
+
+def load_previous_model(path: Path, feat_cols):
+    """Ранее сохранённая модель для warm_start — если обучена на тех же признаках."""
+    if not Path(path).exists():
+        return None
+    try:
+        import joblib
+
+        model = joblib.load(path)
+    except Exception:
+        return None
+    names = getattr(model, "feature_names_in_", None)
+    if names is None or list(names) != list(feat_cols):
+        return None
+    return model
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """Отпечаток содержимого кадра (значения + имена и типы колонок)."""
+    h = hashlib.sha1()
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def row_hashes(X: pd.DataFrame, y) -> np.ndarray:
+    """Хеши строк (признаки + цель): какие строки модель видела при обучении."""
+    frame = X.assign(_target=np.asarray(y))
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
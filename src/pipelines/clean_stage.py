@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import os
 import pandas as pd
 import numpy as np
+from pandas.tseries.api import guess_datetime_format
 
 from src.utils.logging import getLogger
 
 log = getLogger(__name__)
 
+KEY_COLUMNS = ["order_id", "customer_id", "order_date", "amount", "country"]
+
 
 def _drop_high_missing_columns(
     df: pd.DataFrame, threshold: float
@@ -24,8 +29,11 @@ def _drop_high_missing_columns(
     return df2, to_drop
 
 
-def _coerce_types(df: pd.DataFrame) -> pd.DataFrame:
-    """Аккуратно приводим типы, не падаем на ошибках."""
+def coerce_types(df: pd.DataFrame, date_format: str | None = None) -> pd.DataFrame:
+    """
+    Аккуратно приводим типы, не падаем на ошибках.
+    date_format — формат order_date; по умолчанию pandas выводит его сам.
+    """
     out = df.copy()
     if "order_id" in out.columns:
         out["order_id"] = pd.to_numeric(out["order_id"], errors="coerce").astype(
@@ -38,28 +46,34 @@ def _coerce_types(df: pd.DataFrame) -> pd.DataFrame:
     if "amount" in out.columns:
         out["amount"] = pd.to_numeric(out["amount"], errors="coerce")
     if "order_date" in out.columns:
-        out["order_date"] = pd.to_datetime(out["order_date"], errors="coerce")
+        out["order_date"] = pd.to_datetime(
+            out["order_date"], errors="coerce", format=date_format
+        )
     return out
 
 
-def run_cleaning(df_sales: pd.DataFrame, cfg: Dict) -> Tuple[pd.DataFrame, Dict]:
+def _date_format(s: pd.Series) -> str | None:
     """
-    Мини-очистка витрины продаж:
-      - приведение типов
-      - удаление столбцов с высокой долей пропусков (threshold из конфига)
-      - базовые метрики для логов/отчётов
-    Возвращает (df_cleaned, stats_dict)
+    Формат, который pandas вывел бы для всей колонки (по первому непустому
+    строковому значению); "mixed" — если не выводится. Нужен партициям, чтобы
+    каждая не угадывала формат по своей первой строке.
     """
-    cleaner_cfg = (cfg.get("processing", {}) or {}).get("cleaner", {}) or {}
-    thr = float(
+    if not (s.dtype == object or pd.api.types.is_string_dtype(s)):
+        return None
+    values = s.dropna()
+    values = values[values.astype(str).str.strip() != ""]
+    if values.empty or not isinstance(values.iloc[0], str):
+        return None
+    return guess_datetime_format(values.iloc[0]) or "mixed"
+
+
+def _threshold(cleaner_cfg: Dict) -> float:
+    return float(
         ((cleaner_cfg.get("drop_high_missing_columns", {}) or {}).get("threshold", 0.8))
     )
 
-    # 1) типы
-    df = _coerce_types(df_sales)
 
-    # 2) удалим колонки с высокой долей NaN (логируем)
-    df2, dropped = _drop_high_missing_columns(df, thr)
+def _log_dropped(dropped: List[str], thr: float) -> None:
     if dropped:
         log.info(
             "drop_high_missing_columns: dropped %d columns: %s",
@@ -69,13 +83,35 @@ def run_cleaning(df_sales: pd.DataFrame, cfg: Dict) -> Tuple[pd.DataFrame, Dict]
     else:
         log.info("drop_high_missing_columns: ничего не удалено (threshold=%.2f)", thr)
 
+
+def run_cleaning(df_sales: pd.DataFrame, cfg: Dict) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Мини-очистка витрины продаж:
+      - приведение типов
+      - удаление столбцов с высокой долей пропусков (threshold из конфига)
+      - базовые метрики для логов/отчётов
+    Возвращает (df_cleaned, stats_dict)
+    Если включено processing.cleaner.partitions — см. run_cleaning_partitioned.
+    """
+    cleaner_cfg = (cfg.get("processing", {}) or {}).get("cleaner", {}) or {}
+    part_cfg = cleaner_cfg.get("partitions", {}) or {}
+    if bool(part_cfg.get("enabled", False)):
+        return run_cleaning_partitioned(df_sales, cfg)
+    thr = _threshold(cleaner_cfg)
+
+    # 1) типы
+    df = coerce_types(df_sales)
+
+    # 2) удалим колонки с высокой долей NaN (логируем)
+    df2, dropped = _drop_high_missing_columns(df, thr)
+    _log_dropped(dropped, thr)
+
     # 3) базовые метрики
     #   - дубликаты строк (по всем колонкам)
     sales_duplicates = int(len(df2) - len(df2.drop_duplicates()))
     #   - пропуски по ключевым колонкам (если они есть)
-    key_cols = ["order_id", "customer_id", "order_date", "amount", "country"]
     sales_missing = {}
-    for c in key_cols:
+    for c in KEY_COLUMNS:
         if c in df2.columns:
             sales_missing[c] = int(df2[c].isna().sum())
 
@@ -85,3 +121,135 @@ def run_cleaning(df_sales: pd.DataFrame, cfg: Dict) -> Tuple[pd.DataFrame, Dict]
     }
 
     return df2, stats
+
+
+# --- параллельная очистка (партиции по месяцу/источнику в пуле процессов) ---
+def _partition_labels(
+    df: pd.DataFrame, by: str, date_format: str | None = None
+) -> np.ndarray:
+    """
+    Метка партиции для каждой строки: YYYY-MM по order_date (в том же
+    формате, что и при очистке) или значение колонки.
+    """
+    if by == "month" and "order_date" in df.columns:
+        d = pd.to_datetime(df["order_date"], errors="coerce", format=date_format)
+        labels = d.dt.strftime("%Y-%m")
+    elif by in df.columns:
+        labels = df[by].astype("string")
+    else:
+        log.warning("partitions: колонка для '%s' не найдена — одна партиция", by)
+        return np.zeros(len(df), dtype=np.int8)
+    return labels.fillna("NA").to_numpy(dtype=object)
+
+
+def _hash_columns(df: pd.DataFrame) -> np.ndarray:
+    """uint64-хэши значений по каждой колонке: матрица (строки x колонки)."""
+    if df.shape[1] == 0:
+        return np.zeros((len(df), 0), dtype=np.uint64)
+    return np.column_stack(
+        [pd.util.hash_pandas_object(df[c], index=False).to_numpy() for c in df.columns]
+    )
+
+
+def _combine_hashes(col_hashes: np.ndarray) -> np.ndarray:
+    """Свёртка хэшей колонок в хэш строки (FNV-подобно, переполнение uint64 — штатно)."""
+    h = np.full(col_hashes.shape[0], 0xCBF29CE484222325, dtype=np.uint64)
+    prime = np.uint64(0x100000001B3)
+    for j in range(col_hashes.shape[1]):
+        h = (h ^ col_hashes[:, j]) * prime
+    return h
+
+
+def _clean_partition(
+    part: pd.DataFrame, date_format: str | None = None
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """Работа внутри процесса: типы и пропуски по колонкам."""
+    df = coerce_types(part, date_format)
+    return df, df.isna().sum()
+
+
+def _target_dtypes(parts: List[pd.DataFrame]) -> pd.Series:
+    """
+    Типы колонок для всего кадра по типам партиций: int64 в партиции без
+    пропусков и float64 в партиции с ними -> float64, единицы datetime — самые
+    мелкие (так выводит их coerce_types по всей колонке).
+    """
+    return pd.concat([p.iloc[:0] for p in parts]).dtypes
+
+
+def run_cleaning_partitioned(
+    df_sales: pd.DataFrame, cfg: Dict
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    То же, что run_cleaning, но по партициям (processing.cleaner.partitions):
+      - by: month | source (или любая колонка) — ключ разбиения
+      - workers: число процессов (по умолчанию os.cpu_count())
+    Это параллельная очистка уже загруженного кадра, а не обработка вне
+    памяти: df_sales и результат целиком в памяти, партиции копируются в
+    процессы. Формат order_date определяется один раз по всей колонке (он же
+    — для меток месяцев), типы колонок после приведения — один раз на весь
+    кадр. Пропуски суммируются по партициям, дубликаты ищутся между
+    партициями по хэшам строк. Порядок строк результата совпадает с исходным.
+    """
+    cleaner_cfg = (cfg.get("processing", {}) or {}).get("cleaner", {}) or {}
+    part_cfg = cleaner_cfg.get("partitions", {}) or {}
+    thr = _threshold(cleaner_cfg)
+    by = str(part_cfg.get("by", "month"))
+    workers = int(part_cfg.get("workers") or os.cpu_count() or 1)
+
+    if df_sales.empty:
+        df = coerce_types(df_sales)
+        missing = {c: 0 for c in KEY_COLUMNS if c in df.columns}
+        return df, {"sales_duplicates": 0, "sales_missing": missing}
+
+    fmt = (
+        _date_format(df_sales["order_date"])
+        if "order_date" in df_sales.columns
+        else None
+    )
+    labels = _partition_labels(df_sales, by, fmt)
+    groups = pd.Series(np.arange(len(df_sales))).groupby(labels, sort=True).indices
+    positions = list(groups.values())
+    parts = [df_sales.iloc[pos] for pos in positions]
+    formats = [fmt] * len(parts)
+
+    if workers > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(parts))) as ex:
+            results = list(ex.map(_clean_partition, parts, formats))
+    else:
+        results = [_clean_partition(p, fmt) for p in parts]
+    log.info(
+        "partitions: by=%s, партиций=%d, процессов=%d",
+        by,
+        len(parts),
+        min(workers, len(parts)),
+    )
+    # типы решаются один раз на весь кадр: иначе 1 (int64) и 1.0 (float64)
+    # из разных партиций дают разные хэши и дубликаты не находятся
+    dtypes = _target_dtypes([r[0] for r in results])
+    cleaned = [r[0].astype(dtypes.to_dict()) for r in results]
+
+    # сборка в исходном порядке строк
+    order = np.argsort(np.concatenate(positions), kind="stable")
+    df = pd.concat(cleaned).iloc[order]
+
+    # глобальная доля пропусков -> удаляемые колонки
+    na_total = sum((r[1] for r in results[1:]), results[0][1])
+    na_ratio = na_total / len(df)
+    dropped = [c for c, r in na_ratio.items() if r > thr]
+    df2 = df.drop(columns=dropped) if dropped else df
+    _log_dropped(dropped, thr)
+
+    # дубликаты между партициями по хэшу строки (только по оставшимся колонкам)
+    keep = [i for i, c in enumerate(df.columns) if c not in dropped]
+    row_hashes = np.concatenate(
+        [_combine_hashes(_hash_columns(p)[:, keep]) for p in cleaned]
+    )
+    sales_duplicates = int(len(row_hashes) - len(np.unique(row_hashes)))
+
+    sales_missing = {c: int(na_total[c]) for c in KEY_COLUMNS if c in df2.columns}
+    stats = {
+        "sales_duplicates": sales_duplicates,
+        "sales_missing": sales_missing,
+    }
+    return df2, stats
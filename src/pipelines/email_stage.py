@@ -1,49 +1,103 @@
 from __future__ import annotations
+from concurrent.futures import Future, wait as wait_futures
 from pathlib import Path
 from typing import Dict, List, Any
 
-from src.reporting.email import send_email
+from src.reporting.attachments import package_attachments
+from src.reporting.mailer import get_dispatcher
 from src.utils.logging import getLogger
 
 logger = getLogger(__name__)
 
+ARTIFACT_KEYS = ("pdf", "excel", "html", "images")
 
-def send_email_with_artifacts(cfg: Dict[str, Any], artifacts: Dict[str, Any]) -> None:
+
+def _segments(cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    email.segments: [{name, to, subject?, body?, include?: [pdf, excel, html, images]}];
+    без сегментов — один сегмент «all» на email.to.
+    """
+    segments = cfg.get("segments") or [{"name": "all", "to": cfg.get("to", [])}]
+    out = []
+    for i, seg in enumerate(segments):
+        to = seg.get("to", [])
+        out.append(
+            {
+                "name": str(seg.get("name") or f"segment_{i}"),
+                "to": list(to if isinstance(to, (list, tuple)) else [to]),
+                "subject": seg.get("subject", cfg.get("subject", "Pipeline report")),
+                "body": seg.get("body", cfg.get("body", "")),
+                "include": list(seg.get("include") or ARTIFACT_KEYS),
+            }
+        )
+    return out
+
+
+def _package(
+    cfg: Dict[str, Any], artifacts: Dict[str, Any], seg: Dict[str, Any]
+) -> tuple[List[Path], str]:
+    att_cfg = dict(cfg.get("attachments") or {})
+    # у каждого сегмента свой images.zip: задания читают его параллельно
+    work_dir = Path(att_cfg.get("work_dir", "reports/email")) / seg["name"]
+    att_cfg["work_dir"] = str(work_dir)
+    chosen = {k: v for k, v in (artifacts or {}).items() if k in seg["include"]}
+    body = seg["body"]
+    try:
+        files, notes = package_attachments(chosen, att_cfg)
+        if notes:
+            body = "\n".join([body, "", "Не вложено (лимит размера письма):", *notes])
+    except Exception as e:
+        logger.error("email: ошибка упаковки вложений (ignored): %s", e)
+        files = []
+    return files, body
+
+
+def send_email_with_artifacts(
+    cfg: Dict[str, Any], artifacts: Dict[str, Any], wait: bool = True
+) -> List[Future]:
     """
-    Отправляет письмо со всеми артефактами (pdf, excel, изображения).
+    Отправляет письма с артефактами (pdf, excel, html, изображения — zip).
+    Не поместившееся в email.attachments.max_message_mb — ссылкой в тексте.
+    Письма уходят через фоновый диспетчер (src.reporting.mailer): по
+    сегментам email.segments, при per_recipient — каждому адресату отдельно.
+    wait=False — вернуть Future сразу, не дожидаясь SMTP.
     Совместимо с вызовом из runner.py.
     """
     if not cfg:
         logger.info("email: конфиг отсутствует — пропускаем отправку")
-        return
+        return []
 
     if str(cfg.get("enabled", "true")).lower() in {"false", "0", "no"}:
         logger.info("email: отключён через config — пропускаем отправку")
-        return
-
-    # Соберём список вложений
-    attachments: List[Path] = []
-    if artifacts:
-        for key in ("pdf", "excel"):
-            p = artifacts.get(key)
-            if p:
-                attachments.append(Path(p))
-        for p in artifacts.get("images", []) or []:
-            attachments.append(Path(p))
+        return []
+
+    if not ((cfg.get("smtp", {}) or {}).get("host") or cfg.get("smtp_host")):
+        logger.info("email: smtp_host пустой → отправка пропущена")
+        return []
 
+    futures: List[Future] = []
     try:
-        send_email(
-            smtp_host=cfg.get("smtp", {}).get("host") or cfg.get("smtp_host"),
-            smtp_port=int(cfg.get("smtp", {}).get("port", cfg.get("smtp_port", 25))),
-            username=cfg.get("username", ""),
-            password=cfg.get("password", ""),
-            to=cfg.get("to", []),
-            subject=cfg.get("subject", "Pipeline report"),
-            body=cfg.get("body", ""),
-            attachments=attachments,
-            use_ssl=bool(cfg.get("smtp", {}).get("use_ssl", cfg.get("use_ssl", False))),
-            from_addr=cfg.get("from", cfg.get("from_addr", "noreply@example.com")),
-        )
-        logger.info("email: письмо отправлено (вложений: %d)", len(attachments))
+        dispatcher = get_dispatcher(cfg)
+        sender = cfg.get("from", cfg.get("from_addr", "noreply@example.com"))
+        for seg in _segments(cfg):
+            if not seg["to"]:
+                continue
+            files, body = _package(cfg, artifacts, seg)
+            groups = (
+                [[r] for r in seg["to"]] if cfg.get("per_recipient") else [seg["to"]]
+            )
+            for to in groups:
+                job = {
+                    "from": sender,
+                    "to": to,
+                    "subject": seg["subject"],
+                    "body": body,
+                    "attachments": [str(p) for p in files],
+                }
+                futures.append(dispatcher.submit(job))
+        logger.info("email: писем в очереди %d", len(futures))
     except Exception as e:
         logger.error("email: ошибка при отправке (ignored): %s", e)
+    if wait and futures:
+        wait_futures(futures)
+    return futures
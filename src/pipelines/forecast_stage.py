@@ -0,0 +1,133 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from src.analysis.forecast import TOTAL, forecast_matrix, revenue_matrix
+from src.reporting.plots import forecast_plot
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+FREQ_LABELS = {"D": "по дням", "W": "по неделям", "MS": "по месяцам"}
+
+
+def _summary_rows(summary: pd.DataFrame, cur: str) -> List[List[str]]:
+    rows = [["Ряд", "Метод", f"Факт, {cur}", f"Прогноз, {cur}", "Изм., %"]]
+    for r in summary.itertuples():
+        rows.append(
+            [
+                str(r.series),
+                str(r.method),
+                f"{r.last_actual_sum:.2f}",
+                f"{r.forecast_sum:.2f}",
+                "—" if pd.isna(r.change_pct) else f"{r.change_pct:+.1f}",
+            ]
+        )
+    return rows
+
+
+def run_forecast(df_cleaned: pd.DataFrame, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Прогноз выручки (forecast.*): для каждой частоты из horizons —
+    общий ряд и ряды по измерениям by, таблицы и графики для отчётов.
+    Включается явно (forecast.enabled: true): без секции в конфиге этап
+    не запускается.
+    """
+    fc_cfg = cfg.get("forecast", {}) or {}
+    result: Dict[str, Any] = {"images": [], "tables": [], "tables_df": {}}
+    if not bool(fc_cfg.get("enabled", False)):
+        log.info("Прогноз отключён — пропускаем.")
+        return result
+
+    rep_cfg = cfg.get("reporting", {}) or {}
+    cur = (rep_cfg.get("units", {}) or {}).get("currency_label", "у.е.")
+    out_dir = (
+        Path((rep_cfg.get("plots", {}) or {}).get("output_dir", "reports/images"))
+        / "forecast"
+    )
+    date_col = fc_cfg.get("date_col", "order_date")
+    value_col = fc_cfg.get("value_col", "amount")
+    by = list(fc_cfg.get("by") or [])
+    horizons = fc_cfg.get("horizons", {"D": 30, "MS": 3}) or {}
+    seasons = fc_cfg.get("seasonal_periods", {"D": 7, "MS": 12}) or {}
+    plot_points = fc_cfg.get("plot_points", {}) or {}
+    dim_charts = set(fc_cfg.get("dimension_charts") or [])
+
+    images: List[Tuple[str, str]] = []
+    tables: List[Tuple[str, List[List[str]]]] = []
+    longs, summaries = [], []
+    for freq, horizon in horizons.items():
+        label = FREQ_LABELS.get(freq, freq)
+        try:
+            wide = revenue_matrix(
+                df_cleaned,
+                date_col,
+                value_col,
+                by,
+                freq,
+                fc_cfg.get("max_series_per_dim", 10),
+            )
+            if len(wide) < 2:
+                log.info("Прогноз %s: мало периодов (%d) — пропускаем", freq, len(wide))
+                continue
+            long, summary = forecast_matrix(
+                wide,
+                freq,
+                int(horizon),
+                seasons.get(freq),
+                fc_cfg.get("n_jobs"),
+                fc_cfg.get("cache_dir"),
+            )
+            longs.append(long)
+            summaries.append(summary)
+            tables.append(
+                (
+                    f"Прогноз выручки {label} на {int(horizon)} периодов",
+                    _summary_rows(summary, cur),
+                )
+            )
+
+            hist = wide.tail(int(plot_points[freq])) if freq in plot_points else wide
+            img = forecast_plot(
+                hist,
+                long,
+                [TOTAL],
+                out_dir / f"forecast_{freq.lower()}_total.png",
+                f"Выручка {label}: факт и прогноз",
+                f"Выручка, {cur}",
+            )
+            images.append(
+                (
+                    img,
+                    f"Прогноз выручки {label} (Holt-Winters); "
+                    "пунктир — прогноз, полоса — ±1.96σ остатков.",
+                )
+            )
+            if freq in dim_charts:
+                for dim in by:
+                    cols = [c for c in wide.columns if c.startswith(f"{dim}=")]
+                    if not cols:
+                        continue
+                    img = forecast_plot(
+                        hist,
+                        long,
+                        cols,
+                        out_dir / f"forecast_{freq.lower()}_{dim}.png",
+                        f"Выручка {label} по {dim}: факт и прогноз",
+                        f"Выручка, {cur}",
+                        band=False,
+                    )
+                    images.append((img, f"Прогноз выручки {label} в разрезе {dim}."))
+        except Exception:
+            log.exception("Прогноз %s: ошибка — пропускаем", freq)
+
+    if summaries:
+        result["tables_df"]["forecast"] = pd.concat(longs, ignore_index=True)
+        result["tables_df"]["forecast_summary"] = pd.concat(
+            summaries, ignore_index=True
+        )
+    result["images"] = images
+    result["tables"] = tables
+    return result
@@ -5,7 +5,7 @@ from typing import Dict, List, Tuple
 
 import pandas as pd
 
-from src.io.loader import load_csv, load_excel, call_api
+from src.io.loader import load_csv, load_excel, load_parquet, call_api
 from src.io.sql import read_sql_source
 from src.utils.logging import getLogger
 
@@ -21,6 +21,15 @@ def _safe_load_csv(path: str | Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def _safe_load_parquet(path: str | Path) -> pd.DataFrame:
+    try:
+        logger.info("Загрузка Parquet: %s", path)
+        return load_parquet(str(path))
+    except Exception as e:
+        logger.warning("Parquet пропущен (%s): %s", path, e)
+        return pd.DataFrame()
+
+
 def _safe_load_excel(path: str | Path, sheet: str | int | None) -> pd.DataFrame:
     try:
         logger.info("Загрузка Excel: %s:%s", path, sheet if sheet is not None else "")
@@ -97,6 +106,33 @@ def _classify_target(
     return None
 
 
+def _route_target(
+    name: str, df: pd.DataFrame, explicit_target: str | None, source: str
+) -> str | None:
+    """
+    Куда положить источник: sales | users | products | None (пропустить).
+    customers идут в sales; у API учитываются подстроки имени, SQL без
+    target — в sales по умолчанию. Общая для pandas- и polars-загрузки.
+    """
+    dst = _classify_target(name, df, explicit_target)
+    if source == "api":
+        if dst in ("sales", "customers") or ("sale" in name or "order" in name):
+            return "sales"
+        if dst == "users" or "user" in name:
+            return "users"
+        if dst == "products" or "product" in name:
+            return "products"
+        return None
+    if dst in ("sales", "customers"):
+        return "sales"
+    if dst in ("users", "products"):
+        return dst
+    if source == "db":
+        logger.info("SQL '%s' без явного target — помещён в sales по умолчанию", name)
+        return "sales"
+    return None
+
+
 def load_sources(cfg: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     sources = cfg.get("sources", {}) or {}
 
@@ -111,18 +147,13 @@ def load_sources(cfg: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         df = _safe_read_sql(item)
         if df.empty:
             continue
-        dst = _classify_target(name, df, target)
-        if dst in ("sales", "customers"):
+        dst = _route_target(name, df, target, "db")
+        if dst == "sales":
             sales_parts.append(_add_source(df, "db"))
         elif dst == "users":
             users_df = _add_source(df, "db")
         elif dst == "products":
             products_df = _add_source(df, "db")
-        else:
-            sales_parts.append(_add_source(df, "db"))
-            logger.info(
-                "SQL '%s' без явного target — помещён в sales по умолчанию", name
-            )
 
     # CSV
     for item in sources.get("csv", []) or []:
@@ -133,8 +164,25 @@ def load_sources(cfg: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         df = _safe_load_csv(path)
         if df.empty:
             continue
-        dst = _classify_target(name, df, item.get("target"))
-        if dst in ("sales", "customers"):
+        dst = _route_target(name, df, item.get("target"), "file")
+        if dst == "sales":
+            sales_parts.append(_add_source(df, "file"))
+        elif dst == "users":
+            users_df = _add_source(df, "file")
+        elif dst == "products":
+            products_df = _add_source(df, "file")
+
+    # Parquet
+    for item in sources.get("parquet", []) or []:
+        name = str(item.get("name", "")).lower()
+        path = item.get("path")
+        if not path:
+            continue
+        df = _safe_load_parquet(path)
+        if df.empty:
+            continue
+        dst = _route_target(name, df, item.get("target"), "file")
+        if dst == "sales":
             sales_parts.append(_add_source(df, "file"))
         elif dst == "users":
             users_df = _add_source(df, "file")
@@ -151,8 +199,8 @@ def load_sources(cfg: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         df = _safe_load_excel(path, sheet)
         if df.empty:
             continue
-        dst = _classify_target(name, df, item.get("target"))
-        if dst in ("sales", "customers"):
+        dst = _route_target(name, df, item.get("target"), "file")
+        if dst == "sales":
             sales_parts.append(_add_source(df, "file"))
         elif dst == "users":
             users_df = _add_source(df, "file")
@@ -165,12 +213,12 @@ def load_sources(cfg: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         df = _safe_call_api(ep)
         if df.empty:
             continue
-        dst = _classify_target(name, df, ep.get("target"))
-        if dst in ("sales", "customers") or ("sale" in name or "order" in name):
+        dst = _route_target(name, df, ep.get("target"), "api")
+        if dst == "sales":
             sales_parts.append(_add_source(df, "api"))
-        elif dst == "users" or "user" in name:
+        elif dst == "users":
             users_df = _add_source(df, "api")
-        elif dst == "products" or "product" in name:
+        elif dst == "products":
             products_df = _add_source(df, "api")
 
     # fallback
@@ -0,0 +1,259 @@
+"""
+Polars-бэкенд для загрузки и очистки витрины продаж (engine: polars в config.yaml).
+
+CSV/Parquet читаются ленивыми сканами, приведение типов, статистики пропусков,
+дубликаты и агрегаты по источникам считаются многопоточно в polars.
+В pandas переводим только на границах: отчёты и sklearn (to_pandas_frame).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from src.utils.logging import getLogger
+from src.pipelines.io_stage import (
+    _route_target,
+    _safe_call_api,
+    _safe_load_excel,
+    _safe_read_sql,
+)
+from src.pipelines.clean_stage import KEY_COLUMNS, _log_dropped, _threshold
+
+try:
+    import polars as pl
+
+    _PL_OK = True
+except Exception:
+    pl = None
+    _PL_OK = False
+
+logger = getLogger(__name__)
+
+ID_INT_COLUMNS = ("order_id", "customer_id")
+# разрешение, в котором pd.to_datetime разбирает строки (ns в pandas 2, us в 3)
+_PD_DATETIME_UNIT = pd.to_datetime(pd.Series(["2000-01-01"])).dt.unit
+
+
+def get_engine(cfg: Dict) -> str:
+    """pandas | polars; если polars не установлен — откатываемся на pandas."""
+    engine = str(cfg.get("engine") or "pandas").lower()
+    if engine == "polars" and not _PL_OK:
+        logger.warning("engine=polars, но polars не установлен — используем pandas")
+        return "pandas"
+    return engine if engine in ("pandas", "polars") else "pandas"
+
+
+# --- загрузка ---
+def _scan(path: str | Path, kind: str):
+    p = Path(path)
+    if not p.exists():
+        logger.warning("%s пропущен (%s): файл не найден", kind, p)
+        return None
+    try:
+        logger.info("Ленивое чтение %s: %s", kind, p)
+        if kind == "Parquet":
+            return pl.scan_parquet(p)
+        return pl.scan_csv(p, infer_schema_length=10_000)
+    except Exception as e:
+        logger.warning("%s пропущен (%s): %s", kind, p, e)
+        return None
+
+
+def _from_pandas(df: pd.DataFrame):
+    """pandas -> polars; «смешанные» object-колонки приводим к строкам."""
+    try:
+        return pl.from_pandas(df)
+    except Exception:
+        obj = df.select_dtypes(include=["object"]).columns
+        return pl.from_pandas(df.astype({c: "string" for c in obj}))
+
+
+def _with_source(lf, source: str):
+    names = lf.collect_schema().names()
+    if "source" in names:
+        return lf.with_columns(pl.col("source").fill_null(source))
+    return lf.with_columns(pl.lit(source).alias("source"))
+
+
+def load_sources_pl(cfg: Dict) -> Tuple["pl.DataFrame", pd.DataFrame, pd.DataFrame]:
+    """
+    Аналог io_stage.load_sources: витрина продаж — polars.DataFrame,
+    users/products — pandas (дальше по конвейеру не обрабатываются).
+    Порядок источников тот же: SQL, CSV, Parquet, Excel, API.
+    """
+    sources = cfg.get("sources", {}) or {}
+    sales_parts: List = []
+    users_df = pd.DataFrame()
+    products_df = pd.DataFrame()
+
+    def _route(name: str, lf, explicit, source: str) -> None:
+        nonlocal users_df, products_df
+        # классификатору нужны только имена колонок — без чтения данных
+        cols = pd.DataFrame(columns=lf.collect_schema().names())
+        dst = _route_target(name, cols, explicit, source)
+        if dst == "sales":
+            sales_parts.append(_with_source(lf, source))
+        elif dst == "users":
+            users_df = _with_source(lf, source).collect().to_pandas()
+        elif dst == "products":
+            products_df = _with_source(lf, source).collect().to_pandas()
+
+    for item in sources.get("sql", []) or []:
+        df = _safe_read_sql(item)
+        if not df.empty:
+            name = str(item.get("name", "")).lower()
+            target = str(item.get("target", "")).lower() or None
+            _route(name, _from_pandas(df).lazy(), target, "db")
+
+    for kind, key in (("CSV", "csv"), ("Parquet", "parquet")):
+        for item in sources.get(key, []) or []:
+            if not item.get("path"):
+                continue
+            lf = _scan(item["path"], kind)
+            if lf is not None:
+                name = str(item.get("name", "")).lower()
+                _route(name, lf, item.get("target"), "file")
+
+    for item in sources.get("excel", []) or []:
+        path = item.get("path")
+        if not path:
+            continue
+        sheet = item.get("sheet") or item.get("sheet_name")
+        df = _safe_load_excel(path, sheet)
+        if not df.empty:
+            name = str(item.get("name", "")).lower()
+            _route(name, _from_pandas(df).lazy(), item.get("target"), "file")
+
+    for ep in sources.get("api", []) or []:
+        df = _safe_call_api(ep)
+        if not df.empty:
+            name = str(ep.get("name", "")).lower()
+            _route(name, _from_pandas(df).lazy(), ep.get("target"), "api")
+
+    # fallback — как в pandas-ветке
+    if not sales_parts:
+        for pth in ("data/raw/sales.csv", "data/raw/customers.csv"):
+            lf = _scan(pth, "CSV") if Path(pth).exists() else None
+            if lf is not None:
+                sales_parts.append(_with_source(lf, "file"))
+        xls = Path("data/raw/sales.xlsx")
+        if xls.exists():
+            df = _safe_load_excel(xls, "Sheet1")
+            if not df.empty:
+                sales_parts.append(_with_source(_from_pandas(df).lazy(), "file"))
+
+    if not sales_parts:
+        return pl.DataFrame(), users_df, products_df
+    df_sales = pl.concat(sales_parts, how="diagonal_relaxed").collect()
+    return df_sales, users_df, products_df
+
+
+# --- очистка ---
+def _coerce_exprs(schema) -> list:
+    """Выражения приведения типов (аналог clean_stage.coerce_types)."""
+    exprs = []
+    for c in ID_INT_COLUMNS:
+        if c in schema:
+            col = pl.col(c)
+            if schema[c] == pl.String:
+                col = col.str.strip_chars()
+            # сразу в Int64: через Float64 id больше 2**53 теряют точность;
+            # строки вида "12.0" (to_numeric их понимает) — запасным путём
+            as_int = col.cast(pl.Int64, strict=False)
+            if schema[c] == pl.String:
+                as_int = pl.coalesce(
+                    as_int,
+                    col.cast(pl.Float64, strict=False).cast(pl.Int64, strict=False),
+                )
+            exprs.append(as_int.alias(c))
+    if "amount" in schema:
+        col = pl.col("amount")
+        if schema["amount"] == pl.String:
+            col = col.str.strip_chars()
+        exprs.append(col.cast(pl.Float64, strict=False).fill_nan(None))
+    if "order_date" in schema:
+        col = pl.col("order_date")
+        if schema["order_date"] == pl.String:
+            col = col.str.to_datetime(strict=False)
+        exprs.append(col.cast(pl.Datetime(_PD_DATETIME_UNIT), strict=False))
+    # NaN в прочих float-колонках считаем пропуском (как isna в pandas)
+    for c, dt in schema.items():
+        if c not in (*ID_INT_COLUMNS, "amount", "order_date") and dt in (
+            pl.Float32,
+            pl.Float64,
+        ):
+            exprs.append(pl.col(c).fill_nan(None))
+    return exprs
+
+
+def run_cleaning_pl(df_sales, cfg: Dict) -> Tuple["pl.DataFrame", Dict]:
+    """
+    Аналог clean_stage.run_cleaning на polars:
+    типы -> удаление колонок с долей пропусков > threshold -> дубликаты/пропуски.
+    """
+    cleaner_cfg = (cfg.get("processing", {}) or {}).get("cleaner", {}) or {}
+    thr = _threshold(cleaner_cfg)
+
+    lf = df_sales.lazy()
+    df = lf.with_columns(_coerce_exprs(lf.collect_schema())).collect()
+
+    dropped: List[str] = []
+    if df.height:
+        nulls = df.null_count().row(0, named=True)
+        dropped = [c for c, n in nulls.items() if n / df.height > thr]
+    df2 = df.drop(dropped) if dropped else df
+    _log_dropped(dropped, thr)
+
+    nulls2 = df2.null_count().row(0, named=True) if df2.width else {}
+    stats = {
+        "sales_duplicates": int(df2.height - df2.n_unique()) if df2.width else 0,
+        "sales_missing": {c: int(nulls2[c]) for c in KEY_COLUMNS if c in nulls2},
+    }
+    return df2, stats
+
+
+def aggregates_by_source_pl(df) -> pd.DataFrame:
+    """group_by-аналог report_stage.helpers.aggregates_by_source."""
+    if "source" not in df.columns or df.is_empty():
+        return pd.DataFrame(columns=["source", "rows", "amount_sum", "amount_mean"])
+    amount = (
+        pl.col("amount").cast(pl.Float64)
+        if "amount" in df.columns
+        else pl.lit(None, dtype=pl.Float64)
+    )
+    out = (
+        df.lazy()
+        .filter(pl.col("source").is_not_null())
+        .group_by("source")
+        .agg(
+            pl.len().alias("rows"),
+            amount.sum().alias("amount_sum"),
+            amount.mean().alias("amount_mean"),
+        )
+        .sort("source")
+        .collect()
+        .to_pandas()
+    )
+    if "amount" not in df.columns:
+        out["amount_sum"] = float("nan")
+    out["rows"] = out["rows"].astype(int)
+    return out
+
+
+# --- граница с pandas ---
+def to_pandas_frame(df, nullable_ids: bool = False) -> pd.DataFrame:
+    """
+    polars -> pandas. nullable_ids=True — ключи в Int64, как после
+    clean_stage.coerce_types (для очищенной витрины).
+    """
+    if df is None or df.width == 0:
+        return pd.DataFrame()
+    out = df.to_pandas()
+    if nullable_ids:
+        for c in ID_INT_COLUMNS:
+            if c in out.columns:
+                out[c] = out[c].astype("Int64")
+    return out
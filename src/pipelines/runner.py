@@ -9,17 +9,35 @@ from src.utils.logging import getLogger
 from src.pipelines.io_stage import load_sources
 from src.pipelines.clean_stage import run_cleaning
 from src.pipelines.ml_stage import run_ml
+from src.pipelines.forecast_stage import run_forecast
+from src.reporting.rollup import build_rollup, save_rollup
+from src.reporting.render import configure_cache
 from src.pipelines.report_stage import run_reporting
 from src.pipelines.email_stage import send_email_with_artifacts
+from src.pipelines.polars_backend import (
+    get_engine,
+    load_sources_pl,
+    run_cleaning_pl,
+    aggregates_by_source_pl,
+    to_pandas_frame,
+)
 
 logger = getLogger(__name__)
 
 
 def run_pipeline(cfg: Dict) -> Dict:
     logger.info("Старт конвейера")
+    # кэш рендера графиков — до ML (процессы обучения наследуют настройку)
+    configure_cache((cfg.get("reporting", {}) or {}).get("render"))
 
     # 1) Источники
-    df_sales, df_users, df_products = load_sources(cfg)
+    engine = get_engine(cfg)
+    logger.info("Движок загрузки/очистки: %s", engine)
+    if engine == "polars":
+        sales_pl, df_users, df_products = load_sources_pl(cfg)
+        df_sales = to_pandas_frame(sales_pl)  # raw нужен отчётам (лист raw_combined)
+    else:
+        df_sales, df_users, df_products = load_sources(cfg)
     logger.info(
         "Concat all -> shapes: sales=%s users=%s products=%s",
         df_sales.shape,
@@ -39,9 +57,23 @@ def run_pipeline(cfg: Dict) -> Dict:
 
     # 2) Очистка
     df_raw = df_sales.copy()
-    df_cleaned, clean_stats = run_cleaning(df_sales, cfg)
+    agg_df = None
+    if engine == "polars":
+        cleaned_pl, clean_stats = run_cleaning_pl(sales_pl, cfg)
+        agg_df = aggregates_by_source_pl(cleaned_pl)
+        df_cleaned = to_pandas_frame(cleaned_pl, nullable_ids=True)
+    else:
+        df_cleaned, clean_stats = run_cleaning(df_sales, cfg)
     logger.info("Очистка готова: stats=%s", clean_stats)
 
+    # 2.1) Куб агрегатов для отчётов (один проход по очищенным строкам)
+    paths_cfg = (cfg.get("artifacts", {}) or {}).get("paths", {}) or {}
+    cube = build_rollup(df_cleaned)
+    try:
+        save_rollup(cube, paths_cfg.get("rollup", "data/processed/rollup"))
+    except Exception as e:
+        logger.exception("Не удалось сохранить куб агрегатов: %s", e)
+
     # 3) ML
     ml_result = run_ml(df_cleaned, cfg)
     ml_metrics = ml_result.get("metrics", {})
@@ -55,22 +87,29 @@ def run_pipeline(cfg: Dict) -> Dict:
     if models_saved:
         logger.info("Сохранённые модели: %s", models_saved)
 
-    # 4) Отчёты (включая ML-картинки и таблицы)
+    # 3.1) Прогноз выручки
+    forecast = run_forecast(df_cleaned, cfg)
+
+    # 4) Отчёты (включая ML-картинки, прогноз и таблицы)
     artifacts = run_reporting(
         df_raw,
         df_cleaned,
         cfg,
-        extra_images_with_captions=ml_images,
+        extra_images_with_captions=ml_images + forecast["images"],
         extra_tables=ml_tables,
-        extra_tables_df=ml_tables_df,
+        extra_tables_df={**ml_tables_df, **forecast["tables_df"]},
+        aggregates=agg_df,
+        forecast_tables=forecast["tables"],
+        cube=cube,
     )
 
     # 5) Email
     try:
         email_cfg = cfg.get("email", {}) or {}
         if email_cfg.get("enabled", False):
-            send_email_with_artifacts(email_cfg, artifacts)
-            logger.info("email: письмо отправлено")
+            # SMTP — в фоне: конвейер не ждёт отправки
+            send_email_with_artifacts(email_cfg, artifacts, wait=False)
+            logger.info("email: письма поставлены в очередь")
     except Exception as e:
         logger.exception("Ошибка при отправке письма: %s", e)
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 
@@ -11,14 +11,28 @@ try:
 except Exception:
     _SK_OK = False
 
+try:
+    import orjson
+
+    _ORJSON_OK = True
+except Exception:
+    import json
+
+    _ORJSON_OK = False
+
 
 __all__ = [
     "impute_missing",
     "encode_categorical",
     "scale_numeric",
     "parse_dates",
+    "detect_nested_columns",
+    "coerce_list_columns_to_strings",
+    "explode_nested_columns",
 ]
 
+_NESTED_TYPES = (list, tuple, set, dict)
+
 
 def impute_missing(
     df: pd.DataFrame,
@@ -121,3 +135,157 @@ def parse_dates(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
         if c in out.columns:
             out[c] = pd.to_datetime(out[c], errors="coerce")
     return out
+
+
+# --- вложенные (list/dict) колонки из API ---
+def _is_arrow_nested(dtype) -> bool:
+    """pyarrow-типы list/struct/map (pd.ArrowDtype) — вложенные по определению."""
+    pa_type = getattr(dtype, "pyarrow_dtype", None)
+    if pa_type is None:
+        return False
+    import pyarrow as pa
+
+    return bool(
+        pa.types.is_list(pa_type)
+        or pa.types.is_large_list(pa_type)
+        or pa.types.is_fixed_size_list(pa_type)
+        or pa.types.is_struct(pa_type)
+        or pa.types.is_map(pa_type)
+    )
+
+
+def _nested_mask(s: pd.Series) -> np.ndarray:
+    """
+    Булева маска строк со значениями list/tuple/set/dict (и их подклассов).
+    Для object-колонок — s.map(type) без apply; issubclass проверяется только
+    по уникальным типам.
+    """
+    if _is_arrow_nested(s.dtype):
+        return s.notna().to_numpy()
+    if s.dtype != object:
+        return np.zeros(len(s), dtype=bool)
+    return _types_mask(s.map(type), _NESTED_TYPES)
+
+
+def _types_mask(types: pd.Series, bases) -> np.ndarray:
+    """Маска элементов, чей тип (из s.map(type)) — подкласс bases."""
+    hit = [t for t in types.unique() if issubclass(t, bases)]
+    return types.isin(hit).to_numpy()
+
+
+def _object_values(s: pd.Series) -> np.ndarray:
+    """Значения колонки как 1-D object-массив (списки не «разворачиваются» в 2-D)."""
+    if s.dtype == object:
+        return s.to_numpy(dtype=object, copy=True)
+    return np.fromiter(s.tolist(), dtype=object, count=len(s))
+
+
+def detect_nested_columns(df: pd.DataFrame) -> List[str]:
+    """Колонки, где встречается хотя бы одно вложенное значение (list/tuple/set/dict)."""
+    return [c for c in df.columns if _nested_mask(df[c]).any()]
+
+
+def _json_default(v):
+    if isinstance(v, set):
+        return sorted(v, key=str)
+    if isinstance(v, tuple):
+        return list(v)
+    if isinstance(v, np.generic):
+        return v.item()
+    return str(v)
+
+
+def _dumps_many(values) -> List[str]:
+    """JSON-сериализация пачки значений (orjson, если установлен)."""
+    if _ORJSON_OK:
+        opts = (
+            orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+        dumps = orjson.dumps
+        return [
+            dumps(v, default=_json_default, option=opts).decode("utf-8") for v in values
+        ]
+    return [
+        json.dumps(
+            v,
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=_json_default,
+        )
+        for v in values
+    ]
+
+
+def coerce_list_columns_to_strings(
+    df: pd.DataFrame, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Приводит list/tuple/set/dict значения к JSON-строкам (иначе get_dummies/nunique
+    падают с unhashable type). Скаляры и пропуски остаются как есть.
+      - columns=None: колонки определяются автоматически (detect_nested_columns)
+    """
+    out = df.copy()
+    cols = detect_nested_columns(out) if columns is None else list(columns)
+    for c in cols:
+        if c not in out.columns:
+            continue
+        s = out[c]
+        mask = _nested_mask(s)
+        if not mask.any():
+            continue
+        vals = _object_values(s)
+        idx = np.flatnonzero(mask)
+        vals[idx] = _dumps_many(vals[idx])
+        if _is_arrow_nested(s.dtype):
+            vals[~mask] = None
+        out[c] = pd.Series(vals, index=out.index, dtype=object)
+    return out
+
+
+def explode_nested_columns(
+    df: pd.DataFrame, parent_key: str = "id", columns: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Нормализует вложенные колонки в дочерние таблицы, связанные с родителем по parent_key:
+      - list/tuple/set -> по строке на элемент (колонки: parent_key, pos, <значение>);
+        если элементы — dict, они раскладываются в колонки (json_normalize)
+      - dict -> одна строка с ключами-колонками
+    Возвращает (родительская таблица без вложенных колонок, {колонка: дочерняя таблица}).
+    Если parent_key в df нет, ключом служит позиция строки.
+    """
+    cols = detect_nested_columns(df) if columns is None else list(columns)
+    cols = [c for c in cols if c in df.columns and c != parent_key]
+    keys = (
+        df[parent_key].to_numpy()
+        if parent_key in df.columns
+        else np.arange(len(df), dtype=np.int64)
+    )
+
+    children: Dict[str, pd.DataFrame] = {}
+    for c in cols:
+        s = df[c]
+        mask = _nested_mask(s)
+        idx = np.flatnonzero(mask)
+        vals = _object_values(s)[idx]
+        # dict — одиночный элемент: оборачиваем, чтобы explode не разобрал его по ключам
+        for i in np.flatnonzero(_types_mask(pd.Series(vals).map(type), dict)):
+            vals[i] = [vals[i]]
+
+        child = pd.DataFrame({parent_key: keys[idx], c: vals}).explode(c)
+        child["pos"] = child.groupby(level=0).cumcount()
+        child = child.dropna(subset=[c]).reset_index(drop=True)
+
+        elems = child[c]
+        if len(elems) and _types_mask(elems.map(type), dict).all():
+            norm = pd.json_normalize(elems.tolist())
+            norm.columns = [str(k) for k in norm.columns]
+            child = pd.concat(
+                [child[[parent_key, "pos"]], norm.set_axis(child.index)], axis=1
+            )
+        else:
+            child = child[[parent_key, "pos", c]]
+        children[c] = child
+
+    parent = df.drop(columns=cols) if cols else df.copy()
+    return parent, children
@@ -18,50 +18,9 @@ from typing import Dict, Any, Iterable, List, Tuple, Optional
 import logging
 import pandas as pd
 
-log = logging.getLogger(__name__)
+from src.processing.cleaner import coerce_list_columns_to_strings
 
-# импортируем функцию приведения list-колонок в строки из cleaner
-try:
-    from src.processing.cleaner import coerce_list_columns_to_strings
-except Exception:
-    # fallback - если модуль недоступен, реализуем простую локальную функцию
-    import json
-
-    def coerce_list_columns_to_strings(
-        df: pd.DataFrame, sample_n: int = 100
-    ) -> pd.DataFrame:
-        df = df.copy()
-
-        def _is_list_like(x):
-            return isinstance(x, (list, tuple, set, dict))
-
-        cols = []
-        for col in df.columns:
-            try:
-                vals = df[col].dropna().head(sample_n).tolist()
-            except Exception:
-                continue
-            for v in vals:
-                if _is_list_like(v):
-                    cols.append(col)
-                    break
-        for c in cols:
-
-            def _conv(v):
-                try:
-                    if isinstance(v, set):
-                        v = list(v)
-                    if isinstance(v, (list, tuple, dict)):
-                        return json.dumps(v, ensure_ascii=False, sort_keys=True)
-                    return v
-                except Exception:
-                    try:
-                        return str(v)
-                    except Exception:
-                        return None
-
-            df[c] = df[c].apply(_conv)
-        return df
+log = logging.getLogger(__name__)
 
 
 def smart_encode(
@@ -0,0 +1,100 @@
+"""
+Упаковка артефактов отчёта во вложения письма.
+
+PDF, Excel и HTML-дашборд прикладываются как есть, PNG-графики — одним
+zip-архивом. Бюджет письма (max_message_mb) считается по размеру после
+base64: вложения добавляются по приоритету (pdf, excel, html, images),
+не поместившиеся заменяются строкой в тексте письма — ссылкой
+(link_base/<имя файла>) или путём к файлу и размером.
+"""
+
+from __future__ import annotations
+
+import os
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.reporting.email import PART_OVERHEAD, encoded_size
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+DEFAULTS: Dict[str, Any] = {
+    "zip_images": True,
+    "include_html": True,
+    "max_message_mb": 20,
+    "work_dir": "reports/email",
+    "link_base": None,
+}
+# тело письма и заголовки с запасом
+_MESSAGE_OVERHEAD = 16 * 1024
+
+
+def zip_files(paths: List[Path], out_path: Path) -> Path:
+    """Архив (deflate) с путями относительно общего каталога файлов."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    root = Path(os.path.commonpath([str(p.resolve().parent) for p in paths]))
+    with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for p in paths:
+            zf.write(p, arcname=str(p.resolve().relative_to(root)))
+    return out_path
+
+
+def _candidates(artifacts: Dict[str, Any], cfg: Dict[str, Any]) -> List[Path]:
+    out: List[Path] = []
+    for key in ("pdf", "excel"):
+        if artifacts.get(key):
+            out.append(Path(artifacts[key]))
+    if cfg["include_html"]:
+        out.extend(Path(p) for p in artifacts.get("html", []) or [])
+    images = [Path(p) for p in artifacts.get("images", []) or []]
+    images = [p for p in images if p.exists()]
+    if images and cfg["zip_images"]:
+        out.append(zip_files(images, Path(cfg["work_dir"]) / "images.zip"))
+    else:
+        out.extend(images)
+    return [p for p in out if p.exists()]
+
+
+def _note(p: Path, size: int, cfg: Dict[str, Any]) -> str:
+    mb = size / 2**20
+    if cfg["link_base"]:
+        return f"{p.name} ({mb:.1f} МБ): {str(cfg['link_base']).rstrip('/')}/{p.name}"
+    return f"{p.name} ({mb:.1f} МБ) не вложен из-за лимита письма — файл: {p}"
+
+
+def package_attachments(
+    artifacts: Dict[str, Any], cfg: Dict[str, Any] | None = None
+) -> Tuple[List[Path], List[str]]:
+    """
+    cfg — email.attachments. Возвращает (файлы для вложения, строки для
+    текста письма о файлах, не вошедших в бюджет).
+    """
+    cfg = {**DEFAULTS, **(cfg or {})}
+    budget = cfg["max_message_mb"]
+    budget = None if budget is None else int(float(budget) * 2**20)
+    attached: List[Path] = []
+    notes: List[str] = []
+    total = _MESSAGE_OVERHEAD
+    for p in _candidates(artifacts or {}, cfg):
+        size = p.stat().st_size
+        cost = encoded_size(size) + PART_OVERHEAD
+        if budget is not None and total + cost > budget:
+            log.warning(
+                "email: %s (%d байт) не помещается в лимит %d байт — ссылкой",
+                p,
+                size,
+                budget,
+            )
+            notes.append(_note(p, size, cfg))
+            continue
+        attached.append(p)
+        total += cost
+    log.info(
+        "email: вложений %d, ~%.1f МБ; вне письма %d",
+        len(attached),
+        total / 2**20,
+        len(notes),
+    )
+    return attached, notes
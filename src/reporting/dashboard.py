@@ -0,0 +1,260 @@
+"""
+Автономный HTML-дашборд по кубу агрегатов (rollup).
+
+Один файл: plotly.js встраивается один раз (plotlyjs: inline — работает
+без сети; cdn — ссылка на cdn.plot.ly), данные — месячный срез куба
+(месяц × source × country) в колоночном JSON со словарным кодированием
+измерений плюс топ клиентов. Графики строятся в браузере и
+пересчитываются при смене фильтров (источник, страна, диапазон месяцев).
+Размер файла зависит от числа ячеек куба, а не от числа строк данных.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.reporting import rollup
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+DEFAULTS: Dict[str, Any] = {
+    "output": "reports/html/dashboard.html",
+    "plotlyjs": "inline",  # inline | cdn
+    "top_customers": 20,
+}
+
+
+def _encode(values: pd.Series) -> tuple[list, list]:
+    """Словарное кодирование: (отсортированный словарь, коды)."""
+    codes, uniques = pd.factorize(values, sort=True)
+    return [str(u) for u in uniques], codes.tolist()
+
+
+def dashboard_payload(cube: Dict[str, Any], top_n: int = 20) -> Dict[str, Any]:
+    """Колоночные данные дашборда: измерения — словарь + коды, меры — массивы."""
+    cells = rollup.monthly_cells(cube)
+    dims = ["month", *cube["dims"]]
+    dictionaries: Dict[str, list] = {}
+    columns: Dict[str, list] = {}
+    for dim in dims:
+        dictionaries[dim], columns[dim] = _encode(cells[dim])
+    columns["orders"] = cells["orders"].astype(int).tolist()
+    columns["amount_count"] = cells["amount_count"].astype(int).tolist()
+    columns["amount_sum"] = np.round(cells["amount_sum"].astype(float), 2).tolist()
+    top = rollup.top_customers(cube, top_n)
+    return {
+        "dims": dims,
+        "dictionaries": dictionaries,
+        "cells": columns,
+        "customers": {
+            "id": [str(i) for i in top.index],
+            "orders": top.astype(int).tolist(),
+        },
+        "amount_present": bool(cube["columns"].get("amount_present", True)),
+    }
+
+
+def _plotlyjs_tag(mode: str) -> str:
+    if mode == "cdn":
+        from plotly.offline.offline import get_plotlyjs_version
+
+        return (
+            '<script src="https://cdn.plot.ly/plotly-'
+            f'{get_plotlyjs_version()}.min.js" charset="utf-8"></script>'
+        )
+    from plotly.offline import get_plotlyjs
+
+    return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+
+
+def dashboard_html(
+    cube: Dict[str, Any],
+    out_path: Path | str | None = None,
+    units: Optional[Dict] = None,
+    cfg: Optional[Dict] = None,
+) -> Optional[str]:
+    """Пишет дашборд; None, если в кубе нет ячеек."""
+    cfg = {**DEFAULTS, **(cfg or {})}
+    units = units or {}
+    if cube["daily"].empty:
+        return None
+    payload = dashboard_payload(cube, int(cfg["top_customers"]))
+    labels = {
+        "currency": units.get("currency_label", "у.е."),
+        "amount": units.get("amount_label", "Выручка"),
+        "orders": units.get("orders_label", "Заказы"),
+        "dims": {"source": "Источник", "country": "Страна"},
+    }
+    data = json.dumps(
+        {**payload, "labels": labels}, ensure_ascii=False, separators=(",", ":")
+    ).replace("</", "<\\/")
+    title = html.escape(f"{labels['amount']}: дашборд (N={rollup.total_orders(cube)})")
+    parts = {
+        "TITLE": title,
+        "PLOTLYJS": _plotlyjs_tag(str(cfg["plotlyjs"])),
+        "DATA": data,
+    }
+    # один проход: вставленный plotly.js/данные не подменяются повторно
+    page = re.sub(r"__(TITLE|PLOTLYJS|DATA)__", lambda m: parts[m.group(1)], _TEMPLATE)
+    out_path = Path(out_path or cfg["output"])
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(page, "utf-8")
+    os.replace(tmp, out_path)  # без недописанного дашборда на месте прежнего
+    log.info(
+        "Дашборд: %s (%d ячеек, %.1f КБ)",
+        out_path,
+        len(payload["cells"]["orders"]),
+        out_path.stat().st_size / 1024,
+    )
+    return str(out_path)
+
+
+_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+__PLOTLYJS__
+<style>
+body { font-family: sans-serif; margin: 16px; }
+#filters { display: flex; gap: 16px; flex-wrap: wrap; align-items: flex-start; }
+#filters label { display: flex; flex-direction: column; font-size: 13px; }
+#charts { display: grid; grid-template-columns: repeat(auto-fill, minmax(520px, 1fr)); gap: 12px; }
+.chart { height: 360px; }
+</style>
+</head>
+<body>
+<h2>__TITLE__</h2>
+<div id="filters"></div>
+<div id="charts"></div>
+<script type="application/json" id="dashboard-data">__DATA__</script>
+<script type="text/javascript">
+(function () {
+  var D = JSON.parse(document.getElementById("dashboard-data").textContent);
+  var C = D.cells, L = D.labels, N = C.orders.length;
+  var months = D.dictionaries.month;
+  var filters = document.getElementById("filters");
+  var charts = document.getElementById("charts");
+  var cur = L.currency;
+
+  function select(id, title, values, multiple) {
+    var label = document.createElement("label");
+    label.textContent = title;
+    var el = document.createElement("select");
+    el.id = id;
+    el.multiple = multiple;
+    if (multiple) el.size = Math.min(values.length, 6);
+    values.forEach(function (v, i) {
+      var o = document.createElement("option");
+      o.value = i; o.textContent = v;
+      el.appendChild(o);
+    });
+    el.addEventListener("change", draw);
+    label.appendChild(el);
+    filters.appendChild(label);
+    return el;
+  }
+
+  var monthFrom = select("month-from", "Месяц с", months, false);
+  var monthTo = select("month-to", "Месяц по", months, false);
+  monthTo.value = months.length - 1;
+  var dimSelects = {};
+  D.dims.slice(1).forEach(function (dim) {
+    dimSelects[dim] = select("f-" + dim, L.dims[dim] || dim, D.dictionaries[dim], true);
+  });
+
+  function chosen(el) {
+    var s = {}, any = false;
+    for (var i = 0; i < el.options.length; i++) {
+      if (el.options[i].selected) { s[i] = true; any = true; }
+    }
+    return any ? s : null;
+  }
+
+  function rows() {
+    var lo = +monthFrom.value, hi = +monthTo.value, sel = {}, out = [];
+    Object.keys(dimSelects).forEach(function (dim) { sel[dim] = chosen(dimSelects[dim]); });
+    for (var i = 0; i < N; i++) {
+      var m = C.month[i];
+      if (m < lo || m > hi) continue;
+      var ok = true;
+      for (var dim in sel) { if (sel[dim] && !sel[dim][C[dim][i]]) { ok = false; break; } }
+      if (ok) out.push(i);
+    }
+    return out;
+  }
+
+  function group(idx, dim, fields) {
+    var dict = D.dictionaries[dim], acc = {};
+    idx.forEach(function (i) {
+      var k = C[dim][i];
+      if (!acc[k]) { acc[k] = {}; fields.forEach(function (f) { acc[k][f] = 0; }); }
+      fields.forEach(function (f) { acc[k][f] += C[f][i]; });
+    });
+    var keys = Object.keys(acc).map(Number).sort(function (a, b) { return a - b; });
+    var out = { x: keys.map(function (k) { return dict[k]; }) };
+    fields.forEach(function (f) { out[f] = keys.map(function (k) { return acc[k][f]; }); });
+    return out;
+  }
+
+  function panel(id) {
+    var el = document.getElementById(id);
+    if (!el) {
+      el = document.createElement("div");
+      el.id = id; el.className = "chart";
+      charts.appendChild(el);
+    }
+    return el;
+  }
+
+  function plot(id, title, traces, yTitle) {
+    Plotly.react(panel(id), traces, {
+      title: title, margin: { t: 50, l: 60, r: 20, b: 60 },
+      yaxis: { title: yTitle }, showlegend: false
+    }, { responsive: true, displaylogo: false });
+  }
+
+  function draw() {
+    var idx = rows();
+    var m = group(idx, "month", ["orders", "amount_count", "amount_sum"]);
+    if (D.amount_present) {
+      plot("c-revenue", L.amount + " по месяцам",
+        [{ type: "scatter", mode: "lines+markers", x: m.x, y: m.amount_sum }],
+        L.amount + ", " + cur);
+      plot("c-check", "Средний чек по месяцам",
+        [{ type: "scatter", mode: "lines+markers", x: m.x,
+           y: m.amount_sum.map(function (s, j) { return m.amount_count[j] ? s / m.amount_count[j] : null; }) }],
+        "Средний чек, " + cur);
+    }
+    plot("c-orders", L.orders + " по месяцам",
+      [{ type: "bar", x: m.x, y: m.orders }], L.orders + ", шт.");
+    D.dims.slice(1).forEach(function (dim) {
+      var g = group(idx, dim, ["orders", "amount_sum"]);
+      var y = D.amount_present ? g.amount_sum : g.orders;
+      plot("c-" + dim, (D.amount_present ? L.amount : L.orders) + ": " + (L.dims[dim] || dim).toLowerCase(),
+        [{ type: "bar", x: g.x, y: y }],
+        D.amount_present ? L.amount + ", " + cur : L.orders + ", шт.");
+    });
+  }
+
+  draw();
+  if (D.customers.id.length) {
+    plot("c-customers", "Топ-" + D.customers.id.length + " клиентов по числу заказов (без фильтров)",
+      [{ type: "bar", x: D.customers.id, y: D.customers.orders }], L.orders + ", шт.");
+    Plotly.relayout("c-customers", { "xaxis.type": "category" });
+  }
+})();
+</script>
+</body>
+</html>
+"""
@@ -1,13 +1,164 @@
+"""
+Отправка письма с вложениями потоком.
+
+MIME собирается генератором: заголовки и текст — сразу, каждое вложение
+читается кусками по 57 КБ и кодируется в base64 построчно (76 символов),
+так что в памяти не бывает целого файла или целого письма. Байты уходят
+в SMTP-сессию после команды DATA (с dot-stuffing), без send_message.
+Тип вложения — по расширению (mimetypes), иначе application/octet-stream.
+"""
+
 from __future__ import annotations
-from typing import Iterable, List
+
+import base64
+import mimetypes
+import re
 import smtplib
+import uuid
+from email.header import Header
 from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import (
+    encode_rfc2231,
+    formataddr,
+    formatdate,
+    getaddresses,
+    make_msgid,
+)
 from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
 
 from src.utils.logging import getLogger
 
 log = getLogger(__name__)
 
+# 57 байт -> ровно одна строка base64 (76 символов)
+_B64_LINE = 57
+_READ_LINES = 1000
+# заголовки части вложения с запасом на длинное имя файла
+PART_OVERHEAD = 512
+
+_EXTRA_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".zip": "application/zip",
+    ".parquet": "application/vnd.apache.parquet",
+}
+
+
+def guess_mime(path: Path | str) -> Tuple[str, str]:
+    """(maintype, subtype) по расширению файла."""
+    p = Path(path)
+    ctype = _EXTRA_TYPES.get(p.suffix.lower()) or mimetypes.guess_type(p.name)[0]
+    maintype, _, subtype = (ctype or "application/octet-stream").partition("/")
+    return maintype, subtype
+
+
+def encoded_size(n_bytes: int) -> int:
+    """Размер вложения после base64 со строками по 76 символов + CRLF."""
+    b64 = 4 * (-(-n_bytes // 3))
+    return b64 + 2 * (-(-b64 // 76))
+
+
+def _filename_params(name: str) -> str:
+    try:
+        name.encode("ascii")
+        return f'filename="{name}"'
+    except UnicodeEncodeError:
+        return f"filename*={encode_rfc2231(name, 'utf-8')}"
+
+
+def _address_header(addrs: Iterable[str]) -> str:
+    """
+    Адреса для From/To: имя вне ASCII — encoded-word utf-8 (formataddr),
+    по адресу на строку продолжения, чтобы не упереться в длину строки.
+    """
+    pairs = getaddresses(list(addrs))
+    return ",\r\n ".join(formataddr(p, charset="utf-8") for p in pairs)
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    return re.sub(rb"(?m)^\.", b"..", data)
+
+
+def _iter_base64(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as fh:
+        while True:
+            block = fh.read(_B64_LINE * _READ_LINES)
+            if not block:
+                break
+            yield b"".join(
+                base64.b64encode(block[i : i + _B64_LINE]) + b"\r\n"
+                for i in range(0, len(block), _B64_LINE)
+            )
+
+
+def iter_message(
+    from_addr: str,
+    to: List[str],
+    subject: str,
+    body: str,
+    attachments: Iterable[Path],
+) -> Iterator[bytes]:
+    """MIME-письмо (multipart/mixed) кусками байт, строки через CRLF."""
+    boundary = f"=_{uuid.uuid4().hex}"
+    subject_header = Header(subject or "", "utf-8").encode(linesep="\r\n")
+    headers = [
+        f"From: {_address_header([from_addr])}",
+        f"To: {_address_header(to)}",
+        f"Subject: {subject_header}",
+        f"Date: {formatdate(localtime=True)}",
+        f"Message-ID: {make_msgid()}",
+        "MIME-Version: 1.0",
+        f'Content-Type: multipart/mixed; boundary="{boundary}"',
+    ]
+    yield ("\r\n".join(headers) + "\r\n\r\n").encode("ascii")
+
+    text = EmailMessage(policy=SMTP)
+    text.set_content(body or "", cte="base64")
+    del text["MIME-Version"]
+    yield f"--{boundary}\r\n".encode("ascii") + _dot_stuff(text.as_bytes())
+    yield b"\r\n"
+
+    for p in attachments:
+        maintype, subtype = guess_mime(p)
+        part = [
+            f"--{boundary}",
+            f"Content-Type: {maintype}/{subtype}",
+            f"Content-Disposition: attachment; {_filename_params(p.name)}",
+            "Content-Transfer-Encoding: base64",
+        ]
+        yield ("\r\n".join(part) + "\r\n\r\n").encode("ascii")
+        yield from _iter_base64(p)
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+
+def send_streaming(
+    smtp: smtplib.SMTP, from_addr: str, to: List[str], chunks: Iterable[bytes]
+) -> None:
+    """MAIL/RCPT/DATA вручную: тело письма пишется в сокет по кускам."""
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(from_addr)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    refused = {}
+    for rcpt in to:
+        code, resp = smtp.rcpt(rcpt)
+        if code not in (250, 251):
+            refused[rcpt] = (code, resp)
+    if len(refused) == len(to):
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, resp = smtp.docmd("DATA")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    for chunk in chunks:
+        smtp.send(chunk)
+    smtp.send(b".\r\n")
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    if refused:
+        log.warning("Email: часть получателей отклонена: %s", refused)
+
 
 def send_email(
     smtp_host: str,
@@ -29,38 +180,24 @@ def send_email(
         log.info("Email: smtp_host пустой → отправка пропущена")
         return
 
-    msg = EmailMessage()
-    msg["From"] = from_addr or username or "noreply@example.com"
-    msg["To"] = ", ".join(to if isinstance(to, (list, tuple)) else [to])
-    msg["Subject"] = subject
-    msg.set_content(body or "")
-
+    sender = from_addr or username or "noreply@example.com"
+    rcpts = list(to if isinstance(to, (list, tuple)) else [to])
+    files: List[Path] = []
     for p in attachments or []:
-        try:
-            p = Path(p)
-            if not p.exists():
-                continue
-            with open(p, "rb") as fh:
-                data = fh.read()
-            maintype = "application"
-            subtype = "octet-stream"
-            msg.add_attachment(
-                data, maintype=maintype, subtype=subtype, filename=p.name
-            )
-        except Exception:
-            log.exception("Прикрепление файла %s не удалось (ignored)", p)
+        p = Path(p)
+        if p.exists():
+            files.append(p)
+        else:
+            log.warning("Вложение %s не найдено (ignored)", p)
 
     try:
-        if use_ssl:
-            with smtplib.SMTP_SSL(smtp_host, int(smtp_port), timeout=10) as smtp:
-                if username and password:
-                    smtp.login(username, password)
-                smtp.send_message(msg)
-        else:
-            with smtplib.SMTP(smtp_host, int(smtp_port), timeout=10) as smtp:
-                if username and password:
-                    smtp.login(username, password)
-                smtp.send_message(msg)
+        smtp_cls = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+        with smtp_cls(smtp_host, int(smtp_port), timeout=10) as smtp:
+            if username and password:
+                smtp.login(username, password)
+            send_streaming(
+                smtp, sender, rcpts, iter_message(sender, rcpts, subject, body, files)
+            )
         log.info("Email успешно отправлен.")
     except Exception:
         log.exception("Email отправить не удалось (ignored).")
@@ -1,43 +1,163 @@
 from __future__ import annotations
+import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
 import pandas as pd
+import xlsxwriter
+
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+# Лимит листа Excel — 1 048 576 строк, одна из них — заголовок
+EXCEL_MAX_ROWS = 1_048_575
+CHUNK_ROWS = 50_000
+_EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+
+def split_sheets(
+    name: str, df: pd.DataFrame, max_rows: int = EXCEL_MAX_ROWS
+) -> List[Tuple[str, pd.DataFrame]]:
+    """Кадр длиннее max_rows — листы name_1..name_N (имя ≤ 31 символа)."""
+    if len(df) <= max_rows:
+        return [(name[:31], df)]
+    n = -(-len(df) // max_rows)
+    out = []
+    for i in range(n):
+        suffix = f"_{i + 1}"
+        out.append(
+            (
+                name[: 31 - len(suffix)] + suffix,
+                df.iloc[i * max_rows : (i + 1) * max_rows],
+            )
+        )
+    return out
+
+
+def _cell_values(ser: pd.Series) -> Tuple[list, str | None]:
+    """Колонка -> значения Python для write_row (пропуски — None) и формат числа."""
+    if isinstance(ser.dtype, pd.CategoricalDtype):
+        ser = ser.astype(object)
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        if getattr(ser.dt, "tz", None) is not None:
+            ser = ser.dt.tz_localize(None)
+        # даты — серийные числа Excel с форматом колонки
+        vals = ((ser - _EXCEL_EPOCH) / pd.Timedelta(days=1)).to_numpy(dtype=float)
+        fmt = "yyyy-mm-dd hh:mm:ss"
+    elif pd.api.types.is_bool_dtype(ser) or pd.api.types.is_numeric_dtype(ser):
+        if ser.dtype.kind in "iub":
+            # в т.ч. Int64/boolean с пропусками (pd.NA -> None)
+            return ser.to_numpy(dtype=object, na_value=None).tolist(), None
+        vals = ser.to_numpy(dtype=float, na_value=np.nan)
+        fmt = None
+    else:
+        out = ser.to_numpy(dtype=object)
+        na = pd.isna(out)
+        keep = (str, int, float, bool)
+        return [
+            None if m else (v if isinstance(v, keep) else str(v))
+            for v, m in zip(out, na)
+        ], None
+    obj = vals.astype(object)
+    obj[np.isnan(vals)] = None
+    return obj.tolist(), fmt
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start : start + chunk_rows]
+
+
+def _write_frame(wb, ws, df: pd.DataFrame, header_fmt, chunk_rows: int) -> None:
+    """Заголовок + строки кусками; в constant_memory строки пишутся строго по порядку."""
+    ws.write_row(0, 0, [str(c) for c in df.columns], header_fmt)
+    formats: Dict[str, object] = {}
+    row = 1
+    for chunk in _chunks(df, chunk_rows):
+        cols = []
+        for j, c in enumerate(chunk.columns):
+            vals, num_fmt = _cell_values(chunk[c])
+            if num_fmt and row == 1:
+                fmt = formats.get(num_fmt)
+                if fmt is None:
+                    fmt = formats[num_fmt] = wb.add_format({"num_format": num_fmt})
+                ws.set_column(j, j, 19, fmt)
+            cols.append(vals)
+        for values in zip(*cols):
+            ws.write_row(row, 0, values)
+            row += 1
 
 
 def to_excel_multisheet(
-    path: Path, sheets: Dict[str, pd.DataFrame], with_conditional_format: bool = False
-) -> None:
+    path: Path,
+    sheets: Dict[str, pd.DataFrame],
+    with_conditional_format: bool = False,
+    max_rows: int = EXCEL_MAX_ROWS,
+    chunk_rows: int = CHUNK_ROWS,
+) -> List[str]:
+    """
+    Книга в режиме xlsxwriter constant_memory: строки каждого листа пишутся
+    кусками по chunk_rows и сразу сбрасываются на диск, книга целиком в
+    памяти не держится. Лист длиннее max_rows делится на name_1..name_N.
+    Возвращает имена записанных листов. Книга пишется во временный файл и
+    переименовывается в path только целиком — недописанной книги на месте
+    отчёта не бывает.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+    written: List[str] = []
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    wb = xlsxwriter.Workbook(
+        str(tmp), {"constant_memory": True, "nan_inf_to_errors": True}
+    )
+    done = False
+    try:
+        header_fmt = wb.add_format({"bold": True, "border": 1, "align": "center"})
         for name, df in sheets.items():
             df = df if isinstance(df, pd.DataFrame) else pd.DataFrame(df)
-            df.to_excel(writer, sheet_name=name[:31], index=False)
-        if with_conditional_format and "metrics" in sheets:
-            wb = writer.book
-            ws = writer.sheets["metrics"[:31]]
-            dfm = sheets["metrics"]
-            # диапазон (без заголовка)
-            rows, cols = dfm.shape
-            if rows > 0 and cols > 0:
-                data_range = (1, 0, rows, cols - 1)
-                # зелёный — лучше (макс R2), красный — хуже (макс RMSE/MAE)
-                # простое выделение по столбцам, если они существуют
-                headers = [c.lower() for c in dfm.columns]
-
-                def col_idx(colname):
-                    try:
-                        return headers.index(colname)
-                    except ValueError:
-                        return None
-
-                # R2 — max good
-                r2c = col_idx("r2")
-                if r2c is not None:
-                    ws.conditional_format(1, r2c, rows, r2c, {"type": "3_color_scale"})
-                # RMSE/MAE — чем меньше, тем лучше: выделим красно-зелёной шкалой
-                for cname in ("rmse", "mae"):
-                    ci = col_idx(cname)
-                    if ci is not None:
-                        ws.conditional_format(
-                            1, ci, rows, ci, {"type": "3_color_scale"}
-                        )
+            parts = split_sheets(name, df, max_rows)
+            if len(parts) > 1:
+                log.info(
+                    "Excel: лист %s (%d строк) разбит на %d листов",
+                    name,
+                    len(df),
+                    len(parts),
+                )
+            for sheet_name, part in parts:
+                ws = wb.add_worksheet(sheet_name)
+                _write_frame(wb, ws, part, header_fmt, chunk_rows)
+                written.append(sheet_name)
+                if with_conditional_format and name == "metrics":
+                    _metrics_conditional_format(ws, part)
+        done = True
+    finally:
+        wb.close()
+        if not done:
+            tmp.unlink(missing_ok=True)
+    os.replace(tmp, path)
+    return written
+
+
+def _metrics_conditional_format(ws, dfm: pd.DataFrame) -> None:
+    # диапазон (без заголовка)
+    rows, cols = dfm.shape
+    if rows > 0 and cols > 0:
+        # зелёный — лучше (макс R2), красный — хуже (макс RMSE/MAE)
+        # простое выделение по столбцам, если они существуют
+        headers = [str(c).lower() for c in dfm.columns]
+
+        def col_idx(colname):
+            try:
+                return headers.index(colname)
+            except ValueError:
+                return None
+
+        # R2 — max good
+        r2c = col_idx("r2")
+        if r2c is not None:
+            ws.conditional_format(1, r2c, rows, r2c, {"type": "3_color_scale"})
+        # RMSE/MAE — чем меньше, тем лучше: выделим красно-зелёной шкалой
+        for cname in ("rmse", "mae"):
+            ci = col_idx(cname)
+            if ci is not None:
+                ws.conditional_format(1, ci, rows, ci, {"type": "3_color_scale"})
@@ -0,0 +1,272 @@
+"""
+Фоновая рассылка писем: пул SMTP-соединений и очередь отправки.
+
+SMTPPool держит до pool_size открытых соединений с выполненным login;
+перед повторным использованием соединение проверяется NOOP, упавшее —
+закрывается и открывается заново. Dispatcher отправляет задания в пуле
+потоков (workers) и сразу возвращает Future, так что пайплайн не ждёт
+SMTP. Временные ошибки повторяются retries раз с экспоненциальной
+паузой; задание, которое так и не ушло, сохраняется JSON-файлом в
+outbox_dir вместе с копиями вложений (каталог <задание>/) — к следующему
+запуску исходные файлы отчёта могут быть перезаписаны или удалены — и
+переотправляется из копий при следующем запуске диспетчера. Постоянный
+отказ (адреса, авторизация) повторять бессмысленно — такое задание уходит
+в outbox_dir/failed/ и само не переотправляется.
+Потоки пула не демонические — интерпретатор дождётся отправки при выходе.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import queue
+import shutil
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from src.reporting.email import iter_message, send_streaming
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+DEFAULTS: Dict[str, Any] = {
+    "pool_size": 2,
+    "workers": 4,
+    "retries": 3,
+    "backoff_seconds": 2.0,
+    "outbox_dir": "reports/email/outbox",
+}
+# отказ без смысла повторять (адреса, авторизация)
+_PERMANENT = (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError)
+
+
+class SMTPPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_ssl: bool = False,
+        size: int = 2,
+        timeout: float = 10,
+    ):
+        self.host, self.port = host, int(port)
+        self.username, self.password = username, password
+        self.use_ssl, self.timeout = use_ssl, timeout
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, int(size)))
+        self.opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp_cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        smtp = smtp_cls(self.host, self.port, timeout=self.timeout)
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        self.opened += 1
+        return smtp
+
+    @staticmethod
+    def _alive(smtp: smtplib.SMTP) -> bool:
+        try:
+            return smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """Соединение из пула; после ошибки оно закрывается, а не возвращается."""
+        with self._slots:
+            smtp = None
+            while smtp is None and not self._idle.empty():
+                smtp = self._idle.get_nowait()
+                if not self._alive(smtp):
+                    self._close(smtp)
+                    smtp = None
+            smtp = smtp or self._connect()
+            try:
+                yield smtp
+            except Exception:
+                self._close(smtp)
+                raise
+            self._idle.put(smtp)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._close(self._idle.get_nowait())
+
+
+class Dispatcher:
+    """
+    Задание — dict: from, to (список), subject, body, attachments (пути).
+    submit() возвращает Future[bool]: True — отправлено, False — в outbox.
+    """
+
+    def __init__(self, pool: SMTPPool, cfg: Dict[str, Any] | None = None):
+        cfg = {**DEFAULTS, **(cfg or {})}
+        self.pool = pool
+        self.retries = int(cfg["retries"])
+        self.backoff = float(cfg["backoff_seconds"])
+        self.outbox = Path(cfg["outbox_dir"]) if cfg["outbox_dir"] else None
+        self._ex = ThreadPoolExecutor(
+            max_workers=max(1, int(cfg["workers"])), thread_name_prefix="mailer"
+        )
+
+    def _send(self, job: Dict[str, Any]) -> None:
+        files = [Path(p) for p in job.get("attachments", [])]
+        with self.pool.connection() as smtp:
+            chunks = iter_message(
+                job["from"], job["to"], job["subject"], job["body"], files
+            )
+            send_streaming(smtp, job["from"], job["to"], chunks)
+
+    def _run(self, job: Dict[str, Any], path: Path | None = None) -> bool:
+        """
+        path — файл задания из outbox: удаляется только после попытки, когда
+        письмо ушло или задание сохранено заново со своими копиями вложений;
+        до этого падение процесса задание не теряет.
+        """
+        sent, saved = self._attempt(job)
+        if sent or saved:
+            if path is not None:
+                path.unlink(missing_ok=True)
+            if job.get("outbox_files"):
+                shutil.rmtree(job["outbox_files"], ignore_errors=True)
+        return sent
+
+    def _attempt(self, job: Dict[str, Any]) -> Tuple[bool, bool]:
+        """(отправлено, сохранено в outbox/failed)."""
+        error, permanent = None, False
+        for attempt in range(self.retries + 1):
+            try:
+                t0 = time.perf_counter()
+                self._send(job)
+                log.info(
+                    "email: %s -> %s за %.2f с (попытка %d)",
+                    job["subject"],
+                    ", ".join(job["to"]),
+                    time.perf_counter() - t0,
+                    attempt + 1,
+                )
+                return True, False
+            except _PERMANENT as e:
+                error, permanent = e, True
+                break
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+        log.error("email: %s -> %s не отправлено: %s", job["subject"], job["to"], error)
+        return False, self._to_outbox(job, error, permanent)
+
+    def _to_outbox(
+        self, job: Dict[str, Any], error: Exception | None, permanent: bool = False
+    ) -> bool:
+        """Сохраняет задание с копиями вложений; permanent — в failed/."""
+        if self.outbox is None:
+            return False
+        target = self.outbox / "failed" if permanent else self.outbox
+        target.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        files_dir = target / stem
+        copies = []
+        try:
+            for i, src in enumerate(Path(p) for p in job.get("attachments", [])):
+                if not src.exists():
+                    log.warning("email: вложение %s не найдено — без него", src)
+                    continue
+                # подкаталог на файл: имя вложения в письме не меняется
+                dst = files_dir / str(i) / src.name
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dst)
+                copies.append(str(dst))
+            record = {
+                **{k: v for k, v in job.items() if k != "outbox_files"},
+                "attachments": copies,
+                "outbox_files": str(files_dir) if copies else None,
+                "error": f"{type(error).__name__}: {error}",
+            }
+            path = target / f"{stem}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(record, ensure_ascii=False, indent=2), "utf-8")
+            tmp.replace(path)
+        except Exception:
+            shutil.rmtree(files_dir, ignore_errors=True)
+            log.exception("email: не удалось сохранить задание в outbox")
+            return False
+        if permanent:
+            log.error("email: постоянный отказ — задание отложено в %s", path)
+        else:
+            log.info("email: задание сохранено в outbox %s", path)
+        return True
+
+    def submit(self, job: Dict[str, Any]) -> Future:
+        return self._ex.submit(self._run, job)
+
+    def flush_outbox(self) -> List[Future]:
+        """
+        Переотправка сохранённых заданий из копий вложений. Файл задания
+        удаляется после попытки (неудача — новый файл с новыми копиями);
+        задания из failed/ не переотправляются.
+        """
+        if self.outbox is None or not self.outbox.exists():
+            return []
+        futures = []
+        for path in sorted(self.outbox.glob("*.json")):
+            try:
+                job = json.loads(path.read_text("utf-8"))
+                job.pop("error", None)
+            except Exception:
+                log.exception("email: повреждённое задание outbox %s", path)
+                continue
+            futures.append(self._ex.submit(self._run, job, path))
+        if futures:
+            log.info("email: из outbox переотправляется %d писем", len(futures))
+        return futures
+
+    def close(self, wait: bool = True) -> None:
+        self._ex.shutdown(wait=wait)
+        self.pool.close()
+
+
+_DISPATCHERS: Dict[tuple, Dispatcher] = {}
+_LOCK = threading.Lock()
+
+
+def get_dispatcher(email_cfg: Dict[str, Any]) -> Dispatcher:
+    """Диспетчер процесса для данного SMTP-сервера (создаётся один раз)."""
+    smtp_cfg = email_cfg.get("smtp", {}) or {}
+    host = smtp_cfg.get("host") or email_cfg.get("smtp_host")
+    port = int(smtp_cfg.get("port", email_cfg.get("smtp_port", 25)))
+    use_ssl = bool(smtp_cfg.get("use_ssl", email_cfg.get("use_ssl", False)))
+    username = email_cfg.get("username", "")
+    key = (host, port, username, use_ssl)
+    with _LOCK:
+        if key not in _DISPATCHERS:
+            dispatch_cfg = {**DEFAULTS, **(email_cfg.get("dispatch") or {})}
+            pool = SMTPPool(
+                host,
+                port,
+                username,
+                email_cfg.get("password", ""),
+                use_ssl,
+                size=int(dispatch_cfg["pool_size"]),
+            )
+            dispatcher = Dispatcher(pool, dispatch_cfg)
+            _DISPATCHERS[key] = dispatcher
+            atexit.register(dispatcher.close)
+            dispatcher.flush_outbox()
+        return _DISPATCHERS[key]
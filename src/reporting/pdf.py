@@ -1,6 +1,11 @@
 from __future__ import annotations
+import hashlib
+import os
 from pathlib import Path
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, BinaryIO, Union
+
+import numpy as np
+import pandas as pd
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -10,6 +15,7 @@ from reportlab.platypus import (
     Paragraph,
     Spacer,
     Image,
+    LongTable,
     Table,
     TableStyle,
 )
@@ -17,6 +23,32 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.utils import ImageReader
 
+from src.utils.logging import getLogger
+
+try:
+    from PIL import Image as PILImage
+
+    _PIL_OK = True
+except Exception:
+    _PIL_OK = False
+
+log = getLogger(__name__)
+
+# Пережатие картинок под размер на странице (reporting.pdf.images)
+IMAGE_DEFAULTS: Dict[str, Any] = {
+    "dpi": 150,  # пикселей на дюйм при показе; null — исходные файлы
+    "format": "png8",  # png8 (палитра 256 цветов) | jpeg | png
+    "jpeg_quality": 85,
+    "cache_dir": "reports/.render_cache/pdf",
+    "max_entries": 500,  # LRU, как у кэша рендера; 0 — без лимита
+}
+
+# Длинные таблицы (reporting.pdf.tables): лимит строк и размер куска LongTable
+TABLE_DEFAULTS: Dict[str, Any] = {"max_rows": 200, "chunk_rows": 100}
+
+# строки таблицы: список строк (первая — заголовок) или DataFrame
+TableRows = Union[List[List[Any]], pd.DataFrame]
+
 
 # --- кириллица ---
 def _register_fonts():
@@ -85,7 +117,8 @@ def _p(text: str) -> Paragraph:
 def _table(data: List[List[Any]], compact: bool = False) -> Table:
     if not data:
         data = [["нет данных"]]
-    tbl = Table(data)
+    # LongTable: заголовок повторяется на каждой странице
+    tbl = LongTable(data, repeatRows=1 if len(data) > 1 else 0)
     base_style = [
         ("FONTNAME", (0, 0), (-1, -1), _FONT),
         ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
@@ -111,45 +144,195 @@ def _table(data: List[List[Any]], compact: bool = False) -> Table:
     return tbl
 
 
+def frame_rows(df: pd.DataFrame, float_fmt: str = "%.4g") -> List[List[str]]:
+    """Заголовок + строки DataFrame; дробные числа форматируются столбцом целиком."""
+    cols = []
+    for c in df.columns:
+        ser = df[c]
+        if pd.api.types.is_float_dtype(ser):
+            cols.append(np.char.mod(float_fmt, ser.to_numpy(dtype=float)))
+        else:
+            cols.append(ser.astype(str).to_numpy())
+    body = np.column_stack(cols).tolist() if len(df) and cols else []
+    return [[str(c) for c in df.columns]] + body
+
+
+def _n_rows(rows: TableRows | None) -> int:
+    """Строк данных (без заголовка)."""
+    if rows is None:
+        return 0
+    if isinstance(rows, pd.DataFrame):
+        return len(rows)
+    return max(len(rows) - 1, 0) if len(rows) > 1 else len(rows)
+
+
+def table_flowables(
+    rows: TableRows,
+    compact: bool = False,
+    max_rows: int | None = None,
+    chunk_rows: int | None = None,
+) -> List[Any]:
+    """
+    Таблица для story: не больше max_rows строк (остаток — пометкой «ещё N
+    строк в Excel»), кусками по chunk_rows — LongTable с повтором заголовка.
+    Куски ограничивают стоимость вёрстки: большая таблица не перемеряется
+    целиком при каждом разрыве страницы.
+    """
+    max_rows = int(max_rows or TABLE_DEFAULTS["max_rows"])
+    chunk_rows = int(chunk_rows or TABLE_DEFAULTS["chunk_rows"])
+    total = _n_rows(rows)
+    if isinstance(rows, pd.DataFrame):
+        data = frame_rows(rows.head(max_rows))
+    else:
+        data = list(rows[: max_rows + 1])
+    if len(data) <= 1:
+        return [_table(data, compact=compact)]
+    header, body = data[0], data[1:]
+    out: List[Any] = [
+        _table([header] + body[i : i + chunk_rows], compact=compact)
+        for i in range(0, len(body), chunk_rows)
+    ]
+    if total > max_rows:
+        out.append(
+            _p(f"… ещё {total - max_rows} строк — полная таблица в Excel-отчёте.")
+        )
+    return out
+
+
+# --- изображения: пережатие под размер показа (с кэшем) ---
+def prepare_image(
+    img_path: str, w_pt: float, h_pt: float, images_cfg: Dict[str, Any] | None = None
+) -> str:
+    """
+    Копия картинки ровно под размер на странице (w_pt x h_pt при dpi), в
+    палитровом PNG или JPEG. Результат кэшируется по содержимому файла и
+    параметрам; при ошибке или без Pillow возвращается исходный путь.
+    """
+    s = {**IMAGE_DEFAULTS, **(images_cfg or {})}
+    if not _PIL_OK or not s.get("dpi"):
+        return img_path
+    try:
+        dpi = float(s["dpi"])
+        px = (max(1, round(w_pt / 72 * dpi)), max(1, round(h_pt / 72 * dpi)))
+        fmt = str(s["format"]).lower()
+        quality = int(s["jpeg_quality"])
+        h = hashlib.sha1(Path(img_path).read_bytes())
+        h.update(repr((px, fmt, quality)).encode())
+        out = Path(s["cache_dir"]) / (
+            h.hexdigest()[:24] + (".jpg" if fmt == "jpeg" else ".png")
+        )
+        if out.exists():
+            os.utime(out)  # используется — не вытеснять
+            return str(out)
+        with PILImage.open(img_path) as im:
+            im.load()
+            if im.mode in ("RGBA", "LA", "P"):
+                # прозрачность — на белый фон (как на странице)
+                rgba = im.convert("RGBA")
+                im = PILImage.new("RGB", rgba.size, "white")
+                im.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                im = im.convert("RGB")
+            if im.width > px[0] or im.height > px[1]:
+                im = im.resize(px, PILImage.Resampling.LANCZOS)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out.with_suffix(f".{os.getpid()}.tmp")
+            if fmt == "jpeg":
+                im.save(tmp, "JPEG", quality=quality, optimize=True)
+            elif fmt == "png8":
+                im.quantize(256, method=PILImage.Quantize.FASTOCTREE).save(
+                    tmp, "PNG", optimize=True
+                )
+            else:
+                im.save(tmp, "PNG", optimize=True)
+        os.replace(tmp, out)
+        return str(out)
+    except Exception:
+        log.exception("PDF: не удалось пережать %s — вставляю исходный файл", img_path)
+        return img_path
+
+
+def prune_image_cache(images_cfg: Dict[str, Any] | None = None) -> int:
+    """LRU: оставляет max_entries недавних картинок, возвращает число удалённых."""
+    s = {**IMAGE_DEFAULTS, **(images_cfg or {})}
+    root, limit = Path(s["cache_dir"]), int(s.get("max_entries") or 0)
+    if limit <= 0 or not root.exists():
+        return 0
+    files = sorted(
+        (p for p in root.iterdir() if p.suffix in (".png", ".jpg")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for p in files[limit:]:
+        p.unlink(missing_ok=True)
+    return max(0, len(files) - limit)
+
+
 # --- helper: вставка изображения с сохранением пропорций ---
 def _image_fit(
-    img_path: str, max_w: float = 480, max_h: float = 300, h_align: str = "CENTER"
+    img_path: str,
+    max_w: float = 480,
+    max_h: float = 300,
+    h_align: str = "CENTER",
+    images_cfg: Dict[str, Any] | None = None,
 ) -> Image:
     ir = ImageReader(img_path)
     iw, ih = ir.getSize()
     # масштаб с сохранением пропорций в рамку max_w x max_h
     scale = min(max_w / iw, max_h / ih)
     w, h = iw * scale, ih * scale
-    im = Image(img_path, width=w, height=h)
+    # lazy=2: данные картинки читаются при отрисовке и сразу освобождаются
+    im = Image(prepare_image(img_path, w, h, images_cfg), width=w, height=h, lazy=2)
     im.hAlign = h_align
     return im
 
 
-def to_pdf(
+class _BudgetDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate с лимитом страниц: после max_pages - 1 страниц остаток
+    story заменяется заключительной пометкой об обрезке — она встаёт на
+    последнюю, max_pages-ю страницу.
+    """
+
+    def __init__(self, *args, max_pages: int | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_pages = int(max_pages or 0)
+        self.pages = 0
+        self.dropped = 0
+        self._story: List[Any] = []
+
+    def build(self, flowables, *args, **kwargs):
+        self._story = flowables
+        super().build(flowables, *args, **kwargs)
+
+    def handle_pageEnd(self):
+        super().handle_pageEnd()
+        self.pages += 1
+        cut = max(self.max_pages - 1, 1)
+        if self.max_pages and self.pages >= cut and self._story and not self.dropped:
+            # страница закрыта, следующая ещё не начата — обрываем story здесь
+            self.dropped = len(self._story)
+            self._story[:] = [
+                Spacer(1, 6),
+                _p(
+                    f"Отчёт обрезан по лимиту {self.max_pages} стр.: пропущено "
+                    f"элементов — {self.dropped}. Полные таблицы — в Excel-отчёте."
+                ),
+            ]
+
+
+def build_story(
     images_with_captions: List[Tuple[str, str]],
-    out_dir: Path,
-    filename: str = "report.pdf",
     meta: Dict[str, Any] | None = None,
-    comparison_aggregates: List[Dict[str, Any]] | None = None,
-    extra_tables: List[Tuple[str, List[List[str]]]] | None = None,
+    extra_tables: List[Tuple[str, TableRows]] | None = None,
     compact: bool = False,
-) -> str:
-    out_dir.mkdir(parents=True, exist_ok=True)
-    path = out_dir / filename
-
-    doc = SimpleDocTemplate(
-        str(path),
-        pagesize=A4,
-        leftMargin=36,
-        rightMargin=36,
-        topMargin=36,
-        bottomMargin=36,
-    )
+    images_cfg: Dict[str, Any] | None = None,
+    tables_cfg: Dict[str, Any] | None = None,
+) -> List[Any]:
     story: List[Any] = []
 
     meta = meta or {}
     title = meta.get("title", "Отчёт")
-    author = meta.get("author", "Pipeline")
     intro = meta.get("intro_paragraphs", [])
 
     story.append(_h1(title))
@@ -161,18 +344,67 @@ def to_pdf(
         for title_or_h2, rows in extra_tables:
             if title_or_h2.startswith("## "):
                 story.append(_h2(title_or_h2[3:]))
-            elif rows:
+            elif _n_rows(rows):
                 story.append(_p(title_or_h2))
-            if rows:
-                story.append(_table(rows, compact=True if compact else False))
+            if _n_rows(rows):
+                story.extend(
+                    table_flowables(rows, compact=compact, **(tables_cfg or {}))
+                )
 
     # Картинки (сохранение пропорций; квадратные остаются квадратными)
     for i, (img_path, caption) in enumerate(images_with_captions, 1):
         story.append(Spacer(1, 6 if compact else 10))
         story.append(_p(f"Рисунок {i}. {Path(img_path).name}"))
-        story.append(_image_fit(img_path, max_w=480, max_h=300, h_align="CENTER"))
+        story.append(
+            _image_fit(
+                img_path, max_w=480, max_h=300, h_align="CENTER", images_cfg=images_cfg
+            )
+        )
         if caption:
             story.append(_p(caption))
+    return story
+
 
+def write_pdf(
+    story: List[Any], target: str | BinaryIO, max_pages: int | None = None
+) -> int:
+    """Вёрстка story в файл или поток; возвращает число страниц."""
+    doc = _BudgetDocTemplate(
+        target,
+        pagesize=A4,
+        leftMargin=36,
+        rightMargin=36,
+        topMargin=36,
+        bottomMargin=36,
+        max_pages=max_pages,
+    )
     doc.build(story)
+    if doc.dropped:
+        log.warning(
+            "PDF: лимит %d стр. — отброшено элементов отчёта: %d",
+            doc.max_pages,
+            doc.dropped,
+        )
+    return doc.pages
+
+
+def to_pdf(
+    images_with_captions: List[Tuple[str, str]],
+    out_dir: Path,
+    filename: str = "report.pdf",
+    meta: Dict[str, Any] | None = None,
+    comparison_aggregates: List[Dict[str, Any]] | None = None,
+    extra_tables: List[Tuple[str, TableRows]] | None = None,
+    compact: bool = False,
+    images_cfg: Dict[str, Any] | None = None,
+    max_pages: int | None = None,
+    tables_cfg: Dict[str, Any] | None = None,
+) -> str:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / filename
+    story = build_story(
+        images_with_captions, meta, extra_tables, compact, images_cfg, tables_cfg
+    )
+    write_pdf(story, str(path), max_pages)
+    prune_image_cache(images_cfg)
     return str(path)
@@ -5,6 +5,8 @@ from typing import Dict, Optional
 import pandas as pd
 import plotly.express as px
 
+from src.reporting import rollup
+
 
 def monthly_revenue_html(
     df: pd.DataFrame,
@@ -12,6 +14,7 @@ def monthly_revenue_html(
     amount_col: str,
     out_path: Path | str,
     units: Optional[Dict] = None,
+    cube: Optional[Dict] = None,
 ) -> Optional[str]:
     units = units or {
         "currency_label": "у.е.",
@@ -22,15 +25,20 @@ def monthly_revenue_html(
     cur = units.get("currency_label", "у.е.")
     amount_label = units.get("amount_label", "Выручка")
 
-    if date_col not in df.columns or amount_col not in df.columns:
+    cols = set(df.columns) | (rollup.covered_columns(cube) if cube else set())
+    if date_col not in cols or amount_col not in cols:
         return None
 
-    d = pd.to_datetime(df[date_col], errors="coerce")
-    tmp = df.assign(_d=d).dropna(subset=["_d", amount_col])
-    ser = tmp.groupby(tmp["_d"].dt.to_period("M"))[amount_col].sum().sort_index()
+    if cube is None or (cube["columns"]["date"], cube["columns"]["amount"]) != (
+        date_col,
+        amount_col,
+    ):
+        cube = rollup.build_rollup(df, date_col, amount_col)
+    ser = rollup.revenue(cube, "M")
+    dmin, dmax = rollup.date_range(cube)
 
-    n = len(tmp)
-    title = f"{amount_label} по месяцам — период {d.min():%Y-%m}…{d.max():%Y-%m} (N={n}, валюта: {cur})"
+    n = rollup.revenue_rows(cube)
+    title = f"{amount_label} по месяцам — период {dmin:%Y-%m}…{dmax:%Y-%m} (N={n}, валюта: {cur})"
 
     x = ser.index.astype(str)
     fig = px.line(x=x, y=ser.values, markers=True)
@@ -66,16 +74,20 @@ def top_customers_html(
     out_path: Path | str,
     top_n: int = 10,
     units: Optional[Dict] = None,
+    cube: Optional[Dict] = None,
 ) -> Optional[str]:
     units = units or {"orders_label": "Заказы"}
     orders_label = units.get("orders_label", "Заказы")
 
-    if customer_col not in df.columns:
+    cols = set(df.columns) | (rollup.covered_columns(cube) if cube else set())
+    if customer_col not in cols:
         return None
 
-    top = df.groupby(customer_col).size().sort_values(ascending=False).head(int(top_n))
-    n_orders = len(df)
-    n_users = df[customer_col].nunique()
+    if cube is None or cube["columns"]["customer"] != customer_col:
+        cube = rollup.build_rollup(df, customer_col=customer_col)
+    top = rollup.top_customers(cube, int(top_n))
+    n_orders = rollup.total_orders(cube)
+    n_users = len(cube["customers"])
     title = f"Топ-{len(top)} клиентов по числу заказов (N={n_orders}, уник. клиентов={n_users})"
 
     fig = px.bar(x=top.index.astype(str), y=top.values)
@@ -6,10 +6,13 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from src.reporting import rollup
+from src.reporting.render import ChartJob, cached_png, render_images
+
 ID_COLUMNS = {"order_id", "customer_id"}
 
 
-def _units(plots_cfg: Dict, df: pd.DataFrame):
+def _units(plots_cfg: Dict, cube: Dict):
     u = (
         plots_cfg.get("parent_units")
         or plots_cfg.get("units")
@@ -25,13 +28,10 @@ def _units(plots_cfg: Dict, df: pd.DataFrame):
     orders_label = u.get("orders_label", "Заказы")
     date_fmt = u.get("date_format", "%Y-%m")
 
-    dmin = dmax = None
-    if "order_date" in df.columns:
-        dser = pd.to_datetime(df["order_date"], errors="coerce")
-        dmin, dmax = dser.min(), dser.max()
+    dmin, dmax = rollup.date_range(cube)
     period_txt = (
         f" — период {dmin:%Y-%m-%d}…{dmax:%Y-%m-%d}"
-        if (dmin is not None and dmax is not None)
+        if (pd.notna(dmin) and pd.notna(dmax))
         else ""
     )
     return cur, amount_label, orders_label, date_fmt, period_txt
@@ -102,10 +102,7 @@ def _sales_box(df, cfg, outdir, cur, amount_label):
     return (img, cap)
 
 
-def _ts_orders(df, cfg, outdir, orders_label, period_txt):
-    date_col = cfg.get("date_col", "order_date")
-    sdate = pd.to_datetime(df[date_col], errors="coerce")
-    ser = sdate.dropna().dt.floor("D").value_counts().sort_index()
+def _ts_orders(ser, cfg, outdir, orders_label, period_txt):
     fig, ax = plt.subplots(figsize=(8, 4))
     ax.plot(ser.index, ser.values, linewidth=1.3)
     p = Path(outdir) / cfg.get("filename", "sales/orders_over_time.png")
@@ -117,11 +114,7 @@ def _ts_orders(df, cfg, outdir, orders_label, period_txt):
     return (img, cap)
 
 
-def _top_customers(df, cfg, outdir, orders_label, period_txt):
-    id_col = cfg.get("id_col", "customer_id")
-    top_n = int(cfg.get("top_n", 10))
-    top = df.groupby(id_col).size().sort_values(ascending=False).head(top_n)
-
+def _top_customers(top, cfg, outdir, orders_label, period_txt):
     # рисуем по числовым позициям — без category-предупреждений
     idx = np.arange(len(top))
     labels = top.index.astype(str).tolist()
@@ -142,12 +135,7 @@ def _top_customers(df, cfg, outdir, orders_label, period_txt):
     return (img, cap)
 
 
-def _monthly_revenue(df, cfg, outdir, cur, amount_label):
-    date_col = cfg.get("date_col", "order_date")
-    amount_col = cfg.get("amount_col", "amount")
-    d = pd.to_datetime(df[date_col], errors="coerce")
-    tmp = df.assign(_d=d).dropna(subset=["_d", amount_col])
-    ser = tmp.groupby(tmp["_d"].dt.to_period("M"))[amount_col].sum().sort_index()
+def _monthly_revenue(ser, cfg, outdir, cur, amount_label):
     x = ser.index.to_timestamp()
     fig, ax = plt.subplots(figsize=(8, 4))
     ax.plot(x, ser.values, marker="o", linewidth=1.5)
@@ -160,19 +148,7 @@ def _monthly_revenue(df, cfg, outdir, cur, amount_label):
     return (img, cap)
 
 
-def _monthly_revenue_by_source(df, cfg, outdir, cur, amount_label):
-    date_col = cfg.get("date_col", "order_date")
-    amount_col = cfg.get("amount_col", "amount")
-    if "source" not in df.columns:
-        return None
-    d = pd.to_datetime(df[date_col], errors="coerce")
-    tmp = df.assign(_d=d).dropna(subset=["_d", amount_col, "source"])
-    g = (
-        tmp.groupby([tmp["_d"].dt.to_period("M"), "source"])[amount_col]
-        .sum()
-        .sort_index()
-    )
-
+def _monthly_revenue_by_source(g, cfg, outdir, cur, amount_label):
     styles = [
         {"linestyle": "-", "marker": "o"},
         {"linestyle": "--", "marker": "s"},
@@ -218,11 +194,7 @@ def _monthly_revenue_by_source(df, cfg, outdir, cur, amount_label):
     return (img, cap)
 
 
-def _source_share_pie(df, cfg, outdir):
-    if "source" not in df.columns:
-        return None
-    ser = df["source"].fillna("NA").value_counts()
-
+def _source_share_pie(ser, cfg, outdir):
     fig, ax = plt.subplots(figsize=(5.8, 5.8))
     ax.pie(ser.values, labels=ser.index.astype(str), autopct="%1.1f%%")
     ax.set_aspect("equal", adjustable="box")
@@ -233,15 +205,7 @@ def _source_share_pie(df, cfg, outdir):
     return (img, cap)
 
 
-def _cumulative_revenue_by_source(df, cfg, outdir, cur, amount_label):
-    date_col = cfg.get("date_col", "order_date")
-    amount_col = cfg.get("amount_col", "amount")
-    if "source" not in df.columns:
-        return None
-    d = pd.to_datetime(df[date_col], errors="coerce")
-    tmp = df.assign(_d=d).dropna(subset=["_d", amount_col, "source"])
-    g = tmp.groupby([tmp["_d"].dt.floor("D"), "source"])[amount_col].sum().sort_index()
-
+def _cumulative_revenue_by_source(g, cfg, outdir, cur, amount_label):
     styles = [
         {"linestyle": "-", "marker": None},
         {"linestyle": "--", "marker": None},
@@ -306,56 +270,135 @@ def _corr_matrix(df, cfg, outdir):
     return (img, cap)
 
 
-def generate_sales_plots(
-    df: pd.DataFrame, plots_cfg: Dict, outdir: Path
-) -> List[Tuple[str, str]]:
+def sales_plot_jobs(
+    df: pd.DataFrame, plots_cfg: Dict, outdir: Path, cube: Dict | None = None
+) -> List[ChartJob]:
+    """
+    Задания рендера графиков продаж (render.ChartJob). Агрегатные графики
+    (динамика, выручка, доли, топ клиентов) получают только свой ряд,
+    посчитанный по кубу rollup, — ключ кэша рендера зависит от того, что
+    график рисует, а не от всего куба; распределения (hist/box/corr) —
+    только нужные колонки df.
+    """
     outdir = Path(outdir)
     outdir.mkdir(parents=True, exist_ok=True)
-
-    cur, amount_label, orders_label, date_fmt, period_txt = _units(plots_cfg, df)
+    cube = cube if cube is not None else rollup.build_rollup(df)
+    cubes = {
+        (
+            cube["columns"]["date"],
+            cube["columns"]["amount"],
+            cube["columns"]["customer"],
+        ): cube
+    }
+
+    def cube_for(spec: Dict) -> Dict:
+        # спецификация с другими колонками — свой куб (один на набор колонок)
+        cols = cube["columns"]
+        key = (
+            spec.get("date_col", cols["date"]),
+            spec.get("amount_col", cols["amount"]),
+            spec.get("id_col", cols["customer"]),
+        )
+        if key not in cubes:
+            cubes[key] = rollup.build_rollup(df, *key)
+        return cubes[key]
+
+    def cols_of(*names) -> pd.DataFrame:
+        return df[[c for c in names if c in df.columns]]
+
+    cur, amount_label, orders_label, date_fmt, period_txt = _units(plots_cfg, cube)
+    # колонки, доступные агрегатным графикам: строки df или куб
+    agg_cols = set(df.columns) | rollup.covered_columns(cube)
+    revenue_cols = {"order_date", "amount"} <= agg_cols
     sales_specs = plots_cfg.get("sales") or []
     combined_specs = plots_cfg.get("combined") or []
 
-    images: List[Tuple[str, str]] = []
-
+    jobs: List[ChartJob] = []
     for spec in sales_specs:
         kind = spec.get("kind")
+        col = spec.get("column", "amount")
         if kind == "hist" and "amount" in df.columns:
-            images.append(_sales_hist(df, spec, outdir, cur, amount_label))
+            args = (cols_of(col), spec, outdir, cur, amount_label)
+            jobs.append((kind, _sales_hist, args))
         elif kind == "hist_trim" and "amount" in df.columns:
-            images.append(_sales_hist_trim(df, spec, outdir, cur, amount_label))
+            args = (cols_of(col), spec, outdir, cur, amount_label)
+            jobs.append((kind, _sales_hist_trim, args))
         elif kind == "box" and "amount" in df.columns:
-            images.append(_sales_box(df, spec, outdir, cur, amount_label))
-        elif kind == "ts_orders" and "order_date" in df.columns:
-            images.append(_ts_orders(df, spec, outdir, orders_label, period_txt))
-        elif kind == "top_customers" and "customer_id" in df.columns:
-            images.append(_top_customers(df, spec, outdir, orders_label, period_txt))
-        elif kind == "monthly_revenue" and {"order_date", "amount"}.issubset(
-            df.columns
-        ):
-            images.append(_monthly_revenue(df, spec, outdir, cur, amount_label))
-        elif kind == "monthly_revenue_by_source" and {"order_date", "amount"}.issubset(
-            df.columns
-        ):
-            res = _monthly_revenue_by_source(df, spec, outdir, cur, amount_label)
-            if res:
-                images.append(res)
-        elif kind == "source_share_pie" and "source" in df.columns:
-            res = _source_share_pie(df, spec, outdir)
-            if res:
-                images.append(res)
-        elif kind == "cumulative_revenue_by_source" and {
-            "order_date",
-            "amount",
-        }.issubset(df.columns):
-            res = _cumulative_revenue_by_source(df, spec, outdir, cur, amount_label)
-            if res:
-                images.append(res)
+            args = (cols_of(col, "source"), spec, outdir, cur, amount_label)
+            jobs.append((kind, _sales_box, args))
+        elif kind == "ts_orders" and "order_date" in agg_cols:
+            ser = rollup.orders_by_day(cube_for(spec))
+            args = (ser, spec, outdir, orders_label, period_txt)
+            jobs.append((kind, _ts_orders, args))
+        elif kind == "top_customers" and "customer_id" in agg_cols:
+            top = rollup.top_customers(cube_for(spec), int(spec.get("top_n", 10)))
+            args = (top, spec, outdir, orders_label, period_txt)
+            jobs.append((kind, _top_customers, args))
+        elif kind == "monthly_revenue" and revenue_cols:
+            ser = rollup.revenue(cube_for(spec), "M")
+            args = (ser, spec, outdir, cur, amount_label)
+            jobs.append((kind, _monthly_revenue, args))
+        elif kind == "monthly_revenue_by_source" and revenue_cols:
+            c = cube_for(spec)
+            if "source" in c["dims"]:
+                g = rollup.revenue(c, "M", by="source")
+                args = (g, spec, outdir, cur, amount_label)
+                jobs.append((kind, _monthly_revenue_by_source, args))
+        elif kind == "source_share_pie" and "source" in cube["dims"]:
+            ser = rollup.orders_by(cube, "source")
+            jobs.append((kind, _source_share_pie, (ser, spec, outdir)))
+        elif kind == "cumulative_revenue_by_source" and revenue_cols:
+            c = cube_for(spec)
+            if "source" in c["dims"]:
+                g = rollup.revenue(c, "D", by="source")
+                args = (g, spec, outdir, cur, amount_label)
+                jobs.append((kind, _cumulative_revenue_by_source, args))
 
     for spec in combined_specs:
         if spec.get("kind") == "corr":
-            res = _corr_matrix(df, spec, outdir)
-            if res:
-                images.append(res)
+            num = df.select_dtypes(include=[np.number])
+            jobs.append(("corr", _corr_matrix, (num, spec, outdir)))
+    return jobs
 
-    return images
+
+def generate_sales_plots(
+    df: pd.DataFrame,
+    plots_cfg: Dict,
+    outdir: Path,
+    cube: Dict | None = None,
+    workers: int = 1,
+) -> List[Tuple[str, str]]:
+    return render_images(sales_plot_jobs(df, plots_cfg, outdir, cube), workers)
+
+
+@cached_png
+def forecast_plot(
+    history: pd.DataFrame,
+    forecast: pd.DataFrame,
+    series: List[str],
+    path: Path,
+    title: str,
+    ylabel: str,
+    band: bool = True,
+) -> str:
+    """
+    Факт (history: индекс — период, колонки — ряды) и прогноз
+    (long: series/period/forecast/lower/upper) для перечисленных рядов.
+    """
+    fig, ax = plt.subplots(figsize=(9, 4))
+    for i, name in enumerate(series):
+        color = f"C{i % 10}"
+        ax.plot(history.index, history[name].values, color=color, linewidth=1.2)
+        fc = forecast[forecast["series"] == name]
+        # прогноз стыкуется с последней точкой факта
+        x = [history.index[-1]] + fc["period"].tolist()
+        y = [history[name].iloc[-1]] + fc["forecast"].tolist()
+        ax.plot(x, y, color=color, linestyle="--", linewidth=1.5, label=name)
+        if band:
+            ax.fill_between(
+                fc["period"], fc["lower"], fc["upper"], color=color, alpha=0.2
+            )
+    ax.axvline(history.index[-1], color="grey", linewidth=0.8, linestyle=":")
+    if len(series) > 1:
+        ax.legend(fontsize=8)
+    return _save(ax, Path(path), title, "Период", ylabel)
@@ -0,0 +1,373 @@
+"""
+Планировщик рендера графиков.
+
+График описывается заданием ChartJob = (имя, функция, аргументы): функция
+модульного уровня рисует один PNG по уже агрегированным входам (свой ряд
+по кубу rollup, нужные колонки) и возвращает (path, caption) или None.
+Задания рендерятся в пуле процессов с backend Agg (pyplot не
+потокобезопасен) или последовательно, если процессов ≤ 1. Результаты
+возвращаются в порядке заданий независимо от порядка завершения, время
+рендера каждого графика логируется и отдаётся вызывающему.
+
+Кэш рендера (RenderCache, reporting.render.cache): ключ графика — хеш
+исходника модуля функции (и модулей проекта, чьи функции он вызывает —
+вспомогательные функции рисования), её агрегированных входов
+(массивы/DataFrame по содержимому), спецификации из config.yaml и версий
+библиотек. При попадании готовый PNG берётся из кэша без рендера (файл на
+месте перезаписывается, если его хеш не совпадает с записью кэша); запись,
+вытесненная новым ключом для того же файла, удаляется, общий размер
+ограничен max_entries (LRU). Функции, рисующие PNG напрямую
+(src/ml/plots.py, forecast_plot), кэшируются декоратором cached_png; их
+попадания в процессах ML-задач логируются там же (scheduler).
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+ChartJob = Tuple[str, Callable[..., Any], tuple]
+Image = Tuple[str, str]
+
+
+def _library_versions() -> Dict[str, str]:
+    versions = {
+        "matplotlib": matplotlib.__version__,
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+    try:
+        import seaborn
+
+        versions["seaborn"] = seaborn.__version__
+    except Exception:
+        pass
+    return versions
+
+
+def _digest(h, obj: Any) -> None:
+    """Содержимое аргумента графика в хеш (DataFrame/массивы — по значениям)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        cols = obj.columns if isinstance(obj, pd.DataFrame) else [obj.name]
+        dtypes = obj.dtypes if isinstance(obj, pd.DataFrame) else [obj.dtype]
+        h.update(repr(([str(c) for c in cols], [str(t) for t in dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        if obj.dtype == object:
+            h.update(pd.util.hash_array(obj.ravel()).tobytes())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=str):
+            h.update(str(k).encode("utf-8"))
+            _digest(h, obj[k])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for x in obj:
+            _digest(h, x)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode("utf-8"))
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source(name: str) -> str:
+    module = sys.modules.get(name)
+    try:
+        return inspect.getsource(module)
+    except (OSError, TypeError):
+        return name
+
+
+def _source(fn: Callable[..., Any]) -> str:
+    """
+    Исходник модуля функции и модулей проекта (src.*), из которых он берёт
+    функции: правка вспомогательной функции рисования меняет ключ.
+    """
+    name = getattr(fn, "__module__", None)
+    if name not in sys.modules:
+        return f"{name}.{getattr(fn, '__qualname__', fn)}"
+    deps = set()
+    for obj in vars(sys.modules[name]).values():
+        dep = (
+            obj.__name__ if inspect.ismodule(obj) else getattr(obj, "__module__", None)
+        )
+        if (
+            isinstance(dep, str)
+            and dep.startswith("src.")
+            and dep not in (name, __name__)
+        ):
+            deps.add(dep)
+    return "\n".join(
+        [f"{fn.__qualname__}", _module_source(name)]
+        + [_module_source(d) for d in sorted(deps)]
+    )
+
+
+def _file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class RenderCache:
+    """PNG по ключу: <root>/<key>.png + <key>.json; paths/ — текущий ключ файла."""
+
+    def __init__(self, root: str | Path, max_entries: int = 500):
+        self.root = Path(root)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def key(self, fn: Callable[..., Any], args: tuple, kwargs: Dict | None = None):
+        h = hashlib.sha1(_source(fn).encode("utf-8"))
+        _digest(h, _library_versions())
+        _digest(h, list(args))
+        _digest(h, kwargs or {})
+        return h.hexdigest()[:24]
+
+    def lookup(self, key: str) -> Optional[Image]:
+        png, meta_p = self.root / f"{key}.png", self.root / f"{key}.json"
+        if not (png.exists() and meta_p.exists()):
+            self.misses += 1
+            return None
+        meta = json.loads(meta_p.read_text("utf-8"))
+        dst = Path(meta["path"])
+        # файл на месте мог остаться от другого ключа — сверяем содержимое
+        if not dst.exists() or _file_sha1(dst) != meta.get("sha1"):
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(png, dst)
+        os.utime(meta_p)  # используется — не вытеснять
+        self.hits += 1
+        return meta["path"], meta["caption"]
+
+    def store(self, key: str, image: Image) -> None:
+        path, caption = image
+        self.root.mkdir(parents=True, exist_ok=True)
+        png = self.root / f"{key}.png"
+        shutil.copyfile(path, png)
+        meta = {"path": path, "caption": caption, "sha1": _file_sha1(png)}
+        (self.root / f"{key}.json").write_text(
+            json.dumps(meta, ensure_ascii=False), "utf-8"
+        )
+        # прежний ключ того же файла устарел (изменились данные/спека)
+        ptr = self.root / "paths" / hashlib.sha1(path.encode("utf-8")).hexdigest()
+        ptr.parent.mkdir(exist_ok=True)
+        old = ptr.read_text("utf-8") if ptr.exists() else None
+        if old and old != key:
+            self._evict(old)
+        tmp = ptr.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(key, "utf-8")
+        os.replace(tmp, ptr)
+
+    def _evict(self, key: str) -> None:
+        for ext in ("png", "json"):
+            (self.root / f"{key}.{ext}").unlink(missing_ok=True)
+        self.evicted += 1
+
+    def prune(self) -> None:
+        if self.max_entries <= 0 or not self.root.exists():
+            return
+        entries = sorted(
+            self.root.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        for meta_p in entries[self.max_entries :]:
+            self._evict(meta_p.stem)
+
+    def counts(self) -> Tuple[int, int, int]:
+        return self.hits, self.misses, self.evicted
+
+    def log_stats(
+        self, label: str = "графики", since: Tuple[int, int, int] = (0, 0, 0)
+    ) -> None:
+        """since — counts() на начало участка: логируется только его прирост."""
+        hits, misses, evicted = (a - b for a, b in zip(self.counts(), since))
+        log.info(
+            "Кэш рендера (%s): попаданий %d, промахов %d, вытеснено %d",
+            label,
+            hits,
+            misses,
+            evicted,
+        )
+
+
+_CACHE: RenderCache | None = None
+
+
+def configure_cache(render_cfg: Dict[str, Any] | None) -> RenderCache | None:
+    """Кэш рендера процесса из reporting.render.cache (наследуется при fork)."""
+    global _CACHE
+    cache_cfg = (render_cfg or {}).get("cache", {}) or {}
+    if not bool(cache_cfg.get("enabled", False)):
+        _CACHE = None
+    else:
+        _CACHE = RenderCache(
+            cache_cfg.get("dir", "reports/.render_cache"),
+            int(cache_cfg.get("max_entries", 500)),
+        )
+    return _CACHE
+
+
+def get_cache() -> RenderCache | None:
+    return _CACHE
+
+
+def cached_png(fn: Callable[..., str]) -> Callable[..., str]:
+    """Кэш для функций, которые рисуют PNG и возвращают его путь."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return fn(*args, **kwargs)
+        try:
+            key = cache.key(fn, args, kwargs)
+            hit = cache.lookup(key)
+        except Exception:
+            log.exception("Кэш рендера: ошибка чтения — рисуем заново")
+            key, hit = None, None
+        if hit:
+            log.info("Кэш рендера: %s из кэша", hit[0])
+            return hit[0]
+        path = fn(*args, **kwargs)
+        if key:
+            try:
+                cache.store(key, (str(path), ""))
+            except Exception:
+                log.exception("Кэш рендера: не удалось сохранить %s", path)
+        return path
+
+    return wrapper
+
+
+def _init_worker() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+
+
+def _run_job(job: ChartJob) -> Tuple[Optional[Image], float, str | None]:
+    name, fn, args = job
+    t0 = time.perf_counter()
+    try:
+        res = fn(*args)
+        error = None
+    except Exception as e:  # один упавший график не роняет остальные
+        res, error = None, f"{type(e).__name__}: {e}"
+        import matplotlib.pyplot as plt
+
+        plt.close("all")
+    seconds = time.perf_counter() - t0
+    # seaborn-функции возвращают (None, "") при отсутствии данных
+    if not res or res[0] is None:
+        res = None
+    return (str(res[0]), str(res[1])) if res else None, seconds, error
+
+
+def workers_from_cfg(render_cfg: Dict[str, Any] | None) -> int:
+    workers = (render_cfg or {}).get("workers")
+    return int(workers or os.cpu_count() or 1)
+
+
+def render_charts(
+    jobs: Sequence[ChartJob],
+    workers: int = 1,
+    cache: RenderCache | None = None,
+) -> Tuple[List[Optional[Image]], List[Dict[str, Any]]]:
+    """
+    Рендер заданий; возвращает (результаты в порядке jobs — None для пустых
+    и упавших, тайминги [{chart, seconds, ok, cached}]).
+    cache=None — кэш процесса из configure_cache (если включён).
+    """
+    jobs = list(jobs)
+    cache = cache if cache is not None else get_cache()
+    t0 = time.perf_counter()
+
+    outcomes: List[Any] = [None] * len(jobs)
+    keys: List[Optional[str]] = [None] * len(jobs)
+    todo: List[int] = []
+    for i, (_, fn, args) in enumerate(jobs):
+        if cache is not None:
+            try:
+                keys[i] = cache.key(fn, args)
+                hit = cache.lookup(keys[i])
+            except Exception:
+                log.exception("Кэш рендера: ошибка чтения — рисуем заново")
+                hit = None
+            if hit:
+                outcomes[i] = (hit, 0.0, None)
+                continue
+        todo.append(i)
+
+    workers = max(1, min(int(workers or 1), len(todo)))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+            done = list(ex.map(_run_job, [jobs[i] for i in todo]))
+    else:
+        done = [_run_job(jobs[i]) for i in todo]
+    for i, outcome in zip(todo, done):
+        outcomes[i] = outcome
+        if cache is not None and keys[i] and outcome[0]:
+            try:
+                cache.store(keys[i], outcome[0])
+            except Exception:
+                log.exception("Кэш рендера: не удалось сохранить %s", outcome[0][0])
+
+    results: List[Optional[Image]] = []
+    timings: List[Dict[str, Any]] = []
+    fresh = set(todo)
+    for i, ((name, _, _), (res, seconds, error)) in enumerate(zip(jobs, outcomes)):
+        results.append(res)
+        timings.append(
+            {
+                "chart": name,
+                "seconds": round(seconds, 4),
+                "ok": error is None,
+                "cached": i not in fresh,
+            }
+        )
+        if error:
+            log.error("Рендер %s: ошибка %s — пропускаем", name, error)
+        elif i in fresh:
+            log.info("Рендер %s: %.3f с", name, seconds)
+    if jobs:
+        log.info(
+            "Рендер графиков: %d шт. (нарисовано %d) за %.2f с (процессов %d)",
+            len(jobs),
+            len(todo),
+            time.perf_counter() - t0,
+            workers,
+        )
+    if cache is not None:
+        cache.prune()
+        cache.log_stats()
+    return results, timings
+
+
+def render_images(jobs: Sequence[ChartJob], workers: int = 1) -> List[Image]:
+    """render_charts без пустых результатов — список (path, caption)."""
+    results, _ = render_charts(jobs, workers)
+    return [r for r in results if r]
@@ -0,0 +1,183 @@
+"""
+Параллельная сборка артефактов отчёта (PDF, Excel, HTML).
+
+Артефакты не зависят друг от друга. Сборщики (reportlab, xlsxwriter,
+сериализация plotly/JSON) — чистый Python и держат GIL, поэтому в пуле
+потоков почти не ускоряются; по умолчанию задачи идут в пуле процессов
+(executor: process, backend Agg, как у рендера графиков). Задача — функция
+модульного уровня и её аргументы (не замыкание): они и результат
+передаются через pickle. Задачи из inline (по умолчанию excel — самая
+долгая и с самыми большими кадрами на входе) выполняются в текущем
+процессе одновременно с пулом, без копирования кадров. executor: thread
+оставлен для сборщиков, упирающихся в ввод-вывод.
+
+Упавшая задача не роняет остальные — вместо результата подставляется
+значение по умолчанию. Общий бюджет времени (budget_seconds) — best-effort:
+он ограничивает ожидание задач пула, не уложившиеся логируются и получают
+значение по умолчанию. Процессы пула при этом завершаются (terminate), так
+что прогон не ждёт их на выходе; поток и inline-задачу прервать нельзя —
+они дорабатывают. Сборщики пишут файл во временный и переименовывают его
+целиком, поэтому прерванная сборка оставляет прежний отчёт, а не обрывок.
+Итоговая строка таймингов (artifact="total") — wall-время, сумма времени
+задач и их отношение (speedup): оценка выигрыша против последовательной
+сборки, на одном ядре — около 1.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from src.reporting.render import _init_worker
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+# имя -> (функция модульного уровня, аргументы, значение при ошибке/таймауте)
+ArtifactTask = Tuple[Callable[..., Any], tuple, Any]
+EXECUTORS = ("process", "thread")
+
+
+def _run_task(
+    name: str, fn: Callable[..., Any], args: tuple
+) -> Tuple[Any, float, str | None]:
+    t0 = time.perf_counter()
+    try:
+        res, error = fn(*args), None
+    except Exception as e:  # один упавший артефакт не роняет остальные
+        log.exception("Артефакт %s: ошибка %s", name, e)
+        res, error = None, f"{type(e).__name__}: {e}"
+    return res, time.perf_counter() - t0, error
+
+
+def _executor(kind: str, workers: int) -> Executor:
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact")
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def _terminate(ex: Executor) -> None:
+    """Останавливает процессы пула, не уложившиеся в бюджет (потоки — не умеем)."""
+    if not isinstance(ex, ProcessPoolExecutor):
+        return
+    terminate = getattr(ex, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for proc in list((getattr(ex, "_processes", None) or {}).values()):
+        proc.terminate()
+
+
+def build_artifacts(
+    tasks: Dict[str, ArtifactTask],
+    workers: int = 1,
+    budget_seconds: float | None = None,
+    executor: str = "process",
+    inline: Iterable[str] = (),
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Выполняет задачи; возвращает (результаты по именам, тайминги
+    [{artifact, seconds, ok, status}] в порядке tasks + итоговая строка
+    artifact="total" с wall-временем и speedup), status: ok | error | timeout.
+    workers ≤ 1 — последовательно в текущем процессе (бюджет не применяется);
+    inline — задачи, которые выполняются в текущем процессе параллельно с пулом.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"executor: ожидается одно из {EXECUTORS}, получено {executor!r}"
+        )
+    t0 = time.perf_counter()
+    results: Dict[str, Any] = {}
+    timings: List[Dict[str, Any]] = []
+
+    def record(name: str, seconds: float, status: str) -> None:
+        timings.append(
+            {
+                "artifact": name,
+                "seconds": round(seconds, 4),
+                "ok": status == "ok",
+                "status": status,
+            }
+        )
+
+    def collect(name: str, outcome: Tuple[Any, float, str | None]) -> None:
+        res, seconds, error = outcome
+        results[name] = tasks[name][2] if error else res
+        record(name, seconds, "error" if error else "ok")
+
+    inline = [n for n in tasks if n in set(inline)]
+    pooled = [n for n in tasks if n not in inline]
+    workers = max(1, min(int(workers or 1), len(tasks)))
+    mode = "sequential" if workers == 1 or not pooled else executor
+    if mode == "sequential":
+        for name, (fn, args, _) in tasks.items():
+            collect(name, _run_task(name, fn, args))
+    else:
+        workers = min(workers, len(pooled))
+        ex = _executor(executor, workers)
+        futures = {
+            name: ex.submit(_run_task, name, *tasks[name][:2]) for name in pooled
+        }
+        for name in inline:
+            collect(name, _run_task(name, *tasks[name][:2]))
+        left = None
+        if budget_seconds is not None:
+            left = max(0.0, float(budget_seconds) - (time.perf_counter() - t0))
+        _, pending = wait(futures.values(), timeout=left)
+        for name, fut in futures.items():
+            if fut.done():
+                try:
+                    outcome = fut.result()
+                except Exception as e:  # pickle аргументов/результата, упавший процесс
+                    log.exception("Артефакт %s: ошибка пула %s", name, e)
+                    outcome = (None, time.perf_counter() - t0, repr(e))
+                collect(name, outcome)
+                continue
+            log.warning(
+                "Артефакт %s: не уложился в бюджет %.1f с — пропускаем",
+                name,
+                budget_seconds,
+            )
+            fut.cancel()
+            results[name] = tasks[name][2]
+            record(name, time.perf_counter() - t0, "timeout")
+        # не ждём зависшие задачи: бюджет важнее
+        if pending:
+            _terminate(ex)
+        ex.shutdown(wait=False, cancel_futures=True)
+    order = {name: i for i, name in enumerate(tasks)}
+    timings.sort(key=lambda t: order[t["artifact"]])
+
+    for t in timings:
+        if t["ok"]:
+            log.info("Артефакт %s: %.3f с", t["artifact"], t["seconds"])
+    wall = time.perf_counter() - t0
+    serial = sum(t["seconds"] for t in timings)
+    speedup = serial / wall if wall > 0 else 1.0
+    timings.append(
+        {
+            "artifact": "total",
+            "seconds": round(wall, 4),
+            "ok": all(t["ok"] for t in timings),
+            "status": mode if mode == "sequential" else f"{mode} x{workers}",
+            "serial_seconds": round(serial, 4),
+            "speedup": round(speedup, 2),
+        }
+    )
+    log.info(
+        "Артефакты отчёта: %d шт. за %.2f с (сумма задач %.2f с, ускорение ×%.2f, "
+        "%s, воркеров %d)",
+        len(tasks),
+        wall,
+        serial,
+        speedup,
+        executor if mode != "sequential" else "последовательно",
+        workers,
+    )
+    return results, timings
@@ -1,52 +1,101 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
 from src.utils.logging import getLogger
-from src.reporting.plots import generate_sales_plots
+from src.reporting.plots import sales_plot_jobs
+from src.reporting.render import ChartJob, render_images
 
 log = getLogger(__name__)
 
 
-def build_matplotlib_png(
-    df_clean: pd.DataFrame, plots_cfg: Dict
-) -> list[tuple[str, str]]:
+def matplotlib_jobs(
+    df_clean: pd.DataFrame, plots_cfg: Dict, cube: Dict | None = None
+) -> List[ChartJob]:
     outdir = Path(plots_cfg.get("output_dir", "reports/images"))
-    images_with_captions = generate_sales_plots(df_clean, plots_cfg, outdir)
-    return images_with_captions
+    return sales_plot_jobs(df_clean, plots_cfg, outdir, cube)
 
 
-def build_seaborn_png(df_clean: pd.DataFrame, outdir: Path) -> list[tuple[str, str]]:
+def seaborn_jobs(
+    df_clean: pd.DataFrame, outdir: Path, sns_cfg: Dict | None = None
+) -> List[ChartJob]:
+    """sns_cfg — reporting.plots.seaborn: пределы столбцов/строк/пикселей/времени."""
     try:
-        from src.reporting.seaborn_plots import corr_heatmap_png, pairplot_png
-
-        seaborn_imgs: list[tuple[str, str]] = []
-        p1 = outdir / "combined" / "seaborn_corr.png"
-        path1, cap1 = corr_heatmap_png(df_clean, p1)
-        if path1:
-            seaborn_imgs.append((path1, cap1))
-        p2 = outdir / "combined" / "seaborn_pairplot.png"
-        path2, cap2 = pairplot_png(df_clean, p2)
-        if path2:
-            seaborn_imgs.append((path2, cap2))
-        return seaborn_imgs
+        from src.reporting.seaborn_plots import DEFAULTS, corr_heatmap_png, pairplot_png
     except Exception as e:
-        log.info("Seaborn недоступен или ошибка рендера: %s", e)
+        log.info("Seaborn недоступен: %s", e)
         return []
+    sns_cfg = sns_cfg or {}
+    strata = sns_cfg.get("strata", DEFAULTS["strata"])
+    num = df_clean.select_dtypes(include=[np.number])
+    if strata in df_clean.columns and strata not in num.columns:
+        num = num.join(df_clean[[strata]])  # для стратифицированной выборки
+    return [
+        (
+            "seaborn_corr",
+            corr_heatmap_png,
+            (num, outdir / "combined" / "seaborn_corr.png", sns_cfg),
+        ),
+        (
+            "seaborn_pairplot",
+            pairplot_png,
+            (num, outdir / "combined" / "seaborn_pairplot.png", sns_cfg),
+        ),
+    ]
+
+
+def build_matplotlib_png(
+    df_clean: pd.DataFrame, plots_cfg: Dict, cube: Dict | None = None, workers: int = 1
+) -> list[tuple[str, str]]:
+    return render_images(matplotlib_jobs(df_clean, plots_cfg, cube), workers)
 
 
-def build_plotly_html(df_clean: pd.DataFrame, units: Dict) -> list[str]:
+def build_seaborn_png(
+    df_clean: pd.DataFrame, outdir: Path, sns_cfg: Dict | None = None, workers: int = 1
+) -> list[tuple[str, str]]:
+    return render_images(seaborn_jobs(df_clean, outdir, sns_cfg), workers)
+
+
+def build_plotly_html(
+    df_clean: pd.DataFrame,
+    units: Dict,
+    cube: Dict | None = None,
+    dashboard_cfg: Dict | None = None,
+) -> list[str]:
+    """
+    dashboard_cfg — reporting.dashboard: один автономный дашборд по кубу;
+    separate_charts: true — дополнительно прежние HTML по одному графику.
+    """
+    dashboard_cfg = dashboard_cfg or {}
+    html_paths: list[str] = []
+    if bool(dashboard_cfg.get("enabled", True)):
+        try:
+            from src.reporting.dashboard import dashboard_html
+            from src.reporting.rollup import build_rollup
+
+            path = dashboard_html(
+                cube if cube is not None else build_rollup(df_clean),
+                units=units,
+                cfg=dashboard_cfg,
+            )
+            if path:
+                html_paths.append(path)
+        except Exception as e:
+            log.info("Дашборд не построен: %s", e)
+    if not bool(dashboard_cfg.get("separate_charts", False)):
+        return html_paths
     try:
         from src.reporting.plotly_charts import monthly_revenue_html, top_customers_html
 
         html_dir = Path("reports/html")
-        html_paths: list[str] = []
         html1 = monthly_revenue_html(
             df_clean,
             "order_date",
             "amount",
             html_dir / "monthly_revenue.html",
             units=units,
+            cube=cube,
         )
         if html1:
             html_paths.append(html1)
@@ -56,10 +105,11 @@ def build_plotly_html(df_clean: pd.DataFrame, units: Dict) -> list[str]:
             html_dir / "top_customers.html",
             top_n=10,
             units=units,
+            cube=cube,
         )
         if html2:
             html_paths.append(html2)
         return html_paths
     except Exception as e:
         log.info("Plotly недоступен или ошибка рендера: %s", e)
-        return []
+        return html_paths
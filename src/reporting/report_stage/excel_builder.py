@@ -1,13 +1,77 @@
 from __future__ import annotations
+import os
+import shutil
 from pathlib import Path
 from typing import Dict
 import pandas as pd
 from src.utils.logging import getLogger
-from src.reporting.excel import to_excel_multisheet
+from src.reporting.excel import CHUNK_ROWS, EXCEL_MAX_ROWS, to_excel_multisheet
 from .helpers import ID_COLUMNS
 
 log = getLogger(__name__)
 
+# листы с построчными данными; в режиме sample — выборка + ссылка на Parquet
+ROW_SHEETS = ("raw_combined", "sales_cleaned")
+
+
+def _write_full_parquet(df: pd.DataFrame, out_dir: Path, partition_by) -> Path:
+    """Полный кадр -> каталог Parquet (партиции по partition_by, если колонка есть)."""
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cols = [c for c in (partition_by or []) if c in df.columns]
+    if cols:
+        df.to_parquet(out_dir, index=False, partition_cols=cols)
+    else:
+        df.to_parquet(out_dir / "part-0.parquet", index=False)
+    return out_dir
+
+
+def _sample_sheets(
+    sheets: Dict[str, pd.DataFrame], excel_path: Path, excel_cfg: Dict
+) -> pd.DataFrame:
+    """
+    Режим sample: листы ROW_SHEETS заменяются первыми sample_rows строками,
+    полные данные уходят в <parquet_dir>/<лист>. Возвращает лист-оглавление
+    с числом строк и ссылкой (external:) на каталог Parquet.
+    """
+    sample_rows = int(excel_cfg.get("sample_rows", 10_000))
+    parquet_dir = Path(excel_cfg.get("parquet_dir", "data/processed/excel_full"))
+    partition_by = excel_cfg.get("partition_by", ["source"])
+    if isinstance(partition_by, str):
+        partition_by = [partition_by]
+    rows = []
+    for name in ROW_SHEETS:
+        df = sheets[name]
+        out = _write_full_parquet(df, parquet_dir / name, partition_by)
+        link = os.path.relpath(out.resolve(), excel_path.parent.resolve())
+        sheets[name] = df.head(sample_rows)
+        rows.append(
+            {
+                "sheet": name,
+                "rows_total": len(df),
+                "rows_in_sheet": min(len(df), sample_rows),
+                "parquet": f"external:{link}",
+            }
+        )
+        log.info("Excel: %s — %d строк в Parquet %s", name, len(df), out)
+    return pd.DataFrame(rows)
+
+
+def _metrics_sheet(
+    metrics_df: pd.DataFrame, extra_tables_df: Dict[str, pd.DataFrame]
+) -> pd.DataFrame:
+    """Метрики данных + результаты CV/подбора моделей (ml_metrics_*) на одном листе."""
+    ml = [
+        extra_tables_df[k]
+        for k in ("ml_metrics_classification", "ml_metrics_regression")
+        if extra_tables_df.get(k) is not None and not extra_tables_df[k].empty
+    ]
+    if not ml:
+        return metrics_df
+    out = pd.concat([metrics_df.assign(scope="data"), *ml], ignore_index=True)
+    return out[["scope", *[c for c in out.columns if c != "scope"]]]
+
 
 def build_excel(
     df_raw: pd.DataFrame,
@@ -23,7 +87,7 @@ def build_excel(
             "raw_combined": df_raw,
             "sales_cleaned": df_clean,
             "aggregates_by_source": agg_df,
-            "metrics": metrics_df,
+            "metrics": _metrics_sheet(metrics_df, extra_tables_df),
         }
         bs_all = pd.DataFrame(
             df_clean.drop(
@@ -45,7 +109,30 @@ def build_excel(
             and not extra_tables_df["logreg_coeffs"].empty
         ):
             sheets["logreg_coeffs"] = extra_tables_df["logreg_coeffs"]
-        to_excel_multisheet(excel_path, sheets, with_conditional_format=True)
+        if (
+            extra_tables_df.get("threshold_sweep") is not None
+            and not extra_tables_df["threshold_sweep"].empty
+        ):
+            sheets["threshold_sweep"] = extra_tables_df["threshold_sweep"]
+        comparisons = [
+            extra_tables_df[k]
+            for k in ("model_comparison_classification", "model_comparison_regression")
+            if extra_tables_df.get(k) is not None and not extra_tables_df[k].empty
+        ]
+        if comparisons:
+            sheets["model_comparison"] = pd.concat(comparisons, ignore_index=True)
+        for k in ("forecast_summary", "forecast"):
+            if extra_tables_df.get(k) is not None and not extra_tables_df[k].empty:
+                sheets[k] = extra_tables_df[k]
+        if str(excel_cfg.get("mode", "full")).lower() == "sample":
+            sheets["full_data"] = _sample_sheets(sheets, excel_path, excel_cfg)
+        to_excel_multisheet(
+            excel_path,
+            sheets,
+            with_conditional_format=True,
+            max_rows=int(excel_cfg.get("max_rows") or EXCEL_MAX_ROWS),
+            chunk_rows=int(excel_cfg.get("chunk_rows") or CHUNK_ROWS),
+        )
         return str(excel_path)
     except Exception as e:
         log.exception("Ошибка при формировании Excel: %s", e)
@@ -3,6 +3,8 @@ from pathlib import Path
 from typing import Dict, List, Tuple
 import numpy as np
 import pandas as pd
+from src.analysis.forecast import TOTAL, revenue_matrix
+from src.reporting.pdf import TableRows
 from src.utils.logging import getLogger
 
 log = getLogger(__name__)
@@ -67,20 +69,11 @@ def overall_metrics(df_raw: pd.DataFrame, df_clean: pd.DataFrame) -> pd.DataFram
 def _safe_ts_for_decompose(
     df: pd.DataFrame, date_col: str, value_col: str
 ) -> pd.DataFrame:
-    if date_col not in df.columns or value_col not in df.columns:
+    # тот же плотный дневной ряд, что строит прогноз (analysis.forecast)
+    wide = revenue_matrix(df, date_col, value_col, freq="D")
+    if wide.empty:
         return pd.DataFrame()
-    sdate = pd.to_datetime(df[date_col], errors="coerce")
-    ok = sdate.notna() & df[value_col].notna()
-    if not ok.any():
-        return pd.DataFrame()
-    ser = (
-        df.loc[ok, value_col]
-        .astype(float)
-        .groupby(sdate[ok].dt.floor("D"))
-        .sum()
-        .sort_index()
-    )
-    ts = ser.asfreq("D", fill_value=0.0)
+    ts = wide[TOTAL]
     return pd.DataFrame({date_col: ts.index, value_col: ts.values})
 
 
@@ -96,7 +89,8 @@ except Exception:
 
 def basic_stats_table(
     df: pd.DataFrame, title_prefix: str = ""
-) -> tuple[str, list[list[str]]]:
+) -> tuple[str, TableRows]:
+    """describe() по числовым колонкам — DataFrame, форматируется при вёрстке PDF."""
     work = df.drop(
         columns=[c for c in df.columns if c in ID_COLUMNS], errors="ignore"
     ).select_dtypes(include=[np.number])
@@ -108,22 +102,13 @@ def basic_stats_table(
     cols = [c for c in order if c in desc.columns] + [
         c for c in desc.columns if c not in order
     ]
-    desc = desc[cols]
-    header = [desc.index.name] + [str(c) for c in desc.columns]
-    rows = [header]
-    for idx, row in desc.iterrows():
-        rows.append(
-            [str(idx)]
-            + [
-                f"{v:.4g}" if isinstance(v, (int, float, np.floating)) else str(v)
-                for v in row.tolist()
-            ]
-        )
-    return (f"{title_prefix}Числовые сводки (basic_stats)", rows)
+    desc = desc[cols].astype(float)
+    desc.index = desc.index.astype(str)
+    return (f"{title_prefix}Числовые сводки (basic_stats)", desc.reset_index())
 
 
-def build_pdf_tables(df_clean: pd.DataFrame) -> list[tuple[str, list[list[str]]]]:
-    tables: list[tuple[str, list[list[str]]]] = []
+def build_pdf_tables(df_clean: pd.DataFrame) -> list[tuple[str, TableRows]]:
+    tables: list[tuple[str, TableRows]] = []
     tables.append(basic_stats_table(df_clean))
     if "source" in df_clean.columns and not df_clean.empty:
         for src_name, part in df_clean.groupby("source"):
@@ -1,10 +1,14 @@
 from __future__ import annotations
+import io
+import os
+import time
 from pathlib import Path
 from typing import Dict
 import pandas as pd
+from pypdf import PdfReader, PdfWriter
 
 from src.utils.logging import getLogger
-from src.reporting.pdf import to_pdf
+from src.reporting.pdf import TableRows, build_story, prune_image_cache, write_pdf
 
 log = getLogger(__name__)
 
@@ -13,19 +17,21 @@ def build_pdf(
     images_with_captions: list[tuple[str, str]],
     agg_df: pd.DataFrame,
     pdf_cfg: Dict,
-    extra_tables: list[tuple[str, list[list[str]]]],
+    extra_tables: list[tuple[str, TableRows]],
 ) -> str | None:
     """
-    Формирует тело отчёта через to_pdf(...) и подшивает первым листом внешний PDF
-    (по умолчанию assets/preface.pdf) как титульную страницу.
+    Вёрстка тела отчёта в память (картинки пережаты под размер показа,
+    reporting.pdf.images) и одна запись итогового файла: первым листом —
+    внешний PDF (по умолчанию assets/preface.pdf) как титульная страница.
+    reportlab не умеет вставлять страницы чужого PDF, поэтому тело из буфера
+    ещё раз читается pypdf — это не однопроходная сборка, но без временного
+    файла. Страницы reportlab держит в памяти до сохранения документа.
     """
     final_out = Path(pdf_cfg.get("output", "reports/pdf/report.pdf"))
-    pdf_dir = final_out.parent
-    pdf_dir.mkdir(parents=True, exist_ok=True)
+    final_out.parent.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
 
-    tmp_body = pdf_dir / "__body_tmp.pdf"
-
-    # --- 1) Генерируем тело отчёта во временный файл
+    # --- 1) Тело отчёта — в буфер, без временного файла
     meta = {
         # ничего «лишнего» не добавляем, всё берём из конфигурации
         "title": pdf_cfg.get("title", "Сводный отчёт по продажам"),
@@ -34,63 +40,62 @@ def build_pdf(
         ),  # пусто — чтобы не печатать строку "Автор:" его перенёс на титул
         "intro_paragraphs": pdf_cfg.get("intro_extra", []) or [],
     }
+    body = io.BytesIO()
     try:
-        comp_rows = agg_df.to_dict(orient="records") if not agg_df.empty else []
-        to_pdf(
+        story = build_story(
             images_with_captions,
-            pdf_dir,
-            filename=tmp_body.name,
             meta=meta,
-            comparison_aggregates=comp_rows,
             extra_tables=extra_tables,
             compact=True,
+            images_cfg=pdf_cfg.get("images", {}) or {},
+            tables_cfg=pdf_cfg.get("tables", {}) or {},
         )
+        pages = write_pdf(story, body, pdf_cfg.get("max_pages"))
+        prune_image_cache(pdf_cfg.get("images", {}) or {})
     except Exception as e:
         log.exception("Ошибка при формировании PDF (тело): %s", e)
         return None
 
-    # --- 2) Подшиваем титульную страницу из внешнего файла
+    # --- 2) Титульная страница из внешнего файла + тело — одной записью
     preface_path = Path(pdf_cfg.get("preface_path", "assets/preface.pdf"))
-
-    try:
-        from pypdf import PdfReader, PdfWriter
-
-        writer = PdfWriter()
-
-        # Добавляем первую страницу из preface.pdf (если он есть)
-        if preface_path.exists():
-            try:
-                pref_reader = PdfReader(str(preface_path))
-                if len(pref_reader.pages) > 0:
-                    writer.add_page(pref_reader.pages[0])
-                else:
-                    log.warning(
-                        "preface.pdf найден, но страниц нет — пропускаю титульный лист."
-                    )
-            except Exception as e:
+    preface = None
+    if preface_path.exists():
+        try:
+            pref_reader = PdfReader(str(preface_path))
+            if len(pref_reader.pages) > 0:
+                preface = pref_reader.pages[0]
+            else:
                 log.warning(
-                    "Не удалось прочитать preface.pdf (%s) — пропускаю титульный лист.",
-                    e,
+                    "preface.pdf найден, но страниц нет — пропускаю титульный лист."
                 )
+        except Exception as e:
+            log.warning(
+                "Не удалось прочитать preface.pdf (%s) — пропускаю титульный лист.",
+                e,
+            )
 
-        # Затем — всё тело отчёта
-        body_reader = PdfReader(str(tmp_body))
-        for page in body_reader.pages:
-            writer.add_page(page)
-
-        with open(final_out, "wb") as f:
-            writer.write(f)
-
+    # во временный файл и rename: недописанного PDF на месте отчёта не бывает
+    tmp = final_out.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        if preface is None:
+            tmp.write_bytes(body.getbuffer())
+        else:
+            writer = PdfWriter()
+            writer.add_page(preface)
+            writer.append(PdfReader(body))
+            with open(tmp, "wb") as f:
+                writer.write(f)
     except Exception as e:
         log.exception("Не удалось объединить титульный лист с отчётом: %s", e)
-        # Фоллбэк — просто оставляем тело отчёта как финальный PDF
-        tmp_body.replace(final_out)
-    finally:
-        # Чистим временный файл
-        try:
-            if tmp_body.exists():
-                tmp_body.unlink()
-        except Exception:
-            pass
+        # Фоллбэк — тело отчёта без титульного листа
+        tmp.write_bytes(body.getbuffer())
+    os.replace(tmp, final_out)
 
+    log.info(
+        "PDF: %s — %d стр. тела, %.0f КБ за %.2f с",
+        final_out,
+        pages,
+        final_out.stat().st_size / 1024,
+        time.perf_counter() - t0,
+    )
     return str(final_out)
@@ -3,10 +3,13 @@ from typing import Dict, List, Tuple
 from pathlib import Path
 import pandas as pd
 from src.utils.logging import getLogger
-from .helpers import aggregates_by_source, overall_metrics, build_pdf_tables
-from .charts import build_matplotlib_png, build_seaborn_png, build_plotly_html
+from src.reporting.rollup import build_rollup, by_source
+from .helpers import overall_metrics, build_pdf_tables
+from src.reporting.render import render_charts, workers_from_cfg
+from .charts import matplotlib_jobs, seaborn_jobs, build_plotly_html
 from .pdf_builder import build_pdf
 from .excel_builder import build_excel
+from .artifacts import build_artifacts
 
 log = getLogger(__name__)
 
@@ -19,6 +22,9 @@ def run_reporting(
     extra_images_with_captions: List[Tuple[str, str]] | None = None,
     extra_tables: List[Tuple[str, List[List[str]]]] | None = None,
     extra_tables_df: Dict[str, pd.DataFrame] | None = None,
+    aggregates: pd.DataFrame | None = None,
+    forecast_tables: List[Tuple[str, List[List[str]]]] | None = None,
+    cube: Dict | None = None,
 ) -> Dict:
     artifacts = {"images": [], "pdf": None, "excel": None, "html": []}
     extra_tables = extra_tables or []
@@ -28,27 +34,30 @@ def run_reporting(
     plots_cfg = rep_cfg.get("plots", {}) or {}
     plots_cfg["parent_units"] = units
     outdir = Path(plots_cfg.get("output_dir", "reports/images"))
+    # куб агрегатов (rollup) — общий для графиков и таблиц
+    cube = cube if cube is not None else build_rollup(df_clean)
 
-    # 1) Matplotlib PNG
-    images_with_captions = build_matplotlib_png(df_clean, plots_cfg)
+    # 1-2) Matplotlib + Seaborn PNG: одни задания рендера, общий пул процессов
+    mpl_jobs = matplotlib_jobs(df_clean, plots_cfg, cube)
+    sns_jobs = (
+        seaborn_jobs(df_clean, outdir, plots_cfg.get("seaborn"))
+        if bool(plots_cfg.get("include_seaborn", True))
+        else []
+    )
+    rendered, _ = render_charts(
+        mpl_jobs + sns_jobs, workers_from_cfg(rep_cfg.get("render"))
+    )
+    images_with_captions = [r for r in rendered if r]
     artifacts["images"] = [p for p, _ in images_with_captions]
 
-    # 2) Seaborn PNG
-    seaborn_imgs = build_seaborn_png(df_clean, outdir)
-    images_with_captions.extend(seaborn_imgs)
-    artifacts["images"].extend([p for p, _ in seaborn_imgs])
-
-    # 3) Plotly HTML
-    html_paths = build_plotly_html(df_clean, units)
-    artifacts["html"] = html_paths
-
-    # 3.1) ML-дополнения
+    # 3) ML-дополнения
     if extra_images_with_captions:
         images_with_captions.extend(extra_images_with_captions)
         artifacts["images"].extend([p for p, _ in extra_images_with_captions])
 
     # 4) Табличные агрегаты
-    agg_df = aggregates_by_source(df_clean)
+    # (polars-движок передаёт готовые агрегаты — group_by до перевода в pandas)
+    agg_df = aggregates if aggregates is not None else by_source(cube)
     metrics_df = overall_metrics(df_raw, df_clean)
 
     pdf_tables = []
@@ -74,16 +83,40 @@ def run_reporting(
     if extra_tables:
         pdf_tables.append(("## ML-результаты", []))
         pdf_tables.extend(extra_tables)
+    if forecast_tables:
+        pdf_tables.append(("## Прогноз выручки", []))
+        pdf_tables.extend(forecast_tables)
 
-    # 5) PDF
+    # 5) PDF, Excel, Plotly HTML — независимы, собираются параллельно
     pdf_cfg = rep_cfg.get("pdf", {}) or {}
-    artifacts["pdf"] = build_pdf(images_with_captions, agg_df, pdf_cfg, pdf_tables)
-
-    # 6) Excel
     excel_cfg = rep_cfg.get("excel", {}) or {}
-    artifacts["excel"] = build_excel(
-        df_raw, df_clean, agg_df, metrics_df, extra_tables_df, excel_cfg
+    build_cfg = rep_cfg.get("artifacts", {}) or {}
+    # тайминги логирует build_artifacts; состав результата прежний
+    built, _ = build_artifacts(
+        {
+            "pdf": (
+                build_pdf,
+                (images_with_captions, agg_df, pdf_cfg, pdf_tables),
+                None,
+            ),
+            "excel": (
+                build_excel,
+                (df_raw, df_clean, agg_df, metrics_df, extra_tables_df, excel_cfg),
+                None,
+            ),
+            "html": (
+                build_plotly_html,
+                # HTML строится по кубу: в воркер уходит только схема df_clean
+                (df_clean.iloc[:0], units, cube, rep_cfg.get("dashboard") or {}),
+                [],
+            ),
+        },
+        workers=int(build_cfg.get("workers") or 3),
+        budget_seconds=build_cfg.get("budget_seconds"),
+        executor=str(build_cfg.get("executor", "process")),
+        inline=build_cfg.get("inline") or (),
     )
+    artifacts.update(built)
 
     if not agg_df.empty:
         log.info("Агрегаты по источникам:\n%s", agg_df.to_string(index=False))
@@ -0,0 +1,275 @@
+"""
+Предагрегированный куб продаж для графиков и таблиц отчёта.
+
+Строится один раз после очистки:
+  daily     — день × source × country: orders (строк), amount_count
+              (непустых сумм), amount_sum, amount_sumsq;
+  customers — клиент: orders, amount_sum, first_day, last_day.
+
+Строки с пустой датой/измерением сохраняются (NaN в ключе), поэтому из
+куба получаются те же числа, что и из построчных groupby: помесячная и
+дневная выручка, число заказов по дням, доли источников, агрегаты по
+источникам, топ клиентов. Куб пишется в parquet и читается обратно —
+отчёты можно перестроить без построчных данных.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logging import getLogger
+
+log = getLogger(__name__)
+
+DIMS = ("source", "country")
+FILES = ("daily", "customers")
+
+
+def build_rollup(
+    df: pd.DataFrame,
+    date_col: str = "order_date",
+    amount_col: str = "amount",
+    customer_col: str = "customer_id",
+    dims: Sequence[str] = DIMS,
+) -> Dict[str, Any]:
+    """Один проход по строкам: день × измерения и клиенты."""
+    n = len(df)
+    day = (
+        pd.to_datetime(df[date_col], errors="coerce").dt.floor("D")
+        if date_col in df.columns
+        else pd.Series(pd.NaT, index=df.index)
+    )
+    amount = (
+        pd.to_numeric(df[amount_col], errors="coerce").astype(float)
+        if amount_col in df.columns
+        else pd.Series(np.nan, index=df.index)
+    )
+    dims = [d for d in dims if d in df.columns]
+    work = pd.DataFrame(
+        {"day": day, **{d: df[d] for d in dims}, "amount": amount, "sq": amount**2}
+    )
+    keys = ["day", *dims]
+    daily = (
+        work.groupby(keys, dropna=False, sort=True, observed=True)
+        .agg(
+            orders=("amount", "size"),
+            amount_count=("amount", "count"),
+            amount_sum=("amount", "sum"),
+            amount_sumsq=("sq", "sum"),
+        )
+        .reset_index()
+    )
+
+    customers = pd.DataFrame(
+        columns=["customer_id", "orders", "amount_sum", "first_day", "last_day"]
+    )
+    if customer_col in df.columns and n:
+        customers = (
+            pd.DataFrame(
+                {"customer_id": df[customer_col], "day": day, "amount": amount}
+            )
+            .groupby("customer_id", sort=True)
+            .agg(
+                orders=("amount", "size"),
+                amount_sum=("amount", "sum"),
+                first_day=("day", "min"),
+                last_day=("day", "max"),
+            )
+            .reset_index()
+        )
+    log.info(
+        "Куб продаж: %d строк -> daily %d, customers %d",
+        n,
+        len(daily),
+        len(customers),
+    )
+    return {
+        "daily": daily,
+        "customers": customers,
+        "columns": {
+            "date": date_col,
+            "amount": amount_col,
+            "customer": customer_col,
+            "amount_present": amount_col in df.columns,
+        },
+        "dims": dims,
+    }
+
+
+def save_rollup(cube: Dict[str, Any], out_dir: str | Path) -> Path:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name in FILES:
+        cube[name].to_parquet(out_dir / f"{name}.parquet", index=False)
+    meta = {"columns": cube["columns"], "dims": cube["dims"]}
+    (out_dir / "meta.json").write_text(
+        json.dumps(meta, ensure_ascii=False, indent=2), "utf-8"
+    )
+    return out_dir
+
+
+def load_rollup(in_dir: str | Path) -> Dict[str, Any] | None:
+    in_dir = Path(in_dir)
+    if not (in_dir / "meta.json").exists():
+        return None
+    meta = json.loads((in_dir / "meta.json").read_text("utf-8"))
+    cube = {name: pd.read_parquet(in_dir / f"{name}.parquet") for name in FILES}
+    return {**cube, **meta}
+
+
+# ---- запросы к кубу ----
+
+
+def covered_columns(cube: Dict[str, Any]) -> set:
+    """Исходные колонки, агрегаты по которым есть в кубе."""
+    cols = cube["columns"]
+    out = {cols["date"], *cube["dims"]}
+    if cols.get("amount_present", True):
+        out.add(cols["amount"])
+    if not cube["customers"].empty:
+        out.add(cols["customer"])
+    return out
+
+
+def date_range(cube: Dict[str, Any]):
+    day = cube["daily"]["day"]
+    return day.min(), day.max()
+
+
+def _valued(cube: Dict[str, Any], by: str | None = None) -> pd.DataFrame:
+    """Ячейки с датой и хотя бы одной суммой (аналог dropna(subset=[date, amount]))."""
+    d = cube["daily"]
+    mask = d["day"].notna() & (d["amount_count"] > 0)
+    if by is not None:
+        mask &= d[by].notna()
+    return d[mask]
+
+
+def revenue(cube: Dict[str, Any], freq: str = "M", by: str | None = None) -> pd.Series:
+    """Выручка по периодам (M — PeriodIndex месяцев, D — дни); by — доп. уровень."""
+    d = _valued(cube, by)
+    period = d["day"].dt.to_period("M") if freq == "M" else d["day"]
+    keys = [period] if by is None else [period, d[by]]
+    return d.groupby(keys, observed=True)["amount_sum"].sum().sort_index()
+
+
+def revenue_rows(cube: Dict[str, Any]) -> int:
+    """Строк с датой и суммой."""
+    return int(_valued(cube)["amount_count"].sum())
+
+
+def orders_by_day(cube: Dict[str, Any]) -> pd.Series:
+    d = cube["daily"]
+    d = d[d["day"].notna()]
+    return d.groupby("day")["orders"].sum().sort_index()
+
+
+def orders_by(cube: Dict[str, Any], dim: str) -> pd.Series:
+    """Число строк по значению измерения (пустые — «NA»), по убыванию."""
+    d = cube["daily"]
+    ser = d.groupby(d[dim].astype(object).fillna("NA"))["orders"].sum()
+    return ser.sort_values(ascending=False, kind="stable")
+
+
+def total_orders(cube: Dict[str, Any]) -> int:
+    return int(cube["daily"]["orders"].sum())
+
+
+def by_source(cube: Dict[str, Any]) -> pd.DataFrame:
+    """То же, что helpers.aggregates_by_source, но из куба."""
+    cols = ["source", "rows", "amount_sum", "amount_mean"]
+    d = cube["daily"]
+    if "source" not in d.columns or d.empty:
+        return pd.DataFrame(columns=cols)
+    g = (
+        d.groupby("source", observed=True)[["orders", "amount_count", "amount_sum"]]
+        .sum()
+        .reset_index()
+    )
+    amount_mean = g["amount_sum"] / g["amount_count"].where(g["amount_count"] > 0)
+    out = pd.DataFrame(
+        {
+            "source": g["source"],
+            "rows": g["orders"].astype(int),
+            "amount_sum": g["amount_sum"].astype(float),
+            "amount_mean": amount_mean.astype(float),
+        }
+    )
+    if not cube["columns"].get("amount_present", True):
+        out[["amount_sum", "amount_mean"]] = np.nan
+    return out
+
+
+def monthly_cells(cube: Dict[str, Any]) -> pd.DataFrame:
+    """Месяц × измерения: orders, amount_count, amount_sum (пустые ключи — «NA»)."""
+    d = cube["daily"]
+    month = d["day"].dt.strftime("%Y-%m").fillna("NA")
+    keys = [month.rename("month")] + [
+        d[dim].astype(object).fillna("NA").astype(str) for dim in cube["dims"]
+    ]
+    return (
+        d.groupby(keys, sort=True)[["orders", "amount_count", "amount_sum"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def top_customers(cube: Dict[str, Any], top_n: int = 10) -> pd.Series:
+    """Топ клиентов по числу заказов (как df.groupby(id).size())."""
+    c = cube["customers"]
+    if c.empty:
+        return pd.Series(dtype="int64")
+    return (
+        c.set_index("customer_id")["orders"]
+        .sort_values(ascending=False, kind="stable")
+        .head(int(top_n))
+    )
+
+
+def main():
+    """Перестроить агрегатные графики отчёта из сохранённого куба (без строк)."""
+    import argparse
+
+    from src.reporting.render import workers_from_cfg
+    from src.reporting.report_stage.charts import (
+        build_matplotlib_png,
+        build_plotly_html,
+    )
+    from src.utils.config import load_config
+    from src.utils.logging import setup_logging
+
+    parser = argparse.ArgumentParser(description="Графики отчёта из куба агрегатов")
+    parser.add_argument("--config", type=str, default="config/config.yaml")
+    parser.add_argument("--rollup", type=str, default=None, help="каталог куба")
+    args = parser.parse_args()
+
+    setup_logging()
+    cfg = load_config(args.config)
+    paths_cfg = (cfg.get("artifacts", {}) or {}).get("paths", {}) or {}
+    in_dir = args.rollup or paths_cfg.get("rollup", "data/processed/rollup")
+    cube = load_rollup(in_dir)
+    if cube is None:
+        raise SystemExit(f"Куб агрегатов не найден: {in_dir} — запустите пайплайн")
+    rep_cfg = cfg.get("reporting", {}) or {}
+    units = rep_cfg.get("units", {}) or {}
+    plots_cfg = {**(rep_cfg.get("plots", {}) or {}), "parent_units": units}
+    images = build_matplotlib_png(
+        pd.DataFrame(), plots_cfg, cube, workers_from_cfg(rep_cfg.get("render"))
+    )
+    html = build_plotly_html(pd.DataFrame(), units, cube, rep_cfg.get("dashboard"))
+    print(
+        json.dumps(
+            {"images": [p for p, _ in images], "html": html},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
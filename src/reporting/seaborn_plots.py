@@ -1,42 +1,201 @@
 from __future__ import annotations
+import time
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 import pandas as pd
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
 
 ID_COLUMNS = {"order_id", "customer_id"}
 
+# Пределы по умолчанию (reporting.plots.seaborn переопределяет)
+DEFAULTS: Dict[str, object] = {
+    "max_cols": 6,  # столбцов в матрице рассеяния
+    "max_rows": 5000,  # точек на панель (выборка)
+    "hexbin_rows": 50000,  # больше строк — плотность hexbin по всем строкам
+    "strata": "source",  # стратификация выборки
+    "select_by": "variance",  # variance | correlation — отбор столбцов
+    "max_pixels": 4_000_000,  # бюджет пикселей на картинку
+    "time_budget_s": 20.0,  # бюджет времени на матрицу
+    "heatmap_top_k": 30,  # столбцов в тепловой карте
+    "heatmap_cluster": True,  # порядок по иерархической кластеризации
+}
 
-def corr_heatmap_png(df: pd.DataFrame, out_path: Path) -> Tuple[Optional[str], str]:
-    num = df.drop(
+
+def _numeric(df: pd.DataFrame) -> pd.DataFrame:
+    return df.drop(
         columns=[c for c in df.columns if c in ID_COLUMNS], errors="ignore"
     ).select_dtypes(include=[np.number])
+
+
+def top_columns(num: pd.DataFrame, k: int, by: str = "variance") -> List[str]:
+    """
+    k столбцов: variance — по дисперсии стандартизованной на среднее |x|
+    (иначе побеждают крупные шкалы), correlation — по средней |ρ| с остальными.
+    """
+    num = num.loc[:, num.nunique(dropna=True) > 1]
+    if num.shape[1] <= k:
+        return list(num.columns)
+    if by == "correlation":
+        corr = num.corr(numeric_only=True).abs()
+        # без диагонали; .values под copy-on-write только для чтения
+        score = corr.where(~np.eye(len(corr), dtype=bool)).mean()
+    else:
+        score = num.std() / num.abs().mean().replace(0, np.nan)
+    return list(score.fillna(0).sort_values(ascending=False).index[:k])
+
+
+def sample_rows(
+    df: pd.DataFrame, n: int, strata: str | None = None, seed: int = 42
+) -> pd.DataFrame:
+    """Не больше n строк; при strata — пропорционально каждой группе (не меньше 1)."""
+    if len(df) <= n:
+        return df
+    if not strata or strata not in df.columns:
+        return df.sample(n=n, random_state=seed)
+    frac = n / len(df)
+    parts = [
+        g.sample(n=max(1, int(round(len(g) * frac))), random_state=seed)
+        for _, g in df.groupby(df[strata].astype(object).fillna("NA"), sort=True)
+    ]
+    return pd.concat(parts).sort_index()
+
+
+def _settings(cfg: Dict | None) -> Dict:
+    return {**DEFAULTS, **(cfg or {})}
+
+
+def corr_heatmap_png(
+    df: pd.DataFrame, out_path: Path, cfg: Dict | None = None
+) -> Tuple[Optional[str], str]:
+    s = _settings(cfg)
+    num = _numeric(df)
     if num.empty or num.shape[1] < 2:
         return None, ""
-    plt.figure(figsize=(7, 6))
+    corr = num.corr(numeric_only=True)
+    k = int(s["heatmap_top_k"])
+    cap = "Seaborn: корреляции по числовым признакам (ID исключены)."
+    if corr.shape[0] > k:
+        # топ-k признаков по сильнейшей связи с любым другим
+        strength = corr.abs().where(~np.eye(len(corr), dtype=bool)).max()
+        keep = strength.fillna(0).sort_values(ascending=False).index[:k]
+        corr = corr.loc[keep, keep]
+        cap = f"Seaborn: топ-{k} признаков по максимальной |ρ| (ID исключены)."
+    if bool(s["heatmap_cluster"]) and corr.shape[0] > 2:
+        # порядок листьев иерархической кластеризации по расстоянию 1-|ρ|
+        dist = (1 - corr.abs().fillna(0)).clip(lower=0).to_numpy(copy=True)
+        np.fill_diagonal(dist, 0)
+        order = leaves_list(linkage(squareform(dist, checks=False), "average"))
+        corr = corr.iloc[order, order]
+        cap += " Порядок — по кластерам корреляций."
+    side = min(7 + 0.15 * max(0, corr.shape[0] - 10), 14)
+    plt.figure(figsize=(side, side * 6 / 7))
     sns.heatmap(
-        num.corr(numeric_only=True), cmap="coolwarm", vmin=-1, vmax=1, annot=False
+        corr, cmap="coolwarm", vmin=-1, vmax=1, annot=corr.shape[0] <= 12, fmt=".2f"
     )
     out_path.parent.mkdir(parents=True, exist_ok=True)
     plt.tight_layout()
     plt.savefig(out_path, dpi=130)
     plt.close()
-    cap = "Seaborn: корреляции по числовым признакам (ID исключены)."
     return str(out_path), cap
 
 
-def pairplot_png(df: pd.DataFrame, out_path: Path) -> Tuple[Optional[str], str]:
-    num = df.drop(
-        columns=[c for c in df.columns if c in ID_COLUMNS], errors="ignore"
-    ).select_dtypes(include=[np.number])
+def _scatter_matrix(
+    num: pd.DataFrame, sample: pd.DataFrame, out_path: Path, s: Dict, hexbin: bool
+) -> Tuple[str, int]:
+    """
+    Нижний треугольник: hexbin по всем строкам или точки выборки
+    (rasterized), диагональ — гистограммы. Размер — в пределах max_pixels,
+    панели сверх time_budget_s не рисуются. Возвращает (путь, пропущено панелей).
+    """
+    cols = list(num.columns)
+    k = len(cols)
+    dpi = 120
+    panel = min(2.2, np.sqrt(float(s["max_pixels"])) / (k * dpi))
+    fig, axes = plt.subplots(k, k, figsize=(panel * k, panel * k), squeeze=False)
+    t0 = time.perf_counter()
+    skipped = 0
+    for i in range(k):
+        for j in range(k):
+            ax = axes[i][j]
+            if j > i:
+                ax.set_visible(False)
+                continue
+            if time.perf_counter() - t0 > float(s["time_budget_s"]):
+                ax.set_axis_off()
+                skipped += 1
+                continue
+            if i == j:
+                ax.hist(num[cols[i]].dropna(), bins=30, color="C0")
+            elif hexbin:
+                xy = num[[cols[j], cols[i]]].dropna()
+                ax.hexbin(xy[cols[j]], xy[cols[i]], gridsize=35, mincnt=1, cmap="Blues")
+            else:
+                ax.scatter(
+                    sample[cols[j]], sample[cols[i]], s=3, alpha=0.4, rasterized=True
+                )
+            if i == k - 1:
+                ax.set_xlabel(cols[j], fontsize=7)
+            if j == 0:
+                ax.set_ylabel(cols[i], fontsize=7)
+            ax.tick_params(labelsize=6)
+    if skipped:
+        fig.suptitle(f"Пропущено панелей по бюджету времени: {skipped}", fontsize=8)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=dpi)
+    plt.close(fig)
+    return str(out_path), skipped
+
+
+def pairplot_png(
+    df: pd.DataFrame, out_path: Path, cfg: Dict | None = None
+) -> Tuple[Optional[str], str]:
+    """
+    Малые данные (строк ≤ max_rows, столбцов ≤ max_cols) — sns.pairplot как
+    раньше; иначе топ-max_cols столбцов и матрица рассеяния по
+    стратифицированной выборке или hexbin-плотность по всем строкам.
+    """
+    s = _settings(cfg)
+    num = _numeric(df)
     if num.empty or num.shape[1] < 2:
         return None, ""
-    g = sns.pairplot(num, corner=True)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    g.savefig(out_path, dpi=120)
-    plt.close("all")
-    cap = "Seaborn PairPlot: распределения и попарные зависимости (ID исключены)."
-    return str(out_path), cap
+    max_cols, max_rows = int(s["max_cols"]), int(s["max_rows"])
+    if len(num) <= max_rows and num.shape[1] <= max_cols:
+        g = sns.pairplot(num, corner=True)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        g.savefig(out_path, dpi=120)
+        plt.close("all")
+        cap = "Seaborn PairPlot: распределения и попарные зависимости (ID исключены)."
+        return str(out_path), cap
+
+    cols = top_columns(num, max_cols, str(s["select_by"]))
+    if len(cols) < 2:
+        return None, ""
+    num = num[cols]
+    hexbin = len(num) > int(s["hexbin_rows"])
+    strata = s.get("strata")
+    sample = (
+        num
+        if hexbin
+        else sample_rows(
+            num.join(df[[strata]]) if strata in df.columns else num, max_rows, strata
+        )[cols]
+    )
+    path, skipped = _scatter_matrix(num, sample, out_path, s, hexbin)
+    how = (
+        f"плотность hexbin по {len(num)} строкам"
+        if hexbin
+        else f"выборка {len(sample)} из {len(num)} строк"
+        + (f" со стратификацией по {strata}" if strata in df.columns else "")
+    )
+    cap = (
+        f"Матрица рассеяния: топ-{len(cols)} признаков по {s['select_by']}, {how}"
+        + (f"; пропущено панелей: {skipped}" if skipped else "")
+        + " (ID исключены)."
+    )
+    return path, cap
@@ -0,0 +1,163 @@
+"""
+Пакетный скоринг новых заказов сохранёнными моделями (без обучения).
+
+    python -m src.score --input data/raw/new_orders.csv --output reports/scores.parquet
+    python -m src.score --input new.parquet --db-table order_scores --dsn postgresql+psycopg2://...
+
+Заказы читаются частями (--chunksize), приводятся к типам как в очистке,
+признаки истории клиентов считаются инкрементально по сохранённому
+состоянию (models/customer_history), прогнозы пишутся потоково в Parquet
+или дописываются в таблицу Postgres.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from src.ml.history import load_history_state, save_history_state, update_history
+from src.ml.serving import OUTPUT_COLUMNS, load_model, model_path, score_frame
+from src.io.loader import iter_chunks
+from src.pipelines.clean_stage import coerce_types
+from src.utils.config import load_config
+from src.utils.logging import getLogger, setup_logging
+from src.utils.persist import save_df_to_db
+
+log = getLogger(__name__)
+
+
+class _ParquetSink:
+    """Потоковая запись частей в один Parquet-файл (схема — по первой части)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.writer = None
+        self.schema = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def run_scoring(
+    cfg: Dict[str, Any],
+    input_path: str | Path,
+    output: str | Path | None = None,
+    db_table: str | None = None,
+    dsn: str | None = None,
+    tasks: list[str] | None = None,
+    chunksize: int = 50_000,
+    update_state: bool = False,
+) -> Dict[str, Any]:
+    """Скоринг файла input_path; возвращает сводку (строк, частей, куда записано)."""
+    ml_cfg = cfg.get("ml", {}) or {}
+    tasks = tasks or list(OUTPUT_COLUMNS)
+    models = {}
+    for task in tasks:
+        p = model_path(task, ml_cfg)
+        if p is None:
+            log.warning("Скоринг: нет сохранённой модели для '%s' — пропускаем", task)
+            continue
+        models[task] = load_model(p)
+    if not models:
+        raise FileNotFoundError("Нет сохранённых моделей — сначала запустите обучение")
+    if not output and not db_table:
+        raise ValueError("Укажите --output (Parquet) или --db-table (Postgres)")
+    if db_table and not dsn:
+        raise ValueError("Для --db-table нужен DSN (--dsn или scoring.dsn)")
+
+    hist_cfg = ml_cfg.get("history", {}) or {}
+    state_dir = Path(
+        hist_cfg.get("state_dir")
+        or Path(ml_cfg.get("models_dir", "models")) / "customer_history"
+    )
+    state = load_history_state(state_dir)
+    if state is None:
+        log.warning("Скоринг: нет состояния истории клиентов — история по входу")
+
+    sink = _ParquetSink(output) if output else None
+    rows = chunks = 0
+    try:
+        for chunk in iter_chunks(input_path, chunksize):
+            chunk = coerce_types(chunk)
+            history = None
+            if state is not None and "customer_id" in chunk.columns:
+                history, state = update_history(chunk, state)
+            scored = score_frame(chunk, models, history=history)
+            if sink is not None:
+                sink.write(scored)
+            if db_table:
+                save_df_to_db(scored, dsn, db_table, if_exists="append")
+            rows += len(scored)
+            chunks += 1
+            log.info("Скоринг: часть %d, строк всего %d", chunks, rows)
+    finally:
+        if sink is not None:
+            sink.close()
+
+    if update_state and state is not None:
+        save_history_state(state, state_dir)
+    return {
+        "rows": rows,
+        "chunks": chunks,
+        "models": {t: str(model_path(t, ml_cfg)) for t in models},
+        "output": str(output) if output else None,
+        "db_table": db_table,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Скоринг новых заказов")
+    parser.add_argument("--config", type=str, default="config/config.yaml")
+    parser.add_argument("--input", type=str, required=True, help="CSV или Parquet")
+    parser.add_argument("--output", type=str, default=None, help="Parquet-файл")
+    parser.add_argument("--db-table", type=str, default=None)
+    parser.add_argument("--dsn", type=str, default=None)
+    parser.add_argument(
+        "--tasks", type=str, default="classification,regression", help="через запятую"
+    )
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument(
+        "--update-state",
+        action="store_true",
+        help="сохранить обновлённое состояние истории клиентов",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    cfg = load_config(args.config)
+    sc_cfg = cfg.get("scoring", {}) or {}
+    dsn = args.dsn or sc_cfg.get("dsn") or os.getenv(str(sc_cfg.get("env_dsn") or ""))
+    result = run_scoring(
+        cfg,
+        args.input,
+        output=args.output,
+        db_table=args.db_table,
+        dsn=dsn,
+        tasks=[t.strip() for t in args.tasks.split(",") if t.strip()],
+        chunksize=int(args.chunksize or sc_cfg.get("chunksize", 50_000)),
+        update_state=args.update_state,
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
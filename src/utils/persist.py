@@ -10,7 +10,18 @@ from sqlalchemy import create_engine
 def save_df_to_db(
     df: pd.DataFrame, conn_str: str, table: str, if_exists: str = "append"
 ) -> None:
+    """
+    PostgreSQL: append/replace через COPY (src.io.pg_copy; replace — атомарная
+    замена через staging, при другом наборе колонок — по схеме df).
+    Прочие СУБД и if_exists="fail" — df.to_sql.
+    """
     engine = create_engine(conn_str, future=True)
+    if engine.dialect.name == "postgresql" and if_exists in ("append", "replace"):
+        from src.io.pg_copy import bulk_load
+
+        mode = "append" if if_exists == "append" else "swap"
+        bulk_load(engine, table, [df], mode=mode)
+        return
     with engine.begin() as conn:
         df.to_sql(table, con=conn, if_exists=if_exists, index=False)
 
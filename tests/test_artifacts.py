@@ -0,0 +1,90 @@
+import multiprocessing
+import time
+
+import pytest
+
+from src.reporting.report_stage.artifacts import build_artifacts
+
+
+def _sleep_return(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_artifacts_parallel_isolated_and_timed(executor):
+    tasks = {
+        "pdf": (_sleep_return, (0.3, "a.pdf"), None),
+        "excel": (_fail, (), None),
+        "html": (_sleep_return, (0.3, ["a.html"]), []),
+    }
+    t0 = time.perf_counter()
+    results, timings = build_artifacts(tasks, workers=3, executor=executor)
+    wall = time.perf_counter() - t0
+    assert results == {"pdf": "a.pdf", "excel": None, "html": ["a.html"]}
+    *items, total = timings
+    status = {t["artifact"]: t["status"] for t in items}
+    assert status == {"pdf": "ok", "excel": "error", "html": "ok"}
+    assert total["artifact"] == "total" and not total["ok"]
+    assert total["status"] == f"{executor} x3"
+    assert total["serial_seconds"] >= 0.6
+    assert total["speedup"] > 1.0
+    if executor == "thread":  # у процессов добавляется запуск пула
+        assert wall < 0.5
+
+
+def test_artifacts_inline_runs_alongside_pool():
+    tasks = {
+        "pdf": (_sleep_return, (0.3, "a.pdf"), None),
+        "excel": (_sleep_return, (0.3, "a.xlsx"), None),
+    }
+    t0 = time.perf_counter()
+    results, timings = build_artifacts(
+        tasks, workers=2, executor="thread", inline=["excel"]
+    )
+    assert time.perf_counter() - t0 < 0.5
+    assert results == {"pdf": "a.pdf", "excel": "a.xlsx"}
+    assert [t["artifact"] for t in timings] == ["pdf", "excel", "total"]
+    assert timings[-1]["status"] == "thread x1"
+
+
+def test_artifacts_budget_skips_slow():
+    tasks = {
+        "fast": (_sleep_return, (0, 1), 0),
+        "slow": (_sleep_return, (1.0, 2), 0),
+    }
+    results, timings = build_artifacts(
+        tasks, workers=2, budget_seconds=0.2, executor="thread"
+    )
+    assert results == {"fast": 1, "slow": 0}
+    assert [t["status"] for t in timings[:-1]] == ["ok", "timeout"]
+    seq, t_seq = build_artifacts(
+        {"x": (_sleep_return, (0, 5), None), "y": (_fail, (), -1)}, workers=1
+    )
+    assert seq == {"x": 5, "y": -1}
+    assert t_seq[-1]["status"] == "sequential"
+    with pytest.raises(ValueError):
+        build_artifacts(tasks, executor="fork")
+
+
+def test_artifacts_budget_terminates_pool_processes():
+    tasks = {
+        "fast": (_sleep_return, (0, 1), 0),
+        "slow": (_sleep_return, (30.0, 2), 0),
+    }
+    t0 = time.perf_counter()
+    results, timings = build_artifacts(
+        tasks, workers=2, budget_seconds=1.0, executor="process"
+    )
+    assert results == {"fast": 1, "slow": 0}
+    assert timings[1]["status"] == "timeout"
+    # зависший воркер остановлен — выход из процесса его не ждёт
+    deadline = time.perf_counter() + 5
+    while multiprocessing.active_children() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert not multiprocessing.active_children()
+    assert time.perf_counter() - t0 < 10
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.clean_stage import _partition_labels, run_cleaning
+
+
+def _sales() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame(
+        {
+            "order_id": rng.integers(1, 300, n),
+            "customer_id": rng.integers(1, 50, n).astype(object),
+            "order_date": pd.Series(
+                pd.date_range("2024-01-01", periods=n, freq="D").astype(str)
+            )
+            .sample(frac=1.0, random_state=0)
+            .to_numpy(),
+            "amount": rng.exponential(80, n).round(0),
+            "source": rng.choice(["db", "file", "api"], n),
+            "mostly_empty": [None] * (n - 5) + [1, 2, 3, 4, 5],
+        }
+    )
+    df.loc[::37, "amount"] = None
+    df.loc[::53, "order_date"] = "bad-date"
+    # полные дубликаты строк
+    return pd.concat([df, df.iloc[::20]], ignore_index=True)
+
+
+@pytest.mark.parametrize("by,workers", [("month", 1), ("source", 2)])
+def test_partitioned_cleaning_matches_in_memory(by, workers):
+    df = _sales()
+    base_cfg = {"processing": {"cleaner": {}}}
+    part_cfg = {
+        "processing": {
+            "cleaner": {"partitions": {"enabled": True, "by": by, "workers": workers}}
+        }
+    }
+    expected, expected_stats = run_cleaning(df, base_cfg)
+    got, got_stats = run_cleaning(df, part_cfg)
+
+    assert "mostly_empty" not in got.columns
+    assert got_stats == expected_stats
+    assert expected_stats["sales_duplicates"] == 20
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_partitions_share_date_format():
+    # своя первая строка у партиции "b" дала бы %m/%d/%Y вместо %d/%m/%Y
+    df = pd.DataFrame(
+        {
+            "order_id": [1, 2, 3],
+            "order_date": ["13/01/2024", "01/02/2024", "03/04/2024"],
+            "source": ["a", "b", "b"],
+        }
+    )
+    part_cfg = {
+        "processing": {
+            "cleaner": {"partitions": {"enabled": True, "by": "source", "workers": 1}}
+        }
+    }
+    expected, _ = run_cleaning(df, {"processing": {"cleaner": {}}})
+    got, _ = run_cleaning(df, part_cfg)
+    pd.testing.assert_frame_equal(got, expected)
+    assert got["order_date"].iloc[1] == pd.Timestamp("2024-02-01")
+
+
+def test_partitions_share_dtypes_and_month_labels():
+    # партиция "1" без пропусков amount (int64), "1.0" — с пропуском (float64);
+    # после приведения строки 0 и 1 совпадают — дубликат между партициями
+    df = pd.DataFrame(
+        {
+            "order_id": pd.Series([1, "1.0", "1.0"], dtype=object),
+            "order_date": ["2024-01-05", "2024-01-05", "bad"],
+            "amount": pd.Series([5, 5, None], dtype=object),
+        }
+    )
+    part_cfg = {
+        "processing": {
+            "cleaner": {"partitions": {"enabled": True, "by": "order_id", "workers": 1}}
+        }
+    }
+    expected, expected_stats = run_cleaning(df, {"processing": {"cleaner": {}}})
+    got, got_stats = run_cleaning(df, part_cfg)
+    pd.testing.assert_frame_equal(got, expected)
+    assert got_stats == expected_stats and got_stats["sales_duplicates"] == 1
+
+    dates = pd.DataFrame({"order_date": ["01/02/2024", "13/01/2024"]})
+    labels = _partition_labels(dates, "month", "%d/%m/%Y")
+    assert list(labels) == ["2024-02", "2024-01"]
@@ -23,3 +23,62 @@ def test_impute_and_encode_and_scale_and_dates():
     assert abs(df4["num"].mean()) < 1e-6
     df5 = parse_dates(df4, ["date"])
     assert str(df5["date"].dtype).startswith("datetime64")
+
+
+def test_nested_columns_to_strings_and_explode():
+    from src.processing.cleaner import (
+        coerce_list_columns_to_strings,
+        detect_nested_columns,
+        explode_nested_columns,
+    )
+
+    df = pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "tags": [["b", "a"], None, ["c"]],
+            "reviews": [[{"rating": 5}, {"rating": 3}], [], [{"rating": 4}]],
+            "dims": [{"w": 1, "h": 2}, {"w": 3, "h": 4}, None],
+            "title": ["x", "y", "z"],
+        }
+    )
+    assert detect_nested_columns(df) == ["tags", "reviews", "dims"]
+
+    flat = coerce_list_columns_to_strings(df)
+    assert flat.loc[0, "tags"] == '["b","a"]'
+    assert flat.loc[0, "dims"] == '{"h":2,"w":1}'
+    assert flat.loc[1, "tags"] is None
+    assert flat["title"].tolist() == ["x", "y", "z"]
+
+    parent, children = explode_nested_columns(df, parent_key="id")
+    assert list(parent.columns) == ["id", "title"]
+    assert children["tags"][["id", "pos", "tags"]].values.tolist() == [
+        [1, 0, "b"],
+        [1, 1, "a"],
+        [3, 0, "c"],
+    ]
+    assert children["reviews"]["rating"].tolist() == [5, 3, 4]
+    assert children["dims"][["id", "w", "h"]].values.tolist() == [[1, 1, 2], [2, 3, 4]]
+
+
+def test_nested_subclasses_and_same_json_without_orjson(monkeypatch):
+    from collections import OrderedDict
+
+    from src.processing import cleaner
+
+    class Tags(list):
+        pass
+
+    df = pd.DataFrame(
+        {"tags": [Tags(["b", "a"]), "x", None], "dims": [OrderedDict(w=1, h=2)] * 3}
+    )
+    assert cleaner.detect_nested_columns(df) == ["tags", "dims"]
+    flat = cleaner.coerce_list_columns_to_strings(df)
+    assert flat["tags"].tolist() == ['["b","a"]', "x", None]
+    assert flat.loc[0, "dims"] == '{"h":2,"w":1}'
+
+    if cleaner._ORJSON_OK:
+        import json
+
+        monkeypatch.setattr(cleaner, "_ORJSON_OK", False)
+        monkeypatch.setattr(cleaner, "json", json, raising=False)
+        assert cleaner.coerce_list_columns_to_strings(df).equals(flat)
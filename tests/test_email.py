@@ -0,0 +1,228 @@
+import email
+import io
+import os
+import socket
+import zipfile
+from email import policy
+
+import pytest
+
+from src.pipelines.email_stage import send_email_with_artifacts
+from src.reporting.attachments import package_attachments
+from src.reporting.mailer import Dispatcher, SMTPPool, get_dispatcher
+
+pytest.importorskip("aiosmtpd")
+from tools.run_debug_smtp import start  # noqa: E402
+
+
+class _Sink:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content))
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    sink, port = _Sink(), _free_port()
+    controller = start(sink, port=port)
+    yield sink, port
+    controller.stop()
+
+
+def _artifacts(tmp_path, pdf_bytes: int = 2000):
+    (tmp_path / "img" / "combined").mkdir(parents=True)
+    images = []
+    for i, sub in enumerate(("img", "img/combined")):
+        p = tmp_path / sub / f"chart_{i}.png"
+        p.write_bytes(b"\x89PNG" + bytes(500))
+        images.append(str(p))
+    pdf = tmp_path / "report.pdf"
+    pdf.write_bytes(b"%PDF-" + b".\n" * (pdf_bytes // 2))
+    xlsx = tmp_path / "report.xlsx"
+    xlsx.write_bytes(bytes(3000))
+    return {"pdf": str(pdf), "excel": str(xlsx), "images": images, "html": []}
+
+
+def _cfg(tmp_path, port, **attachments):
+    return {
+        "enabled": True,
+        "smtp": {"host": "127.0.0.1", "port": port},
+        "to": ["a@example.com", "b@example.com"],
+        "subject": "Отчёт",
+        "body": "Отчёт сформирован.\n.точка в начале строки",
+        "attachments": {"work_dir": str(tmp_path / "mail"), **attachments},
+    }
+
+
+def test_streamed_message_with_zip_and_mime_types(tmp_path, smtp):
+    sink, port = smtp
+    arts = _artifacts(tmp_path)
+    send_email_with_artifacts(_cfg(tmp_path, port), arts)
+    ((rcpts, raw),) = sink.messages
+    assert rcpts == ["a@example.com", "b@example.com"]
+    msg = email.message_from_bytes(raw, policy=policy.default)
+    assert str(msg["Subject"]) == "Отчёт"
+    assert (
+        msg.get_body(("plain",)).get_content().splitlines()[1]
+        == ".точка в начале строки"
+    )
+    parts = {p.get_filename(): p for p in msg.iter_attachments()}
+    assert {n: p.get_content_type() for n, p in parts.items()} == {
+        "report.pdf": "application/pdf",
+        "report.xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "images.zip": "application/zip",
+    }
+    assert parts["report.pdf"].get_content() == open(arts["pdf"], "rb").read()
+    with zipfile.ZipFile(io.BytesIO(parts["images.zip"].get_content())) as zf:
+        assert sorted(zf.namelist()) == ["chart_0.png", "combined/chart_1.png"]
+
+
+def test_non_ascii_names_and_long_subject_in_headers(tmp_path, smtp):
+    sink, port = smtp
+    cfg = {
+        **_cfg(tmp_path, port),
+        "from": "Отдел отчётов <reports@example.com>",
+        "to": ["Иван Петров <a@example.com>", "b@example.com"],
+        "subject": "Еженедельный отчёт по продажам " * 4,
+    }
+    send_email_with_artifacts(cfg, {})
+    ((rcpts, raw),) = sink.messages
+    assert rcpts == ["a@example.com", "b@example.com"]
+    assert b"\n" not in raw.replace(b"\r\n", b"")
+    msg = email.message_from_bytes(raw, policy=policy.default)
+    (sender,) = msg["From"].addresses
+    assert (sender.display_name, sender.addr_spec) == (
+        "Отдел отчётов",
+        "reports@example.com",
+    )
+    assert [a.display_name for a in msg["To"].addresses] == ["Иван Петров", ""]
+    assert str(msg["Subject"]) == cfg["subject"]
+
+
+def test_budget_replaces_big_attachment_with_link(tmp_path, smtp):
+    sink, port = smtp
+    arts = _artifacts(tmp_path, pdf_bytes=200_000)
+    cfg = _cfg(tmp_path, port, max_message_mb=0.1, link_base="https://r.example/x/")
+    files, notes = package_attachments(arts, cfg["attachments"])
+    assert [p.name for p in files] == ["report.xlsx", "images.zip"]
+    assert notes == ["report.pdf (0.2 МБ): https://r.example/x/report.pdf"]
+    send_email_with_artifacts(cfg, arts)
+    msg = email.message_from_bytes(sink.messages[0][1], policy=policy.default)
+    assert [p.get_filename() for p in msg.iter_attachments()] == [p.name for p in files]
+    assert "https://r.example/x/report.pdf" in msg.get_body(("plain",)).get_content()
+    assert len(sink.messages[0][1]) < 0.1 * 2**20
+
+
+def test_fan_out_reuses_pooled_connections(tmp_path, smtp):
+    sink, port = smtp
+    cfg = {
+        **_cfg(tmp_path, port, zip_images=False),
+        "per_recipient": True,
+        "segments": [
+            {"name": "ops", "to": ["1@x.ru", "2@x.ru", "3@x.ru"]},
+            {"name": "fin", "to": ["4@x.ru"], "include": ["excel"], "subject": "Excel"},
+        ],
+        "dispatch": {"pool_size": 2, "outbox_dir": str(tmp_path / "outbox")},
+    }
+    futures = send_email_with_artifacts(cfg, _artifacts(tmp_path), wait=False)
+    assert [f.result(timeout=10) for f in futures] == [True] * 4
+    assert sorted(r for rcpts, _ in sink.messages for r in rcpts) == [
+        "1@x.ru",
+        "2@x.ru",
+        "3@x.ru",
+        "4@x.ru",
+    ]
+    assert get_dispatcher(cfg).pool.opened <= 2
+    fin = [raw for rcpts, raw in sink.messages if rcpts == ["4@x.ru"]][0]
+    msg = email.message_from_bytes(fin, policy=policy.default)
+    assert [p.get_filename() for p in msg.iter_attachments()] == ["report.xlsx"]
+
+
+def test_failed_send_kept_in_outbox_and_replayed(tmp_path, smtp):
+    sink, port = smtp
+    outbox = tmp_path / "outbox"
+    report = tmp_path / "report.pdf"
+    report.write_bytes(b"%PDF-first")
+    job = {
+        "from": "a@x.ru",
+        "to": ["z@x.ru"],
+        "subject": "s",
+        "body": "b",
+        "attachments": [str(report)],
+    }
+    down = Dispatcher(
+        SMTPPool("127.0.0.1", _free_port(), size=1),
+        {"retries": 1, "backoff_seconds": 0, "outbox_dir": str(outbox)},
+    )
+    assert down.submit(job).result(timeout=10) is False
+    assert len(list(outbox.glob("*.json"))) == 1
+    # следующий прогон перезаписал отчёт — уходит сохранённая копия
+    report.write_bytes(b"%PDF-second")
+    up = Dispatcher(SMTPPool("127.0.0.1", port), {"outbox_dir": str(outbox)})
+    assert [f.result(timeout=10) for f in up.flush_outbox()] == [True]
+    rcpts, raw = sink.messages[-1]
+    assert rcpts == ["z@x.ru"] and not list(outbox.iterdir())
+    msg = email.message_from_bytes(raw, policy=policy.default)
+    (part,) = msg.iter_attachments()
+    assert part.get_filename() == "report.pdf"
+    assert part.get_content() == b"%PDF-first"
+    up.close()
+
+
+def test_permanent_failure_dead_lettered_and_job_kept_until_sent(tmp_path):
+    import smtplib
+
+    outbox = tmp_path / "outbox"
+    report = tmp_path / "report.pdf"
+    report.write_bytes(b"%PDF-")
+    job = {
+        "from": "a@x.ru",
+        "to": ["z@x.ru"],
+        "subject": "s",
+        "body": "b",
+        "attachments": [str(report)],
+    }
+    cfg = {"retries": 3, "backoff_seconds": 0, "outbox_dir": str(outbox)}
+
+    class Refused(Dispatcher):
+        calls = 0
+
+        def _send(self, job):
+            Refused.calls += 1
+            raise smtplib.SMTPRecipientsRefused({"z@x.ru": (550, b"no such user")})
+
+    bad = Refused(SMTPPool("127.0.0.1", _free_port()), cfg)
+    assert bad.submit(job).result(timeout=10) is False
+    assert Refused.calls == 1 and not list(outbox.glob("*.json"))
+    assert len(list((outbox / "failed").glob("*.json"))) == 1
+    assert bad.flush_outbox() == []
+    bad.close()
+
+    # временный отказ — в outbox; при переотправке файл задания на месте,
+    # пока письмо не ушло
+    class Down(Dispatcher):
+        def _send(self, job):
+            raise smtplib.SMTPServerDisconnected("down")
+
+    Down(SMTPPool("127.0.0.1", _free_port()), cfg).submit(job).result(timeout=10)
+    (saved,) = outbox.glob("*.json")
+    seen = []
+
+    class Up(Dispatcher):
+        def _send(self, job):
+            seen.append(saved.exists() and all(map(os.path.exists, job["attachments"])))
+
+    up = Up(SMTPPool("127.0.0.1", _free_port()), cfg)
+    assert [f.result(timeout=10) for f in up.flush_outbox()] == [True]
+    assert seen == [True] and not saved.exists()
+    assert sorted(p.name for p in outbox.iterdir()) == ["failed"]
+    up.close()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from openpyxl import load_workbook
+
+from src.reporting.excel import _write_frame, split_sheets, to_excel_multisheet
+from src.reporting.report_stage.excel_builder import build_excel
+
+
+def _frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "order_id": pd.array(np.arange(n), dtype="Int64"),
+            "order_date": pd.date_range("2024-01-01", periods=n, freq="h"),
+            "amount": np.linspace(1.0, 2.0, n),
+            "source": pd.Categorical(["csv", "sql"] * (n // 2) + ["csv"] * (n % 2)),
+        }
+    )
+
+
+def test_split_sheets_names_and_sizes():
+    parts = split_sheets("raw_combined", _frame(25), max_rows=10)
+    assert [n for n, _ in parts] == [
+        "raw_combined_1",
+        "raw_combined_2",
+        "raw_combined_3",
+    ]
+    assert [len(p) for _, p in parts] == [10, 10, 5]
+    assert split_sheets("x" * 40, _frame(3))[0][0] == "x" * 31
+
+
+def test_multisheet_chunked_and_split(tmp_path):
+    df = _frame(23)
+    df.loc[3, "amount"] = np.nan
+    df.loc[4, "order_id"] = pd.NA
+    path = tmp_path / "r.xlsx"
+    written = to_excel_multisheet(
+        path,
+        {"raw_combined": df, "metrics": pd.DataFrame({"r2": [0.5]})},
+        with_conditional_format=True,
+        max_rows=10,
+        chunk_rows=4,
+    )
+    assert written == ["raw_combined_1", "raw_combined_2", "raw_combined_3", "metrics"]
+    wb = load_workbook(path)
+    ws = wb["raw_combined_2"]
+    rows = list(ws.values)
+    assert rows[0] == ("order_id", "order_date", "amount", "source")
+    assert len(rows) == 11 and rows[1][0] == 10
+    assert rows[1][1] == pd.Timestamp("2024-01-01 10:00").to_pydatetime()
+    first = list(wb["raw_combined_1"].values)
+    assert first[4][2] is None and first[5][0] is None
+
+
+def test_build_excel_sample_mode_links_parquet(tmp_path):
+    df = _frame(50)
+    cfg = {
+        "output": str(tmp_path / "excel" / "report.xlsx"),
+        "mode": "sample",
+        "sample_rows": 5,
+        "parquet_dir": str(tmp_path / "full"),
+    }
+    out = build_excel(df, df, pd.DataFrame(), pd.DataFrame(), {}, cfg)
+    wb = load_workbook(out)
+    assert wb["sales_cleaned"].max_row == 6
+    links = list(wb["full_data"].values)
+    assert links[1][:3] == ("raw_combined", 50, 5)
+    assert wb["full_data"].cell(2, 4).hyperlink is not None
+    full = pd.read_parquet(tmp_path / "full" / "raw_combined")
+    assert len(full) == 50 and sorted(full["source"].astype(str).unique()) == [
+        "csv",
+        "sql",
+    ]
+
+
+def test_write_frame_adds_one_format_per_num_format(tmp_path):
+    df = _frame(6).assign(shipped=pd.date_range("2024-02-01", periods=6, freq="D"))
+    wb = xlsxwriter.Workbook(str(tmp_path / "f.xlsx"))
+    before = len(wb.formats)
+    _write_frame(wb, wb.add_worksheet("s"), df, None, chunk_rows=2)
+    wb.close()
+    assert len(wb.formats) - before == 1
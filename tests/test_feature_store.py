@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from src.ml import feature_store as fs
+from src.ml.features import build_features
+from src.ml.history import HISTORY_COLUMNS, customer_history
+
+
+def _orders() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "order_id": [1, 2, 3, 4, 5, 6],
+            "customer_id": pd.array([10, 10, 20, 10, 20, 30], dtype="Int64"),
+            "order_date": pd.to_datetime(
+                [
+                    "2024-01-01",
+                    "2024-01-05",
+                    "2024-01-06",
+                    "2024-02-01",
+                    "2024-03-01",
+                    "2024-03-02",
+                ]
+            ),
+            "amount": [100.0, 50.0, 20.0, np.nan, 40.0, 5.0],
+            "source": ["db", "file", "api", "db", "db", "file"],
+        }
+    )
+
+
+def test_get_or_build_versions_and_reuses(tmp_path):
+    df = _orders()
+    first = fs.get_or_build(df, "order_features", tmp_path)
+    again = fs.get_or_build(df, "order_features", tmp_path)
+    pd.testing.assert_frame_equal(first, again)
+    assert fs.read_manifest(tmp_path, "order_features")["latest"] == 1
+
+    expected = build_features(df)
+    pd.testing.assert_frame_equal(
+        first.drop(columns="order_id"), expected, check_dtype=False
+    )
+
+    changed = df.assign(amount=df["amount"] * 2)
+    fs.get_or_build(changed, "order_features", tmp_path)
+    manifest = fs.read_manifest(tmp_path, "order_features")
+    assert [v["version"] for v in manifest["versions"]] == [1, 2]
+    assert manifest["latest"] == 2
+
+
+def test_point_in_time_and_online_lookup(tmp_path):
+    fs.materialize(_orders(), tmp_path, ["customer_history"])
+
+    entities = pd.DataFrame(
+        {
+            "customer_id": pd.array([10, 10, 20, 99, 10], dtype="Int64"),
+            "order_date": pd.to_datetime(
+                ["2024-01-05", "2024-01-20", "2024-01-06", "2024-05-01", "2024-03-01"]
+            ),
+        }
+    )
+    got = fs.training_frame(entities, tmp_path, "customer_history")
+    assert list(got["customer_id"]) == [10, 10, 20, 99, 10]
+    # признаки на момент строго раньше: без заказа, совпадающего по времени;
+    # после последнего заказа (01.02) он тоже учтён
+    assert list(got["_cnt_prev"]) == [1, 2, 0, 0, 3]
+    assert list(got["_recency_days"]) == [4, 15, -1, -1, 29]
+    assert got["_amount_prev_mean"].iloc[4] == 75.0
+    assert list(got["_freq_30d"]) == [1, 2, 0, 0, 1]
+    assert list(got["_monetary_30d"]) == [100.0, 150.0, 0.0, 0.0, 0.0]
+
+    index = fs.load_online_index(tmp_path, "customer_history", as_of="2024-02-01")
+    assert fs.lookup(index, 10)["_cnt_prev"] == 3
+    assert fs.lookup(index, 10)["_recency_days"] == 0
+    assert fs.lookup(index, 99) is None
+
+
+def test_as_of_matches_customer_history():
+    df = _orders()
+    stored = fs._customer_history(df)
+    got = fs.history_as_of(df[["customer_id", "order_date"]], stored)
+    expected = customer_history(df)
+    for c in HISTORY_COLUMNS:
+        np.testing.assert_allclose(got[c], expected[c], err_msg=c)
+
+
+def test_definition_change_builds_new_version(tmp_path, monkeypatch):
+    df = _orders()
+    fs.get_or_build(df, "order_features", tmp_path)
+    monkeypatch.setattr(fs, "definition_hash", lambda name: "changed")
+    fs.get_or_build(df, "order_features", tmp_path)
+    assert fs.read_manifest(tmp_path, "order_features")["latest"] == 2
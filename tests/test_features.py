@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from src.ml.features import build_features
+from src.ml.history import (
+    HISTORY_COLUMNS,
+    HISTORY_WINDOWS,
+    build_history_state,
+    customer_history,
+    history_features,
+    index_history_state,
+    load_history_state,
+    save_history_state,
+    update_history,
+)
+
+
+def _orders(n: int = 300, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+        rng.integers(0, 700, n), unit="D"
+    )
+    df = pd.DataFrame(
+        {
+            "order_id": np.arange(n),
+            "customer_id": pd.array(rng.integers(1, 25, n), dtype="Int64"),
+            "order_date": dates,
+            "amount": rng.exponential(80, n).round(2),
+        }
+    )
+    df.loc[::17, "amount"] = np.nan
+    df.loc[::41, "order_date"] = pd.NaT
+    df.loc[::59, "customer_id"] = pd.NA
+    return df
+
+
+def _naive(df: pd.DataFrame) -> pd.DataFrame:
+    """Построчный эталон: заказы клиента раньше строки по (дата, позиция)."""
+    rows = []
+    pos = np.arange(len(df))
+    dates = df["order_date"]
+    for i in range(len(df)):
+        c, t = df["customer_id"].iloc[i], dates.iloc[i]
+        r = dict.fromkeys(HISTORY_COLUMNS, 0.0)
+        r["_amount_prev_mean"], r["_recency_days"] = np.nan, -1.0
+        if pd.isna(c):
+            rows.append(r)
+            continue
+        same = (df["customer_id"] == c).fillna(False).to_numpy()
+        if pd.isna(t):
+            earlier = dates.notna().to_numpy() | (dates.isna().to_numpy() & (pos < i))
+        else:
+            earlier = (dates < t).to_numpy() | ((dates == t).to_numpy() & (pos < i))
+        prev = df[same & earlier]
+        r["_cnt_prev"] = float(len(prev))
+        if prev["amount"].notna().any():
+            r["_amount_prev_mean"] = prev["amount"].mean()
+        if pd.notna(t):
+            dated = prev[prev["order_date"].notna()]
+            if len(dated) and len(dated) == len(prev):
+                r["_recency_days"] = (t - dated["order_date"].max()).days
+            for w in HISTORY_WINDOWS:
+                win = dated[dated["order_date"] >= t - pd.Timedelta(days=w)]
+                r[f"_freq_{w}d"] = float(len(win))
+                r[f"_monetary_{w}d"] = win["amount"].sum()
+        rows.append(r)
+    return pd.DataFrame(rows, index=df.index)[HISTORY_COLUMNS]
+
+
+def test_customer_history_matches_naive():
+    df = _orders()
+    pd.testing.assert_frame_equal(customer_history(df), _naive(df))
+
+    X = build_features(df)
+    assert set(HISTORY_COLUMNS) <= set(X.columns)
+    assert X["_amount_prev_mean"].notna().all()
+
+
+def test_incremental_history_matches_full(tmp_path):
+    df = _orders(400, seed=1).dropna(subset=["order_date"])
+    df = df.sort_values("order_date", kind="stable")
+    old, new = df.iloc[:300], df.iloc[300:]
+
+    save_history_state(build_history_state(old), tmp_path / "state")
+    state = load_history_state(tmp_path / "state")
+    feats, state2 = update_history(new, state)
+
+    full = customer_history(df).loc[new.index]
+    pd.testing.assert_frame_equal(feats, full)
+
+    full_state = build_history_state(df)
+    pd.testing.assert_frame_equal(
+        state2["totals"].reset_index(drop=True),
+        full_state["totals"],
+        check_dtype=False,
+    )
+    assert len(state2["tail"]) == len(full_state["tail"])
+
+
+def test_history_features_read_only_matches_update_history():
+    df = _orders(400, seed=2).dropna(subset=["order_date"])
+    state = build_history_state(df)
+    last = df["order_date"].max()
+    cust = df["customer_id"].dropna().iloc[:3].tolist()
+    new = pd.DataFrame(
+        {
+            "customer_id": [cust[0], cust[0], -1, None, cust[1], cust[0]],
+            "order_date": [last + pd.Timedelta(days=d) for d in (5, 6, 1, 1, 2, 3)],
+            "amount": [10.0, 20.0, 30.0, 40.0, 50.0, None],
+        }
+    )
+    got = history_features(new, index_history_state(state))
+    # у каждого заказа история только из состояния — как по одному заказу
+    expected = pd.concat([update_history(new.iloc[[i]], state)[0] for i in range(6)])
+    pd.testing.assert_frame_equal(got, expected)
+    assert got["_cnt_prev"].iloc[0] == got["_cnt_prev"].iloc[1]
+    assert state["totals"].equals(build_history_state(df)["totals"])
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.forecast import forecast_matrix, revenue_matrix
+
+
+def _sales(n: int = 600, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 120, n), unit="D"
+    )
+    return pd.DataFrame(
+        {
+            "order_date": dates,
+            "amount": rng.exponential(50, n).round(2),
+            "source": rng.choice(["db", "file", "api"], n),
+            "country": rng.choice(["RU", "DE"], n),
+        }
+    )
+
+
+def test_revenue_matrix_dense_and_consistent():
+    df = _sales()
+    wide = revenue_matrix(df, by=["source", "country"], freq="D")
+    assert len(wide) == (df["order_date"].max() - df["order_date"].min()).days + 1
+    assert np.isclose(wide["total"].sum(), df["amount"].sum())
+    src = wide[[c for c in wide.columns if c.startswith("source=")]]
+    assert np.allclose(src.sum(axis=1), wide["total"])
+    # неполные крайние месяцы отбрасываются
+    monthly = revenue_matrix(df, freq="MS")
+    assert monthly.index[0] == pd.Timestamp("2024-01-01")
+    assert monthly.index[-1] <= df["order_date"].max()
+
+
+def test_weekly_matrix_and_forecast_start_on_monday():
+    df = _sales()
+    weekly = revenue_matrix(df, freq="W")
+    assert (weekly.index.dayofweek == 0).all()
+    assert (weekly.index.to_series().diff().dropna() == pd.Timedelta(days=7)).all()
+    assert np.isclose(weekly["total"].sum(), df["amount"].sum())
+    assert (weekly["total"] > 0).all()
+
+    long, _ = forecast_matrix(weekly, "W", 4, n_jobs=1)
+    assert (long["period"].dt.dayofweek == 0).all()
+    assert long["period"].iloc[0] == weekly.index[-1] + pd.Timedelta(days=7)
+
+
+def test_forecast_parallel_matches_sequential_and_cache(tmp_path):
+    wide = revenue_matrix(_sales(), by=["source"], freq="D")
+    seq, s1 = forecast_matrix(wide, "D", 14, 7, n_jobs=1, cache_dir=tmp_path)
+    par, _ = forecast_matrix(wide, "D", 14, 7, n_jobs=2)
+    pd.testing.assert_frame_equal(seq, par)
+    assert len(seq) == 14 * wide.shape[1]
+    assert (seq["lower"] <= seq["forecast"]).all()
+    assert (seq["forecast"] <= seq["upper"]).all()
+    assert not s1["cached"].any()
+
+    again, s2 = forecast_matrix(wide, "D", 14, 7, n_jobs=1, cache_dir=tmp_path)
+    assert s2["cached"].all()
+    pd.testing.assert_frame_equal(seq, again)
+
+
+def test_forecast_stage_off_unless_enabled():
+    from src.pipelines.forecast_stage import run_forecast
+
+    out = run_forecast(_sales(), {"forecast": {"horizons": {"MS": 2}}})
+    assert out == {"images": [], "tables": [], "tables_df": {}}
@@ -0,0 +1,58 @@
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    average_precision_score,
+    confusion_matrix,
+    f1_score,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+
+from src.ml.metrics import (
+    average_precision,
+    metrics_at,
+    optimal_threshold,
+    roc_auc,
+    threshold_sweep,
+)
+
+
+def test_sweep_matches_sklearn():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 500)
+    # округление — много одинаковых вероятностей (связки)
+    proba = np.clip(0.3 * y + rng.normal(0.35, 0.2, 500), 0, 1).round(2)
+    sweep = threshold_sweep(y, proba)
+
+    assert np.isclose(roc_auc(sweep), roc_auc_score(y, proba))
+    assert np.isclose(average_precision(sweep), average_precision_score(y, proba))
+    for t in (0.0, 0.25, 0.5, 0.73, 1.01):
+        pred = (proba >= t).astype(int)
+        at = metrics_at(sweep, t)
+        assert np.isclose(at["accuracy"], accuracy_score(y, pred))
+        assert np.isclose(at["precision"], precision_score(y, pred, zero_division=0))
+        assert np.isclose(at["recall"], recall_score(y, pred, zero_division=0))
+        assert np.isclose(at["f1"], f1_score(y, pred, zero_division=0))
+        assert (at["confusion"] == confusion_matrix(y, pred, labels=[0, 1])).all()
+
+
+def test_optimal_threshold_targets():
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, 400)
+    proba = np.clip(0.4 * y + rng.normal(0.3, 0.2, 400), 0, 1)
+    sweep = threshold_sweep(y, proba)
+
+    t = optimal_threshold(sweep, target_precision=0.9)
+    at = metrics_at(sweep, t)
+    assert at["precision"] >= 0.9
+    # ни один порог с precision >= 0.9 не даёт больший recall
+    ok = sweep[sweep["precision"] >= 0.9]
+    assert np.isclose(at["recall"], ok["recall"].max())
+
+    t = optimal_threshold(sweep, target_recall=0.95)
+    assert metrics_at(sweep, t)["recall"] >= 0.95
+    assert optimal_threshold(sweep, target_precision=1.01) is None
+    assert np.isclose(
+        metrics_at(sweep, optimal_threshold(sweep))["f1"], sweep["f1"].max()
+    )
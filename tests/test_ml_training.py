@@ -0,0 +1,177 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.ml.features import build_features
+from src.ml.scheduler import run_training
+
+
+def _X() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 240
+    df = pd.DataFrame(
+        {
+            "order_id": np.arange(n),
+            "customer_id": rng.integers(1, 30, n),
+            "order_date": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 200, n), unit="D"),
+            "amount": rng.exponential(80, n).round(2),
+            "source": rng.choice(["db", "file", "api"], n),
+        }
+    )
+    return build_features(df)
+
+
+def _train(X, ml_cfg, tmp_path):
+    images, tables, tables_df = [], [], {}
+    metrics = {"classification": {}, "regression": {}}
+    run_training(
+        X,
+        ml_cfg,
+        tmp_path / "img",
+        tmp_path / "models",
+        images,
+        tables,
+        tables_df,
+        metrics,
+    )
+    return metrics, images, tables_df
+
+
+def _strip(m):
+    return {k: v for k, v in m.items() if k != "fit_seconds"}
+
+
+def test_parallel_training_matches_sequential(tmp_path):
+    X = _X()
+    seq, seq_img, seq_tdf = _train(X, {"training": {"parallel": False}}, tmp_path / "a")
+    par, par_img, par_tdf = _train(
+        X, {"training": {"parallel": True, "n_jobs": 2}}, tmp_path / "b"
+    )
+    for task in ("classification", "regression"):
+        assert par[task]["fit_seconds"] >= 0
+        assert _strip(par[task]) == _strip(seq[task])
+    assert [p.split("/")[-1] for p, _ in par_img] == [
+        p.split("/")[-1] for p, _ in seq_img
+    ]
+    assert list(par_tdf) == list(seq_tdf)
+
+
+def test_regression_warm_start_adds_trees(tmp_path):
+    X = _X()
+    cfg = {
+        "training": {"parallel": False},
+        "classification": {"enabled": False},
+        "regression": {"warm_start": True, "warm_start_trees": 10},
+    }
+    first, _, _ = _train(X, cfg, tmp_path)
+    assert first["regression"]["warm_start"] is False
+    assert first["regression"]["holdout"] == "random"
+    second, _, _ = _train(X, cfg, tmp_path)
+    assert second["regression"]["warm_start"] is True
+    # тест — только строки, которых прежняя модель не видела при обучении
+    assert second["regression"]["holdout"] == "unseen"
+    model = joblib.load(tmp_path / "models" / "rf_amount.joblib")
+    assert model.n_estimators == 260
+    assert len(model.seen_rows_) == second["regression"]["n_train"]
+
+    # лимит деревьев: вместо 270 — обучение с нуля
+    cfg["regression"]["warm_start_max_trees"] = 265
+    third, _, _ = _train(X, cfg, tmp_path)
+    assert third["regression"]["warm_start"] is False
+    assert joblib.load(tmp_path / "models" / "rf_amount.joblib").n_estimators == 250
+
+
+def test_hist_gb_handles_nan_and_compare_table(tmp_path):
+    X = _X()
+    X.loc[X.index[::7], "_amount_prev_mean"] = np.nan
+    cfg = {
+        "training": {"parallel": False},
+        "classification": {"estimator": "hist_gb", "compare": ["logreg", "hist_gb"]},
+        "regression": {"estimator": "auto", "auto_min_rows": 10},
+    }
+    metrics, _, tables_df = _train(X, cfg, tmp_path)
+    assert metrics["classification"]["estimator"] == "hist_gb"
+    assert metrics["regression"]["estimator"] == "hist_gb"
+    assert (tmp_path / "models" / "hgb_amount.joblib").exists()
+
+    cmp = tables_df["model_comparison_classification"]
+    assert list(cmp["estimator"]) == ["logreg", "hist_gb"]
+    assert {"fit_seconds", "size_kb", "roc_auc", "f1"} <= set(cmp.columns)
+
+
+def test_cv_and_halving_search_feed_metrics(tmp_path):
+    X = _X()
+    cfg = {
+        "training": {"parallel": False},
+        "evaluation": {
+            "enabled": True,
+            "cv_folds": 3,
+            "n_jobs": 2,
+            "search": {"enabled": True, "n_candidates": 4, "factor": 2},
+        },
+        "regression": {"estimator": "hist_gb"},
+    }
+    _, _, tables_df = _train(X, cfg, tmp_path)
+    reg = tables_df["ml_metrics_regression"]
+    assert list(reg["scope"]) == ["cv", "search"]
+    assert reg.loc[0, "rmse"] > 0 and reg.loc[0, "folds"] == 3
+    assert "learning_rate" in reg.loc[1, "best_params"]
+    clf = tables_df["ml_metrics_classification"]
+    assert 0 <= clf.loc[0, "roc_auc"] <= 1
+
+
+def test_registry_reuses_model_when_nothing_changed(tmp_path, monkeypatch):
+    import src.ml.regression as regression
+
+    X = _X()
+    cfg = {"training": {"parallel": False}, "classification": {"enabled": False}}
+    first, first_img, first_tdf = _train(X, cfg, tmp_path)
+    assert "reused" not in first["regression"]
+
+    # повторный запуск не должен обучать модель
+    def _boom(*args, **kwargs):
+        raise AssertionError("модель переобучается")
+
+    monkeypatch.setattr(regression, "make_estimator", _boom)
+    (tmp_path / "models" / "rf_amount.joblib").unlink()
+    second, second_img, second_tdf = _train(X, cfg, tmp_path)
+    assert second["regression"]["reused"] is True
+    assert _strip(second["regression"]) == {
+        **_strip(first["regression"]),
+        "reused": True,
+    }
+    assert [c for _, c in second_img] == [c for _, c in first_img]
+    pd.testing.assert_frame_equal(
+        second_tdf["rf_importance"], first_tdf["rf_importance"]
+    )
+    assert (tmp_path / "models" / "rf_amount.joblib").exists()
+
+    X2 = X.assign(amount=X["amount"] * 1.01)
+    monkeypatch.undo()
+    third, _, _ = _train(X2, cfg, tmp_path)
+    assert "reused" not in third["regression"]
+
+
+def test_target_threshold_chosen_on_train(tmp_path, monkeypatch):
+    import src.ml.classification as classification
+
+    seen = {}
+    original = classification.tuned_threshold
+
+    def spy(clf, Xtr, ytr, *args, **kwargs):
+        seen["n"] = len(Xtr)
+        seen["threshold"] = original(clf, Xtr, ytr, *args, **kwargs)
+        return seen["threshold"]
+
+    monkeypatch.setattr(classification, "tuned_threshold", spy)
+    cfg = {
+        "training": {"parallel": False},
+        "regression": {"enabled": False},
+        "classification": {"target_recall": 0.9},
+    }
+    metrics, _, _ = _train(_X(), cfg, tmp_path)
+    m = metrics["classification"]
+    assert seen["n"] == m["n_train"]
+    assert seen["threshold"] is not None
+    assert m["threshold"] == round(seen["threshold"], 6)
@@ -0,0 +1,112 @@
+import os
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from pypdf import PdfReader
+from reportlab.platypus import LongTable
+
+from src.reporting.pdf import (
+    build_story,
+    frame_rows,
+    prepare_image,
+    prune_image_cache,
+    table_flowables,
+    write_pdf,
+)
+from src.reporting.report_stage.pdf_builder import build_pdf
+
+
+def _charts(tmp_path, n: int = 6) -> list[tuple[str, str]]:
+    rng = np.random.default_rng(0)
+    out = []
+    for i in range(n):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(rng.normal(size=500).cumsum())
+        path = tmp_path / f"chart_{i}.png"
+        fig.savefig(path, dpi=200)  # 2000x1200 px — больше размера на странице
+        plt.close(fig)
+        out.append((str(path), f"график {i}"))
+    return out
+
+
+def test_images_downscaled_and_cached(tmp_path):
+    (src, _), *_ = _charts(tmp_path, 1)
+    cfg = {"cache_dir": str(tmp_path / "cache"), "dpi": 100}
+    small = prepare_image(src, 480, 288, cfg)
+    assert small != src and prepare_image(src, 480, 288, cfg) == small
+    from PIL import Image
+
+    with Image.open(small) as im:
+        assert im.size == (667, 400) and im.mode == "P"
+    jpg = prepare_image(src, 480, 288, {**cfg, "format": "jpeg"})
+    assert jpg.endswith(".jpg") and len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_pdf_smaller_with_preface_and_page_budget(tmp_path):
+    images = _charts(tmp_path)
+    cfg = {"images": {"cache_dir": str(tmp_path / "cache")}, "preface_path": "none"}
+    raw = build_pdf(
+        images,
+        pd.DataFrame(),
+        {**cfg, "output": str(tmp_path / "raw.pdf"), "images": {"dpi": None}},
+        [],
+    )
+    small = build_pdf(
+        images, pd.DataFrame(), {**cfg, "output": str(tmp_path / "a.pdf")}, []
+    )
+    assert (tmp_path / "a.pdf").stat().st_size < (
+        tmp_path / "raw.pdf"
+    ).stat().st_size / 2
+    assert len(PdfReader(small).pages) == len(PdfReader(raw).pages)
+
+    # титульный лист первым, тело — следом, временных файлов нет
+    pdf_cfg = {**cfg, "output": str(tmp_path / "b.pdf"), "preface_path": small}
+    merged = PdfReader(build_pdf(images, pd.DataFrame(), pdf_cfg, []))
+    assert len(merged.pages) == len(PdfReader(small).pages) + 1
+    assert sorted(p.name for p in tmp_path.glob("*.pdf")) == [
+        "a.pdf",
+        "b.pdf",
+        "raw.pdf",
+    ]
+
+    story = build_story(images, images_cfg=cfg["images"])
+    assert write_pdf(story, str(tmp_path / "c.pdf"), max_pages=2) == 2
+    assert len(PdfReader(str(tmp_path / "c.pdf")).pages) == 2
+
+
+def test_long_table_chunked_and_capped(tmp_path):
+    df = pd.DataFrame(
+        np.random.default_rng(0).normal(size=(450, 3)), columns=["a", "b", "c"]
+    )
+    flow = table_flowables(df, compact=True, max_rows=250, chunk_rows=100)
+    tables = [f for f in flow if isinstance(f, LongTable)]
+    assert [len(t._cellvalues) for t in tables] == [101, 101, 51]
+    assert all(t._cellvalues[0] == ["a", "b", "c"] for t in tables)
+    assert "ещё 200 строк" in flow[-1].text
+    assert frame_rows(df.head(1))[1] == [f"{v:.4g}" for v in df.iloc[0]]
+
+    story = build_story([], extra_tables=[("Большая таблица", df)], compact=True)
+    assert write_pdf(story, str(tmp_path / "t.pdf")) >= 4
+
+
+def test_image_cache_pruned_lru_and_truncation_noted(tmp_path):
+    images = _charts(tmp_path, 4)
+    cfg = {"cache_dir": str(tmp_path / "cache"), "dpi": 50, "max_entries": 2}
+    for i, (src, _) in enumerate(images):
+        out = prepare_image(src, 480, 288, cfg)
+        os.utime(out, (i, i))  # порядок использования
+    prepare_image(images[0][0], 480, 288, cfg)  # попадание — свежий
+    assert prune_image_cache(cfg) == 2
+    left = {p.name for p in (tmp_path / "cache").iterdir()}
+    assert Path(prepare_image(images[0][0], 480, 288, cfg)).name in left
+    assert Path(prepare_image(images[3][0], 480, 288, cfg)).name in left
+
+    story = build_story(_charts(tmp_path, 6), images_cfg=cfg)
+    assert write_pdf(story, str(tmp_path / "t.pdf"), max_pages=2) == 2
+    last = PdfReader(str(tmp_path / "t.pdf")).pages[-1].extract_text()
+    assert "Отчёт обрезан" in last
@@ -0,0 +1,236 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.io.pg_copy import copy_load
+
+
+def _has_pg_ctl() -> bool:
+    if shutil.which("pg_ctl"):
+        return True
+    pg_config = shutil.which("pg_config")
+    if not pg_config:
+        return False
+    out = subprocess.run([pg_config, "--bindir"], capture_output=True, text=True)
+    return (Path(out.stdout.strip()) / "pg_ctl").exists()
+
+
+try:
+    import pytest_postgresql  # noqa: F401
+
+    HAS_PG = _has_pg_ctl()
+except ImportError:
+    HAS_PG = False
+
+# локальный Postgres поднимает pytest-postgresql (фикстура postgresql — psycopg 3);
+# нужны сам плагин и серверные утилиты PostgreSQL (pg_ctl)
+needs_pg = pytest.mark.skipif(not HAS_PG, reason="нет pytest-postgresql/PostgreSQL")
+
+
+@pytest.fixture(params=["psycopg", "psycopg2"])
+def conn(request):
+    """Соединение с временной БД через psycopg 3 или psycopg2 (copy_expert)."""
+    pg = request.getfixturevalue("postgresql")
+    if request.param == "psycopg":
+        yield pg
+        return
+    psycopg2 = pytest.importorskip("psycopg2")
+    info = pg.info
+    c = psycopg2.connect(
+        host=info.host,
+        port=info.port,
+        user=info.user,
+        password=info.password,
+        dbname=info.dbname,
+    )
+    yield c
+    c.close()
+
+
+def _orders(ids, amount: float = 1.0) -> pd.DataFrame:
+    ids = np.asarray(ids)
+    return pd.DataFrame(
+        {
+            "order_id": ids,
+            "customer_id": pd.array(
+                np.where(ids % 5 == 0, None, ids % 7), dtype="Int64"
+            ),
+            "order_date": "2024-01-01",
+            "amount": np.full(len(ids), amount),
+        }
+    )
+
+
+def _rows(conn, sql):
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        return cur.fetchall()
+
+
+class _Psycopg2Cursor:
+    """Курсор без copy(): copy_load идёт по ветке psycopg2 (copy_expert)."""
+
+    def __init__(self):
+        self.sql, self.copies = [], []
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+
+    def fetchone(self):
+        return (None,)  # to_regclass: таблицы нет
+
+    def copy_expert(self, sql, fh):
+        self.copies.append((sql, fh.read()))
+
+    def close(self):
+        pass
+
+
+class _Psycopg2Conn:
+    def __init__(self):
+        self.cur = _Psycopg2Cursor()
+        self.committed = False
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+def test_psycopg2_copy_expert_per_chunk():
+    conn = _Psycopg2Conn()
+    chunks = [_orders(range(0, 3)), _orders(range(3, 5), amount=2.5)]
+    stats = copy_load(conn, "sales", chunks, mode="append")
+    assert stats["rows"] == 5 and conn.committed
+    sqls = [sql for sql, _ in conn.cur.copies]
+    assert (
+        sqls
+        == [
+            'COPY "sales" ("order_id", "customer_id", "order_date", "amount") '
+            "FROM STDIN (FORMAT CSV, NULL '')"
+        ]
+        * 2
+    )
+    # NULL — пустое поле; целые float — без «.0»
+    assert conn.cur.copies[0][1].splitlines() == [
+        "0,,2024-01-01,1",
+        "1,1,2024-01-01,1",
+        "2,2,2024-01-01,1",
+    ]
+    assert conn.cur.copies[1][1].splitlines() == [
+        "3,3,2024-01-01,2.5",
+        "4,4,2024-01-01,2.5",
+    ]
+    with pytest.raises(ValueError, match="psycopg 3"):
+        copy_load(_Psycopg2Conn(), "sales", [_orders(range(3))], fmt="binary")
+
+
+class _ExistingCursor(_Psycopg2Cursor):
+    """Таблица sales уже есть: колонки columns и первичный ключ по order_id."""
+
+    def __init__(self, columns):
+        super().__init__()
+        self.columns = columns
+
+    def fetchone(self):
+        return ("sales",)
+
+    def fetchall(self):
+        if "pg_attribute" in self.sql[-1]:
+            return [(c, "int8") for c in self.columns]
+        if "pg_constraint" in self.sql[-1] and "contype" in self.sql[-1]:
+            return [("sales_pkey", "PRIMARY KEY (order_id)")]
+        return []
+
+
+@pytest.mark.parametrize("changed", [False, True])
+def test_swap_with_changed_columns_uses_frame_schema(changed):
+    conn = _Psycopg2Conn()
+    old = ["order_id", "customer_id", "order_date", "amount"]
+    conn.cur = _ExistingCursor(old + ["legacy"] if changed else old)
+    copy_load(conn, "sales", [_orders(range(3))], mode="swap")
+    create = [q for q in conn.cur.sql if q.startswith("CREATE")]
+    keys = [q for q in conn.cur.sql if "ADD CONSTRAINT" in q]
+    if changed:
+        assert create == [
+            'CREATE UNLOGGED TABLE "sales__staging" ("order_id" BIGINT, '
+            '"customer_id" BIGINT, "order_date" TEXT, "amount" DOUBLE PRECISION)'
+        ]
+        assert keys == []
+    else:
+        assert create == [
+            'CREATE UNLOGGED TABLE "sales__staging" '
+            '(LIKE "sales" INCLUDING DEFAULTS)'
+        ]
+        assert keys == [
+            'ALTER TABLE "sales" ADD CONSTRAINT "sales_pkey" PRIMARY KEY (order_id)'
+        ]
+    assert conn.committed
+
+
+@needs_pg
+def test_replace_with_changed_schema(conn):
+    with conn.cursor() as cur:
+        cur.execute("CREATE TABLE sales (order_id INT PRIMARY KEY, legacy TEXT)")
+    conn.commit()
+    copy_load(conn, "sales", [_orders(range(5))], mode="swap")
+    cols = _rows(
+        conn,
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = 'sales' ORDER BY ordinal_position",
+    )
+    assert [c[0] for c in cols] == ["order_id", "customer_id", "order_date", "amount"]
+    assert _rows(conn, "SELECT count(*) FROM sales") == [(5,)]
+
+
+@needs_pg
+@pytest.mark.parametrize("fmt", ["csv", "binary"])
+def test_swap_replaces_table_and_keeps_keys(conn, fmt):
+    if fmt == "binary" and not hasattr(conn.cursor(), "copy"):
+        pytest.skip("binary — только psycopg 3")
+    with conn.cursor() as cur:
+        cur.execute(
+            "CREATE TABLE sales (order_id INT PRIMARY KEY, customer_id INT, "
+            "order_date TEXT, amount DOUBLE PRECISION)"
+        )
+        cur.execute("CREATE INDEX idx_sales_customer_id ON sales(customer_id)")
+        cur.execute("INSERT INTO sales VALUES (999, 1, '2020-01-01', 5)")
+    conn.commit()
+
+    chunks = (_orders(range(i, i + 100)) for i in range(0, 1000, 100))
+    stats = copy_load(conn, "sales", chunks, mode="swap", fmt=fmt)
+    assert stats["rows"] == 1000 and stats["rows_per_s"] > 0
+    assert _rows(conn, "SELECT count(*), max(order_id) FROM sales") == [(1000, 999)]
+    assert _rows(conn, "SELECT count(*) FROM sales WHERE customer_id IS NULL") == [
+        (200,)
+    ]
+    indexes = _rows(conn, "SELECT indexname FROM pg_indexes WHERE tablename = 'sales'")
+    assert sorted(r[0] for r in indexes) == ["idx_sales_customer_id", "sales_pkey"]
+    persistence = "SELECT relpersistence FROM pg_class WHERE relname = 'sales'"
+    assert _rows(conn, persistence) == [("p",)]
+    assert _rows(conn, "SELECT to_regclass('sales__staging')") == [(None,)]
+
+
+@needs_pg
+def test_upsert_merges_on_order_id(conn):
+    copy_load(conn, "sales", [_orders(range(10))], mode="upsert")
+    stats = copy_load(conn, "sales", [_orders(range(5, 15), amount=2.0)], mode="upsert")
+    assert stats["rows"] == 10
+    assert _rows(conn, "SELECT count(*), sum(amount) FROM sales") == [(15, 25.0)]
+
+
+@needs_pg
+def test_failed_load_leaves_table_untouched(conn):
+    copy_load(conn, "sales", [_orders(range(3))], mode="swap")
+    bad = _orders(range(3)).assign(order_id=["x", "y", "z"])
+    with pytest.raises(Exception):
+        copy_load(conn, "sales", [_orders(range(10)), bad], mode="swap")
+    assert _rows(conn, "SELECT count(*) FROM sales") == [(3,)]
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pl = pytest.importorskip("polars")
+
+from src.pipelines.io_stage import load_sources
+from src.pipelines.clean_stage import run_cleaning
+from src.pipelines.polars_backend import (
+    load_sources_pl,
+    run_cleaning_pl,
+    aggregates_by_source_pl,
+    to_pandas_frame,
+)
+from src.reporting.report_stage.helpers import aggregates_by_source
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path) -> dict:
+    rng = np.random.default_rng(1)
+    n = 300
+    sales = pd.DataFrame(
+        {
+            "order_id": np.arange(1, n + 1),
+            "customer_id": rng.integers(1, 40, n),
+            "order_date": pd.date_range("2024-01-01", periods=n, freq="D").strftime(
+                "%Y-%m-%d"
+            ),
+            "amount": rng.exponential(80, n).round(2),
+        }
+    )
+    sales.loc[::17, "amount"] = np.nan
+    sales = pd.concat([sales, sales.iloc[:10]], ignore_index=True)
+    sales.to_csv(tmp_path / "sales.csv", index=False)
+    sales.iloc[:50].to_parquet(tmp_path / "sales.parquet", index=False)
+    pd.DataFrame({"customer_id": [1, 2, 3], "country": ["RU", "DE", None]}).to_csv(
+        tmp_path / "customers.csv", index=False
+    )
+    return {
+        "sources": {
+            "csv": [
+                {"name": "sales", "path": str(tmp_path / "sales.csv")},
+                {"name": "customers", "path": str(tmp_path / "customers.csv")},
+            ],
+            "parquet": [{"name": "sales", "path": str(tmp_path / "sales.parquet")}],
+        },
+        "processing": {"cleaner": {"drop_high_missing_columns": {"threshold": 0.8}}},
+    }
+
+
+def test_polars_cleaning_matches_pandas(cfg):
+    raw_pd, _, _ = load_sources(cfg)
+    raw_pl, _, _ = load_sources_pl(cfg)
+    assert raw_pl.shape == raw_pd.shape
+    assert list(raw_pl.columns) == list(raw_pd.columns)
+
+    clean_pd, stats_pd = run_cleaning(raw_pd, cfg)
+    clean_pl, stats_pl = run_cleaning_pl(raw_pl, cfg)
+    assert stats_pl == stats_pd
+    # country почти пуст (3 из 663 строк) — удаляется обоими движками
+    assert "country" not in clean_pl.columns
+
+    pd.testing.assert_frame_equal(
+        to_pandas_frame(clean_pl, nullable_ids=True),
+        clean_pd,
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(
+        aggregates_by_source_pl(clean_pl), aggregates_by_source(clean_pd)
+    )
+
+
+def test_polars_ids_keep_int64_precision():
+    big = 2**53 + 1  # через Float64 превратился бы в 2**53
+    raw = pl.DataFrame(
+        {
+            "order_id": [str(big), " 7 ", "12.0", "x"],
+            "customer_id": [big, 1, 2, None],
+        }
+    )
+    clean, _ = run_cleaning_pl(raw, {"processing": {"cleaner": {}}})
+    assert clean["order_id"].to_list() == [big, 7, 12, None]
+    assert clean["customer_id"].to_list() == [big, 1, 2, None]
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from src.reporting.plots import _sales_hist, sales_plot_jobs
+from src.reporting.render import RenderCache, render_charts
+
+
+def _sales(n: int = 300, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "customer_id": rng.integers(1, 30, n),
+            "order_date": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+            "amount": rng.exponential(50, n).round(2),
+            "source": rng.choice(["db", "file"], n),
+        }
+    )
+
+
+def test_process_pool_render_matches_inline(tmp_path):
+    cfg = {
+        "sales": [
+            {"kind": "hist"},
+            {"kind": "monthly_revenue"},
+            {"kind": "top_customers"},
+            {"kind": "source_share_pie"},
+        ]
+    }
+    df = _sales()
+    seq_jobs = sales_plot_jobs(df, cfg, tmp_path / "seq")
+    par_jobs = sales_plot_jobs(df, cfg, tmp_path / "par")
+    # упавшее задание не мешает остальным
+    bad = ("broken", _sales_hist, (None, {}, tmp_path, "", ""))
+    seq, t_seq = render_charts(seq_jobs + [bad], workers=1)
+    par, t_par = render_charts([bad] + par_jobs, workers=2)
+
+    assert [t["chart"] for t in t_par] == ["broken"] + [j[0] for j in par_jobs]
+    assert seq[-1] is None and par[0] is None
+    assert not t_par[0]["ok"] and all(t["ok"] for t in t_par[1:])
+    for (p1, cap1), (p2, cap2) in zip(seq[:-1], par[1:]):
+        assert cap1 == cap2
+        with open(p1, "rb") as f1, open(p2, "rb") as f2:
+            assert f1.read() == f2.read()
+
+
+def test_render_cache_hits_and_evicts_stale(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    cfg = {"sales": [{"kind": "monthly_revenue"}, {"kind": "top_customers"}]}
+    df = _sales()
+    out = tmp_path / "img"
+
+    first, t1 = render_charts(sales_plot_jobs(df, cfg, out), cache=cache)
+    assert not any(t["cached"] for t in t1)
+    (out / "sales" / "monthly_revenue.png").unlink()
+    again, t2 = render_charts(sales_plot_jobs(df, cfg, out), cache=cache)
+    assert all(t["cached"] for t in t2) and again == first
+    # удалённый PNG восстановлен из кэша
+    assert (out / "sales" / "monthly_revenue.png").exists()
+    assert (cache.hits, cache.misses, cache.evicted) == (2, 2, 0)
+
+    # другие данные — новый ключ, прежняя запись того же файла вытесняется
+    _, t3 = render_charts(sales_plot_jobs(_sales(seed=1), cfg, out), cache=cache)
+    assert not any(t["cached"] for t in t3)
+    assert cache.evicted == 2
+    assert len(list((tmp_path / "cache").glob("*.png"))) == 2
+
+
+def test_render_cache_keys_on_chart_series_only(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    cfg = {"sales": [{"kind": "monthly_revenue"}, {"kind": "top_customers"}]}
+    df = _sales()
+    out = tmp_path / "img"
+    render_charts(sales_plot_jobs(df, cfg, out), cache=cache)
+
+    # другие клиенты: помесячная выручка та же — из кэша, топ клиентов — заново
+    moved = df.assign(customer_id=df["customer_id"] + 100)
+    _, timings = render_charts(sales_plot_jobs(moved, cfg, out), cache=cache)
+    assert [t["cached"] for t in timings] == [True, False]
+
+
+def test_render_cache_replaces_stale_png_and_keys_on_helpers(tmp_path, monkeypatch):
+    from src.ml import plots as ml_plots
+    from src.reporting import render
+
+    cache = RenderCache(tmp_path / "cache")
+    cfg = {"sales": [{"kind": "monthly_revenue"}]}
+    out = tmp_path / "img"
+    (first,), _ = render_charts(sales_plot_jobs(_sales(), cfg, out), cache=cache)
+    png = out / "sales" / "monthly_revenue.png"
+    fresh = png.read_bytes()
+    png.write_bytes(bytes(len(fresh)))  # тот же размер, другое содержимое
+    (again,), (t,) = render_charts(sales_plot_jobs(_sales(), cfg, out), cache=cache)
+    assert t["cached"] and again == first and png.read_bytes() == fresh
+
+    # правка вспомогательного модуля (src/ml/utils.py) меняет ключ графика
+    args = (np.eye(2), tmp_path / "cm.png")
+    before = cache.key(ml_plots.confusion.__wrapped__, args)
+    real = render._module_source
+    monkeypatch.setattr(
+        render,
+        "_module_source",
+        lambda name: real(name) + ("#" if name == "src.ml.utils" else ""),
+    )
+    assert cache.key(ml_plots.confusion.__wrapped__, args) != before
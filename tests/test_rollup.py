@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from src.reporting import rollup
+from src.reporting.dashboard import dashboard_html, dashboard_payload
+from src.reporting.plots import generate_sales_plots
+from src.reporting.report_stage.helpers import aggregates_by_source
+
+
+def _sales(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "order_id": np.arange(n),
+            "customer_id": rng.integers(1, 40, n),
+            "order_date": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+            "amount": rng.exponential(50, n).round(2),
+            "source": rng.choice(["db", "file", "api"], n),
+            "country": rng.choice(["RU", "DE"], n),
+        }
+    )
+    # пропуски в дате, сумме и источнике
+    df.loc[::17, "order_date"] = pd.NaT
+    df.loc[::13, "amount"] = np.nan
+    df.loc[::29, "source"] = None
+    return df
+
+
+def test_rollup_queries_match_row_level(tmp_path):
+    df = _sales()
+    cube = rollup.load_rollup(rollup.save_rollup(rollup.build_rollup(df), tmp_path))
+
+    tmp = df.dropna(subset=["order_date", "amount"])
+    monthly = tmp.groupby(tmp["order_date"].dt.to_period("M"))["amount"].sum()
+    pd.testing.assert_series_equal(
+        rollup.revenue(cube, "M"), monthly, check_names=False, check_index_type=False
+    )
+    tmp = tmp.dropna(subset=["source"])
+    daily = tmp.groupby([tmp["order_date"].dt.floor("D"), "source"])["amount"].sum()
+    assert np.allclose(rollup.revenue(cube, "D", by="source").values, daily.values)
+
+    orders = df["order_date"].dropna().dt.floor("D").value_counts().sort_index()
+    assert (rollup.orders_by_day(cube).values == orders.values).all()
+    share = df["source"].fillna("NA").value_counts()
+    assert rollup.orders_by(cube, "source").sort_index().equals(share.sort_index())
+
+    pd.testing.assert_frame_equal(
+        rollup.by_source(cube), aggregates_by_source(df), check_dtype=False
+    )
+    top = rollup.top_customers(cube, 5)
+    assert (top.values == df.groupby("customer_id").size().nlargest(5).values).all()
+    assert rollup.total_orders(cube) == len(df)
+
+
+def test_charts_from_saved_cube_without_rows(tmp_path):
+    cube = rollup.load_rollup(
+        rollup.save_rollup(rollup.build_rollup(_sales()), tmp_path)
+    )
+    plots_cfg = {
+        "sales": [
+            {"kind": "hist"},
+            {"kind": "monthly_revenue"},
+            {"kind": "top_customers"},
+            {"kind": "cumulative_revenue_by_source"},
+        ]
+    }
+    images = generate_sales_plots(pd.DataFrame(), plots_cfg, tmp_path / "img", cube)
+    # hist нужен построчным данным — из куба строятся только агрегатные графики
+    assert [p.split("/")[-1] for p, _ in images] == [
+        "monthly_revenue.png",
+        "top_customers.png",
+        "cumulative_revenue_by_source.png",
+    ]
+
+
+def test_dashboard_single_file_size_independent_of_rows(tmp_path):
+    small, big = _sales(400), _sales(40_000, seed=1)
+    payload = dashboard_payload(rollup.build_rollup(big))
+    cells = payload["cells"]
+    assert np.isclose(sum(cells["amount_sum"]), big["amount"].sum())
+    assert sum(cells["orders"]) == len(big)
+    assert payload["dictionaries"]["source"] == ["NA", "api", "db", "file"]
+
+    paths = [
+        dashboard_html(rollup.build_rollup(df), tmp_path / f"d{i}.html")
+        for i, df in enumerate((small, big))
+    ]
+    sizes = [(tmp_path / f"d{i}.html").stat().st_size for i in range(2)]
+    assert abs(sizes[1] - sizes[0]) < 20_000
+    page = open(paths[1], encoding="utf-8").read()
+    assert page.count('id="dashboard-data"') == 1
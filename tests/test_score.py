@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.ml.features import build_features
+from src.ml.history import build_history_state, save_history_state
+from src.ml.scheduler import run_training
+from src.ml.serving import load_model
+from src.score import run_scoring
+
+
+def _orders(n: int, start: str, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "order_id": np.arange(n) + seed * 10_000,
+            "customer_id": rng.integers(1, 30, n),
+            "order_date": pd.Timestamp(start)
+            + pd.to_timedelta(np.sort(rng.integers(0, 60, n)), unit="D"),
+            "amount": rng.exponential(80, n).round(2),
+            "source": rng.choice(["db", "file", "api"], n),
+        }
+    )
+
+
+def _cfg(tmp_path):
+    return {
+        "ml": {
+            "models_dir": str(tmp_path / "models"),
+            "training": {"parallel": False},
+            "regression": {"estimator": "hist_gb"},
+        }
+    }
+
+
+def test_batch_scoring_chunks_and_model_cache(tmp_path):
+    cfg = _cfg(tmp_path)
+    hist = _orders(300, "2024-01-01", seed=1)
+    run_training(
+        build_features(hist),
+        cfg["ml"],
+        tmp_path / "img",
+        tmp_path / "models",
+        [],
+        [],
+        {},
+        {},
+    )
+    save_history_state(
+        build_history_state(hist), tmp_path / "models" / "customer_history"
+    )
+
+    new = _orders(50, "2024-04-01", seed=2)
+    new.to_csv(tmp_path / "new.csv", index=False)
+
+    one = run_scoring(
+        cfg, tmp_path / "new.csv", output=tmp_path / "one.parquet", chunksize=1000
+    )
+    many = run_scoring(
+        cfg, tmp_path / "new.csv", output=tmp_path / "many.parquet", chunksize=7
+    )
+    assert one["rows"] == many["rows"] == 50
+    assert many["chunks"] == 8
+    a = pd.read_parquet(tmp_path / "one.parquet")
+    b = pd.read_parquet(tmp_path / "many.parquet")
+    assert list(a.columns) == ["order_id", "customer_id", "p_high_value", "amount_pred"]
+    assert a["p_high_value"].between(0, 1).all()
+    pd.testing.assert_frame_equal(a, b)
+
+    path = tmp_path / "models" / "hgb_amount.joblib"
+    m1 = load_model(path)
+    assert load_model(path) is m1
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert load_model(path) is not m1
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from src.reporting.seaborn_plots import (
+    corr_heatmap_png,
+    pairplot_png,
+    sample_rows,
+    top_columns,
+)
+
+
+def _wide(n: int = 3000, k: int = 40, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(1, 0.1, (n, k)), columns=[f"f{i}" for i in range(k)])
+    df["f3"] = rng.normal(1, 5, n)  # самый «разбросанный» признак
+    df["f7"] = df["f5"] * 2 + rng.normal(0, 0.01, n)  # сильная связь f5–f7
+    df["order_id"] = np.arange(n)
+    df["source"] = rng.choice(["db", "file", "api"], n, p=[0.6, 0.3, 0.1])
+    return df
+
+
+def test_top_columns_and_stratified_sample():
+    df = _wide()
+    num = df.drop(columns=["order_id", "source"])
+    assert top_columns(num, 3)[0] == "f3"
+    assert set(top_columns(num, 2, by="correlation")) == {"f5", "f7"}
+
+    sample = sample_rows(df, 300, strata="source")
+    share = df["source"].value_counts(normalize=True)
+    got = sample["source"].value_counts(normalize=True)
+    assert abs(len(sample) - 300) <= 3
+    assert np.allclose(got[share.index], share, atol=0.01)
+
+
+def test_scalable_pairplot_and_heatmap(tmp_path):
+    df = _wide()
+    cfg = {"max_cols": 4, "max_rows": 500, "heatmap_top_k": 10}
+    path, cap = pairplot_png(df, tmp_path / "pp.png", cfg)
+    assert path and "топ-4" in cap and "выборка" in cap and "source" in cap
+
+    path, cap = pairplot_png(df, tmp_path / "hex.png", {**cfg, "hexbin_rows": 1000})
+    assert path and "hexbin" in cap
+
+    path, cap = corr_heatmap_png(df, tmp_path / "hm.png", cfg)
+    assert path and "топ-10" in cap
+    assert all(
+        (tmp_path / f).stat().st_size > 0 for f in ("pp.png", "hex.png", "hm.png")
+    )
@@ -0,0 +1,117 @@
+"""
+Нагрузочный прогон tools/score_service.py: N параллельных keep-alive
+соединений шлют POST /score по одному заказу, в конце — пропускная
+способность, перцентили задержек со стороны клиента и /metrics сервиса.
+
+Запуск: python -m tools.load_score_service --requests 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from tools.score_service import HOST, PORT
+
+
+def _order(i):
+    d = date(2024, 1, 1) + timedelta(days=random.randint(0, 365))
+    return {
+        "order_id": 1_000_000 + i,
+        "customer_id": random.randint(1, 200),
+        "order_date": d.isoformat(),
+        "amount": round(random.expovariate(1 / 60), 2),
+        "source": random.choice(["db", "file", "api"]),
+    }
+
+
+def _request(method, path, body=b""):
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _read_response(reader):
+    status = await reader.readline()
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        if k.strip().lower() == "content-length":
+            length = int(v.strip())
+    body = await reader.readexactly(length)
+    return int(status.split()[1]), json.loads(body)
+
+
+async def _worker(host, port, counter, total, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            i = counter[0]
+            if i >= total:
+                break
+            counter[0] += 1
+            body = json.dumps(_order(i)).encode("utf-8")
+            t0 = time.perf_counter()
+            writer.write(_request("POST", "/score", body))
+            await writer.drain()
+            code, _ = await _read_response(reader)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if code != 200:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+async def _metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(_request("GET", "/metrics"))
+    await writer.drain()
+    _, data = await _read_response(reader)
+    writer.close()
+    return data
+
+
+async def main(host, port, total, concurrency):
+    counter, errors, latencies = [0], [0], []
+    t0 = time.perf_counter()
+    await asyncio.gather(
+        *[
+            _worker(host, port, counter, total, latencies, errors)
+            for _ in range(concurrency)
+        ]
+    )
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies)
+    print(f"Запросов: {len(lat)}, ошибок: {errors[0]}, время: {elapsed:.2f} с")
+    print(f"Пропускная способность: {len(lat) / elapsed:.0f} запросов/с")
+    print(
+        "Задержка клиента, мс: p50={:.2f} p95={:.2f} p99={:.2f} max={:.2f}".format(
+            *np.percentile(lat, [50, 95, 99]), lat.max()
+        )
+    )
+    print("Метрики сервиса:")
+    print(json.dumps(await _metrics(host, port), ensure_ascii=False, indent=2))
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса скоринга")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    run()
@@ -1,4 +1,4 @@
-# В Теримнале 1: 
+# В Теримнале 1:
 #   source .venv/bin/activate
 #   python3 /home/al/data_automation_project/tools/run_debug_smtp.py
 #
@@ -9,10 +9,22 @@ import time
 from aiosmtpd.controller import Controller
 from aiosmtpd.handlers import Debugging
 
-def run():
-    controller = Controller(Debugging(), hostname="127.0.0.1", port=1025)
+HOST = "127.0.0.1"
+PORT = 1025
+
+
+def start(handler=None, hostname: str = HOST, port: int = PORT) -> Controller:
+    """Запускает SMTP в фоновом потоке (по умолчанию печатает письма); stop() — остановка."""
+    controller = Controller(handler or Debugging(), hostname=hostname, port=port)
     controller.start()
-    print("DEBUG SMTP server running on 127.0.0.1:1025 (prints received emails to console).")
+    return controller
+
+
+def run():
+    controller = start()
+    print(
+        "DEBUG SMTP server running on 127.0.0.1:1025 (prints received emails to console)."
+    )
     try:
         while True:
             time.sleep(1)
@@ -20,5 +32,6 @@ def run():
         print("Stopping debug SMTP server...")
         controller.stop()
 
+
 if __name__ == "__main__":
     run()
@@ -0,0 +1,312 @@
+"""
+Локальный HTTP-сервис скоринга «high value order» (логистическая регрессия
+из run_classification или другой оценщик из ml.classification.estimator).
+
+Модель, состояние истории клиентов и преобразования признаков загружаются
+один раз при старте. Запросы за несколько миллисекунд (MAX_WAIT_MS) или до
+MAX_BATCH заказов собираются в микропакет и скорятся одним векторным
+predict_proba.
+
+Эндпоинты:
+  POST /score    {"order_id", "customer_id", "order_date", "amount", "source"}
+                 или список таких объектов -> {"p_high_value": [...]}
+  GET  /metrics  счётчики, пропускная способность, гистограмма задержек
+  GET  /health   -> {"status": "ok"}
+
+Запуск: python -m tools.score_service [--config config/config.yaml]
+Нагрузка: python -m tools.load_score_service
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.ml.history import history_features, index_history_state, load_history_state
+from src.ml.serving import load_model, model_path, score_frame
+from src.pipelines.clean_stage import coerce_types
+from src.utils.config import load_config
+
+HOST = "127.0.0.1"
+PORT = 5050
+
+MAX_BATCH = 256
+MAX_WAIT_MS = 5.0
+
+# границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.orders = 0
+        self.batches = 0
+        self.batch_orders = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=10_000)
+
+    def observe(self, latency_ms):
+        self.requests += 1
+        self.recent.append(latency_ms)
+        i = int(np.searchsorted(LATENCY_BUCKETS_MS, latency_ms, side="left"))
+        self.buckets[i] += 1
+
+    def snapshot(self):
+        uptime = max(time.time() - self.started, 1e-9)
+        lat = np.fromiter(self.recent, dtype=float) if self.recent else np.zeros(1)
+        labels = [f"le_{b}ms" for b in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "uptime_s": round(uptime, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "orders_scored": self.orders,
+            "batches": self.batches,
+            "avg_batch_size": (
+                round(self.batch_orders / self.batches, 2) if self.batches else 0
+            ),
+            "requests_per_s": round(self.requests / uptime, 1),
+            "orders_per_s": round(self.orders / uptime, 1),
+            "latency_ms": {
+                "p50": round(float(np.percentile(lat, 50)), 3),
+                "p95": round(float(np.percentile(lat, 95)), 3),
+                "p99": round(float(np.percentile(lat, 99)), 3),
+                "max": round(float(lat.max()), 3),
+            },
+            "latency_histogram": dict(zip(labels, np.cumsum(self.buckets).tolist())),
+        }
+
+
+class Scorer:
+    """Модель + замороженное состояние истории клиентов; один вызов на пакет."""
+
+    def __init__(self, cfg):
+        ml_cfg = cfg.get("ml", {}) or {}
+        path = model_path("classification", ml_cfg)
+        if path is None:
+            raise SystemExit(
+                "Нет сохранённой модели классификации — запустите пайплайн"
+            )
+        self.model = load_model(path)
+        hist_cfg = ml_cfg.get("history", {}) or {}
+        state_dir = (
+            hist_cfg.get("state_dir")
+            or Path(ml_cfg.get("models_dir", "models")) / "customer_history"
+        )
+        state = load_history_state(state_dir)
+        # индексируется один раз: пакет читает только своих клиентов
+        self.state = (
+            index_history_state(state)
+            if state is not None and not state["totals"].empty
+            else None
+        )
+        print(f"Модель: {path}; состояние истории: {'есть' if self.state else 'нет'}")
+
+    def score(self, records):
+        df = coerce_types(pd.DataFrame.from_records(records))
+        history = None
+        if self.state is not None and "customer_id" in df.columns:
+            # только по замороженному состоянию: заказы пакета друг другу не история
+            history = history_features(df, self.state)
+        out = score_frame(df, {"classification": self.model}, history=history)
+        return out["p_high_value"].round(6).tolist()
+
+
+class MicroBatcher:
+    def __init__(self, scorer, metrics, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.scorer = scorer
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        # один поток: predict_proba векторный, параллелить пакеты незачем
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def submit(self, records):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            n = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while n < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n += len(item[0])
+            records = [r for recs, _ in items for r in recs]
+            try:
+                probs = await loop.run_in_executor(
+                    self.executor, self.scorer.score, records
+                )
+            except Exception:
+                # ошибка одного запроса не должна валить соседей по пакету
+                await self._score_each(items)
+                continue
+            self.metrics.batches += 1
+            self.metrics.batch_orders += len(records)
+            self.metrics.orders += len(records)
+            pos = 0
+            for recs, fut in items:
+                if not fut.done():
+                    fut.set_result(probs[pos : pos + len(recs)])
+                pos += len(recs)
+
+    async def _score_each(self, items):
+        """Пакет упал — каждый запрос скорится отдельно со своей ошибкой."""
+        loop = asyncio.get_running_loop()
+        for recs, fut in items:
+            try:
+                probs = await loop.run_in_executor(
+                    self.executor, self.scorer.score, recs
+                )
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+                continue
+            self.metrics.batches += 1
+            self.metrics.batch_orders += len(recs)
+            self.metrics.orders += len(recs)
+            if not fut.done():
+                fut.set_result(probs)
+
+
+async def _read_request(reader):
+    """Минимальный разбор HTTP/1.1: строка запроса, заголовки, тело по Content-Length."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, version = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    body = await reader.readexactly(length) if length else b""
+    return method, path, version, headers, body
+
+
+def _response(code, obj, keep_alive):
+    reason = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        500: "Internal Server Error",
+    }[code]
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {code} {reason}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + data
+
+
+def make_handler(batcher, metrics):
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    req = await _read_request(reader)
+                except (asyncio.IncompleteReadError, ValueError):
+                    break
+                if req is None:
+                    break
+                method, path, version, headers, body = req
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+                t0 = time.perf_counter()
+                if method == "POST" and path == "/score":
+                    try:
+                        payload = json.loads(body.decode("utf-8") or "null")
+                        records = payload if isinstance(payload, list) else [payload]
+                        if not records or not all(isinstance(r, dict) for r in records):
+                            raise ValueError(
+                                "ожидается объект заказа или список объектов"
+                            )
+                    except Exception as e:
+                        metrics.errors += 1
+                        writer.write(_response(400, {"error": str(e)}, keep_alive))
+                    else:
+                        try:
+                            probs = await batcher.submit(records)
+                            writer.write(
+                                _response(200, {"p_high_value": probs}, keep_alive)
+                            )
+                            metrics.observe((time.perf_counter() - t0) * 1000)
+                        except Exception as e:
+                            metrics.errors += 1
+                            writer.write(_response(500, {"error": str(e)}, keep_alive))
+                elif method == "GET" and path == "/metrics":
+                    writer.write(_response(200, metrics.snapshot(), keep_alive))
+                elif method == "GET" and path == "/health":
+                    writer.write(_response(200, {"status": "ok"}, keep_alive))
+                else:
+                    writer.write(_response(404, {"error": "not found"}, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(
+    cfg, host=HOST, port=PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS
+):
+    metrics = Metrics()
+    batcher = MicroBatcher(Scorer(cfg), metrics, max_batch, max_wait_ms)
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(make_handler(batcher, metrics), host, port)
+    print(
+        f"Score service running at http://{host}:{port} (batch<={max_batch}, wait<={max_wait_ms} ms)"
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        batcher.executor.shutdown(wait=False)
+
+
+def run():
+    parser = argparse.ArgumentParser(description="HTTP-сервис скоринга с микропакетами")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+    cfg = load_config(args.config)
+    try:
+        asyncio.run(serve(cfg, args.host, args.port, args.max_batch, args.max_wait_ms))
+    except KeyboardInterrupt:
+        print("Score service stopped.")
+
+
+if __name__ == "__main__":
+    run()